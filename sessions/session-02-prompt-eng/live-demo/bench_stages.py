@@ -0,0 +1,93 @@
+"""
+Stage Latency Benchmark
+How much time the guardrails add to each message, next to the Gemini call
+
+Sends messages through SecureWCCChatbot.process_message and prints the
+latency of every stage (p50 / p95 / p99) from chatbot.stats(), then checks
+the guardrails (injection, PII, moderation and output validation together)
+against a per-message budget.
+
+By default Gemini is called for real (needs GEMINI_API_KEY in .env). With
+--fake-latency-ms, a local stand-in that waits that long answers instead,
+so the guardrails can be measured offline and for free:
+
+    python bench_stages.py --messages 20
+    python bench_stages.py --messages 5000 --fake-latency-ms 800 --prometheus
+    python bench_stages.py --messages 200 --fake-latency-ms 800 --speculative --stream
+"""
+
+import time
+import argparse
+from types import SimpleNamespace
+
+from config import initialize_api
+from chatbot import SecureWCCChatbot, STAGES
+from bench_guardrails import synthetic_messages
+
+
+class LocalModel:
+    """Stand-in for genai.GenerativeModel: waits, then answers (streamed word by word if asked)"""
+
+    ANSWER = "WCC offers associate degrees and certificates; see the admissions page to apply."
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        if stream:
+            return self._stream()
+        time.sleep(self.latency_ms / 1000)
+        return SimpleNamespace(text=self.ANSWER)
+
+    def _stream(self):
+        words = self.ANSWER.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.latency_ms / 1000 / len(words))
+            yield SimpleNamespace(text=word if i == 0 else " " + word)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency of SecureWCCChatbot")
+    parser.add_argument("--messages", type=int, default=20, help="Messages to send")
+    parser.add_argument("--fake-latency-ms", type=float,
+                        help="Use a local stand-in for Gemini with this latency")
+    parser.add_argument("--budget-ms", type=float, default=1.0,
+                        help="Allowed guardrail time per message (p99)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Generate while the checks run (SecureWCCChatbot(speculative=True))")
+    parser.add_argument("--stream", action="store_true", help="Stream and validate chunk by chunk")
+    parser.add_argument("--prometheus", action="store_true", help="Also print the Prometheus metrics")
+    args = parser.parse_args()
+
+    if args.fake_latency_ms is None:
+        initialize_api()
+    with SecureWCCChatbot(pattern_type="advanced", speculative=args.speculative, stream=args.stream) as bot:
+        if args.fake_latency_ms is not None:
+            bot.model = LocalModel(args.fake_latency_ms)
+
+        for message in synthetic_messages(args.messages):
+            bot.process_message(message)
+
+    stats = bot.stats()
+    print(f"\n⏱️  Stage latency over {args.messages:,} messages")
+    print("=" * 70)
+    print(f"{'stage':<20} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage in STAGES + ["guardrails", "total"]:
+        s = stats[stage]
+        print(f"{stage:<20} {s['count']:>7,} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} {s['p99_ms']:>10.3f}")
+
+    guardrails = stats["guardrails"]["p99_ms"]
+    generation = stats["generation"]["p50_ms"]
+    verdict = "✅" if guardrails < args.budget_ms else "❌"
+    print("-" * 70)
+    print(f"{verdict} Guardrails p99 {guardrails:.3f} ms (budget {args.budget_ms:g} ms)"
+          + (f", {guardrails / generation:.2%} of a typical Gemini call ({generation:.0f} ms)"
+             if generation else ""))
+
+    if args.prometheus:
+        print()
+        print(bot.prometheus_metrics())
+
+
+if __name__ == "__main__":
+    main()
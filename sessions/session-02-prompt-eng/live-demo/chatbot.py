@@ -2,18 +2,46 @@
 WCC Alexa Secure Chatbot
 """
 
+import time
+import threading
 import google.generativeai as genai
-from typing import Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from config import MODEL_CONFIG, SAFETY_SETTINGS, MODEL_ID
 from prompt_patterns import PromptPatterns
-from security import SecurityGuardrails
+from security import SecurityGuardrails, StreamingOutputValidator
+from telemetry import format_event, telemetry
+from metrics import StageMetrics, counters_to_prometheus
+
+# Timed stages, in pipeline order
+GUARDRAIL_STAGES = ['injection', 'pii', 'moderation', 'output_validation']
+STAGES = ['injection', 'pii', 'moderation', 'generation', 'output_validation']
 
 
 class SecureWCCChatbot:
-    """Production-ready chatbot with security"""
+    """
+    Production-ready chatbot with security
+    
+    Args:
+        pattern_type: Prompt pattern to use
+        verbose: Print each step (for demos; slows down every message)
+        speculative: Start generating on the redacted message while content
+                     moderation is still running (the checks run in the same
+                     order as without it, so responses and telemetry counters
+                     are the same). If moderation blocks, the generation's
+                     text is never used: a streaming generation stops at its
+                     next chunk, but a non-streaming Gemini call already in
+                     flight still runs to completion (and is billed).
+        stream: Stream the response and validate it chunk by chunk, stopping
+                generation as soon as it leaks the prompt
+    """
     
-    def __init__(self, pattern_type: str = "advanced"):
+    def __init__(self, pattern_type: str = "advanced", verbose: bool = False,
+                 speculative: bool = False, stream: bool = False):
         self.pattern_type = pattern_type
+        self.verbose = verbose
+        self.speculative = speculative
+        self.stream = stream
         self.model = genai.GenerativeModel(
             model_name=MODEL_ID,
             generation_config=MODEL_CONFIG,
@@ -21,9 +49,22 @@ class SecureWCCChatbot:
         )
         self.conversation_history = []
         self.security_log = []
+        # Per-stage latency, plus 'guardrails' (all checks of a message) and 'total'
+        self.metrics = StageMetrics(STAGES + ['guardrails', 'total'])
+        # Runs speculative generations next to the checks
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="generation") if speculative else None
         
         print(f"✓ Chatbot initialized with '{pattern_type}' pattern")
     
+    def _log(self, text: str = "") -> None:
+        if self.verbose:
+            print(text)
+    
+    def _log_event(self, event_type: str, message: str, severity: str, **details) -> None:
+        event = SecurityGuardrails.log_security_event(event_type, message, severity, **details)
+        if self.verbose and event is not None:
+            print(format_event(event))
+    
     def _select_prompt_pattern(self, user_query: str) -> str:
         """Select prompt pattern"""
         patterns = {
@@ -37,27 +78,90 @@ class SecureWCCChatbot:
         pattern_func = patterns.get(self.pattern_type, PromptPatterns.advanced_prompt_with_guardrails)
         return pattern_func(user_query)
     
+    def _generate(self, prompt: str, cancelled: threading.Event) -> Tuple[Optional[str], List[str], float]:
+        """
+        Call Gemini
+        
+        Returns:
+            (response text, leakage issues found while streaming, seconds);
+            the text is None if cancelled was set before the response was complete
+        """
+        start = time.perf_counter()
+        if not self.stream:
+            ai_response = self.model.generate_content(prompt).text
+            issues = []
+        else:
+            validator = StreamingOutputValidator()
+            for chunk in self.model.generate_content(prompt, stream=True):
+                if cancelled.is_set():
+                    return None, [], time.perf_counter() - start
+                if validator.feed(chunk.text):
+                    telemetry.count('stream', 'stopped_early')
+                    break  # Stop reading: the rest of the response won't be used
+            ai_response, issues = validator.text, validator.issues
+        
+        return ai_response, issues, time.perf_counter() - start
+    
+    def _start_generation(self, redacted_message: str) -> Tuple[Future, threading.Event]:
+        cancelled = threading.Event()
+        prompt = self._select_prompt_pattern(redacted_message)
+        return self._executor.submit(self._generate, prompt, cancelled), cancelled
+    
+    def _cancel(self, generation: Optional[Tuple[Future, threading.Event]]) -> None:
+        """
+        Discard a speculative generation (a blocked message never gets its text)
+        
+        A queued generation never starts and a streaming one stops at its next
+        chunk, but a non-streaming Gemini call already in flight can't be
+        interrupted: it still completes, and its result is dropped.
+        """
+        if generation is not None:
+            future, cancelled = generation
+            cancelled.set()
+            future.cancel()
+            telemetry.count('speculative', 'cancelled')
+    
     def process_message(self, user_message: str) -> Dict:
-        """Process message through security pipeline"""
+        """
+        Process message through security pipeline
+        
+        The result also has 'timings_ms': how long each stage that ran took
+        """
+        timings = {}
+        start = time.perf_counter()
+        result = self._process_message(user_message, timings)
+        timings['guardrails'] = sum(timings.get(stage, 0.0) for stage in GUARDRAIL_STAGES)
+        timings['total'] = time.perf_counter() - start
+        self.metrics.observe('guardrails', timings['guardrails'])
+        self.metrics.observe('total', timings['total'])
+        
+        result['timings_ms'] = {stage: seconds * 1000 for stage, seconds in timings.items()}
+        return result
+    
+    def _process_message(self, user_message: str, timings: Dict[str, float]) -> Dict:
         processing_steps = []
         security_events = []
         
-        print(f"\n{'='*70}")
-        print(f"PROCESSING USER MESSAGE")
-        print(f"{'='*70}")
-        print(f"Original: {user_message}\n")
+        self._log(f"\n{'='*70}")
+        self._log(f"PROCESSING USER MESSAGE")
+        self._log(f"{'='*70}")
+        self._log(f"Original: {user_message}\n")
         
         # STEP 1: Detect Prompt Injection
-        print("STEP 1: Prompt Injection Detection")
-        print("-" * 70)
+        self._log("STEP 1: Prompt Injection Detection")
+        self._log("-" * 70)
         
-        is_injection, injection_patterns = SecurityGuardrails.detect_prompt_injection(user_message)
+        with self.metrics.time('injection', timings):
+            is_injection, injection_patterns = SecurityGuardrails.detect_prompt_injection(user_message)
         
         if is_injection:
-            SecurityGuardrails.log_security_event(
+            for pattern in injection_patterns:
+                self._log(f"  🚨 Detected pattern: {pattern}")
+            self._log_event(
                 'PROMPT_INJECTION',
                 f'Detected {len(injection_patterns)} patterns',
-                'CRITICAL'
+                'CRITICAL',
+                patterns=injection_patterns
             )
             security_events.append({
                 'type': 'prompt_injection',
@@ -72,32 +176,40 @@ class SecureWCCChatbot:
             }
         
         processing_steps.append('✓ No injection detected')
-        print("✓ No injection detected\n")
+        self._log("✓ No injection detected\n")
         
         # STEP 2: Redact PII
-        print("STEP 2: PII Redaction")
-        print("-" * 70)
+        self._log("STEP 2: PII Redaction")
+        self._log("-" * 70)
         
-        redacted_message, detected_pii = SecurityGuardrails.redact_pii(user_message)
+        with self.metrics.time('pii', timings):
+            redacted_message, detected_pii = SecurityGuardrails.redact_pii(user_message)
+        
+        # Gemini only ever sees the redacted message, so speculation starts here
+        generation = self._start_generation(redacted_message) if self.speculative else None
         
         if detected_pii:
             pii_summary = ', '.join([f"{p['count']} {p['type']}" for p in detected_pii])
-            SecurityGuardrails.log_security_event('PII_REDACTED', pii_summary, 'WARNING')
+            self._log_event('PII_REDACTED', pii_summary, 'WARNING', pii=detected_pii)
             security_events.append({'type': 'pii_redacted', 'details': detected_pii})
             processing_steps.append(f'🔒 PII redacted: {pii_summary}')
-            print(f"Redacted message: {redacted_message}\n")
+            self._log(f"Redacted message: {redacted_message}\n")
         else:
             processing_steps.append('✓ No PII detected')
-            print("✓ No PII detected\n")
+            self._log("✓ No PII detected\n")
         
         # STEP 3: Content Moderation
-        print("STEP 3: Content Moderation")
-        print("-" * 70)
+        self._log("STEP 3: Content Moderation")
+        self._log("-" * 70)
+        
+        with self.metrics.time('moderation', timings):
+            is_inappropriate, flagged_words, is_crisis = SecurityGuardrails.moderate_content(redacted_message)
         
-        is_inappropriate, flagged_words, is_crisis = SecurityGuardrails.moderate_content(redacted_message)
+        if is_crisis or is_inappropriate:
+            self._cancel(generation)
         
         if is_crisis:
-            SecurityGuardrails.log_security_event('CRISIS_DETECTED', 'Immediate intervention needed', 'CRITICAL')
+            self._log_event('CRISIS_DETECTED', 'Immediate intervention needed', 'CRITICAL')
             return {
                 'response': "I'm concerned about what you've shared. Please reach out to:\n\n• National Suicide Prevention Lifeline: 988\n• Crisis Text Line: Text HOME to 741741\n and help is available 24/7.",
                 'blocked': True,
@@ -106,7 +218,9 @@ class SecureWCCChatbot:
             }
         
         if is_inappropriate:
-            SecurityGuardrails.log_security_event('CONTENT_FLAGGED', f'{len(flagged_words)} keywords', 'WARNING')
+            self._log(f"  ⚠️ Content flagged: {', '.join(flagged_words)}")
+            self._log_event('CONTENT_FLAGGED', f'{len(flagged_words)} keywords', 'WARNING',
+                            flagged=flagged_words)
             security_events.append({'type': 'inappropriate_content', 'flagged': flagged_words})
             processing_steps.append(f'⚠️ Content flagged: {len(flagged_words)} keywords')
             
@@ -118,20 +232,24 @@ class SecureWCCChatbot:
             }
         
         processing_steps.append('✓ Content moderation passed')
-        print("✓ Content appropriate\n")
+        self._log("✓ Content appropriate\n")
         
         # STEP 4: Generate AI Response
-        print("STEP 4: Generating AI Response")
-        print("-" * 70)
+        self._log("STEP 4: Generating AI Response")
+        self._log("-" * 70)
         
         try:
-            prompt = self._select_prompt_pattern(redacted_message)
-            response = self.model.generate_content(prompt)
-            ai_response = response.text
+            if generation is None:
+                prompt = self._select_prompt_pattern(redacted_message)
+                ai_response, stream_issues, seconds = self._generate(prompt, threading.Event())
+            else:
+                ai_response, stream_issues, seconds = generation[0].result()
+            timings['generation'] = seconds
+            self.metrics.observe('generation', seconds)
             processing_steps.append('✓ AI response generated')
-            print("✓ Response generated\n")
+            self._log("✓ Response generated\n")
         except Exception as e:
-            SecurityGuardrails.log_security_event('ERROR', f'Generation failed: {str(e)}', 'CRITICAL')
+            self._log_event('ERROR', f'Generation failed: {str(e)}', 'CRITICAL')
             return {
                 'response': "I'm having trouble right now. Please try again later.",
                 'blocked': True,
@@ -140,13 +258,17 @@ class SecureWCCChatbot:
             }
         
         # STEP 5: Validate Output
-        print("STEP 5: Output Validation")
-        print("-" * 70)
+        self._log("STEP 5: Output Validation")
+        self._log("-" * 70)
         
-        is_safe, issues = SecurityGuardrails.validate_output(ai_response)
+        if stream_issues:  # Already found while streaming; generation was stopped there
+            is_safe, issues = False, stream_issues
+        else:
+            with self.metrics.time('output_validation', timings):
+                is_safe, issues = SecurityGuardrails.validate_output(ai_response)
         
         if not is_safe:
-            SecurityGuardrails.log_security_event('OUTPUT_BLOCKED', f'{len(issues)} issues', 'WARNING')
+            self._log_event('OUTPUT_BLOCKED', f'{len(issues)} issues', 'WARNING', issues=issues)
             security_events.append({'type': 'unsafe_output', 'issues': issues})
             processing_steps.append(f'✗ Output validation failed: {len(issues)} issues')
             
@@ -158,10 +280,11 @@ class SecureWCCChatbot:
             }
         
         processing_steps.append('✓ Output validation passed')
-        print("✓ Output safe\n")
+        self._log("✓ Output safe\n")
+        self._log_event('MESSAGE_PROCESSED', 'Response sent', 'INFO')
         
-        print(f"✅ MESSAGE PROCESSED SUCCESSFULLY")
-        print(f"{'='*70}\n")
+        self._log(f"✅ MESSAGE PROCESSED SUCCESSFULLY")
+        self._log(f"{'='*70}\n")
         
         return {
             'response': ai_response,
@@ -170,7 +293,26 @@ class SecureWCCChatbot:
             'processing_steps': processing_steps
         }
     
+    def stats(self) -> Dict[str, Dict]:
+        """Latency per stage: count, mean, p50 / p95 / p99 and max, in milliseconds"""
+        return self.metrics.stats()
+    
+    def prometheus_metrics(self) -> str:
+        """Stage latency histograms and guardrail match counters, in Prometheus text format"""
+        return self.metrics.to_prometheus() + counters_to_prometheus(telemetry.stats()['counters'])
+    
     def chat(self, user_message: str) -> str:
         """Simple chat interface"""
         result = self.process_message(user_message)
-        return result['response']
\ No newline at end of file
+        return result['response']
+    
+    def close(self) -> None:
+        """Stop the speculative generation threads (queued generations are cancelled, calls in flight still complete)"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+    
+    def __enter__(self) -> "SecureWCCChatbot":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -69,21 +69,20 @@ def run_demo():
         ("Inappropriate content", "This is stupid, I hate this place"),
     ]
     
-    bot = SecureWCCChatbot(pattern_type='advanced')
-    
-    for test_name, query in security_tests:
-        print(f"\n{'='*70}")
-        print(f"TEST: {test_name}")
-        print(f"{'='*70}")
-        result = bot.process_message(query)
-        
-        print(f"\nResponse: {result['response']}")
-        print(f"\nBlocked: {result['blocked']}")
-        print(f"\nProcessing Steps:")
-        for step in result['processing_steps']:
-            print(f"  {step}")
-        
-        input("\nPress Enter to continue...")
+    with SecureWCCChatbot(pattern_type='advanced', verbose=True) as bot:
+        for test_name, query in security_tests:
+            print(f"\n{'='*70}")
+            print(f"TEST: {test_name}")
+            print(f"{'='*70}")
+            result = bot.process_message(query)
+            
+            print(f"\nResponse: {result['response']}")
+            print(f"\nBlocked: {result['blocked']}")
+            print(f"\nProcessing Steps:")
+            for step in result['processing_steps']:
+                print(f"  {step}")
+            
+            input("\nPress Enter to continue...")
     
     # Interactive mode
     print("\n\n" + "="*70)
@@ -91,16 +90,15 @@ def run_demo():
     print("="*70)
     print("Type your questions (or 'quit' to exit)\n")
     
-    bot = SecureWCCChatbot(pattern_type='advanced')
-    
-    while True:
-        user_input = input("\nYou: ")
-        if user_input.lower() in ['quit', 'exit', 'q']:
-            print("\nThank you for using WCC Chatbot! 🎓")
-            break
-        
-        result = bot.process_message(user_input)
-        print(f"\nWCC Alexa: {result['response']}")
+    with SecureWCCChatbot(pattern_type='advanced', verbose=True) as bot:
+        while True:
+            user_input = input("\nYou: ")
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                print("\nThank you for using WCC Chatbot! 🎓")
+                break
+            
+            result = bot.process_message(user_input)
+            print(f"\nWCC Alexa: {result['response']}")
 
 
 if __name__ == "__main__":
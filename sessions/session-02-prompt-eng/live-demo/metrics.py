@@ -0,0 +1,157 @@
+"""
+Stage Latency Metrics
+How long each step of the chatbot pipeline takes, as histograms
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Histogram bucket upper bounds, in seconds (Prometheus convention):
+# fine-grained below 1 ms for the guardrails, coarse up to 10 s for Gemini
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class LatencyHistogram:
+    """
+    Durations of one stage
+
+    Keeps cumulative bucket counts, a sum and a count (for Prometheus), plus
+    the most recent `window` samples, from which p50 / p95 / p99 are computed.
+
+    Args:
+        buckets: Bucket upper bounds, in seconds
+        window: Recent samples kept for percentiles
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 10000):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, q: float) -> float:
+        """q-th percentile (0-100) of the recent samples, in seconds (nearest rank)"""
+        samples = sorted(self._recent)
+        if not samples:
+            return 0.0
+        rank = max(0, min(len(samples) - 1, math.ceil(q / 100 * len(samples)) - 1))
+        return samples[rank]
+
+    def summary(self) -> Dict:
+        """Count, mean, p50 / p95 / p99 and max, in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': self.sum / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms for a pipeline
+
+    Usage:
+        metrics = StageMetrics()
+        with metrics.time('injection'):
+            ...
+        metrics.stats()          # {'injection': {'p50_ms': ..., ...}, ...}
+        metrics.to_prometheus()  # Text exposition format
+    """
+
+    def __init__(self, stages: Optional[List[str]] = None, window: int = 10000):
+        self.window = window
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        for stage in stages or []:
+            self._histogram(stage)
+
+    def _histogram(self, stage: str) -> LatencyHistogram:
+        if stage not in self._histograms:
+            self._histograms[stage] = LatencyHistogram(window=self.window)
+        return self._histograms[stage]
+
+    @contextmanager
+    def time(self, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """
+        Time a block with the monotonic clock and record it under stage
+
+        Args:
+            stage: Stage name
+            timings: Optional dict that also gets the duration (seconds) under stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(stage, elapsed)
+            if timings is not None:
+                timings[stage] = elapsed
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._histogram(stage).observe(seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Summary per stage (count, mean, p50 / p95 / p99, max in ms)"""
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self._histograms.items()}
+
+    def to_prometheus(self, name: str = "wcc_chatbot_stage_duration_seconds") -> str:
+        """All histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {name} Time spent in each processing stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in self._histograms.items():
+                label = f'stage="{escape_label(stage)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum:.9f}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    """Escape a Prometheus label value (backslash, double quote, newline)"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def counters_to_prometheus(counters: Dict[str, Dict[str, int]],
+                           name: str = "wcc_security_matches_total") -> str:
+    """Telemetry counters ({category: {name: count}}) as a Prometheus counter"""
+    lines = [
+        f"# HELP {name} Guardrail matches by category and pattern.",
+        f"# TYPE {name} counter",
+    ]
+    for category, counts in counters.items():
+        for match, count in counts.items():
+            lines.append(f'{name}{{category="{escape_label(category)}",'
+                         f'match="{escape_label(match)}"}} {count}')
+    return "\n".join(lines) + "\n"
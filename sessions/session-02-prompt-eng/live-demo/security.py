@@ -2,9 +2,84 @@
 Security Guardrails
 """
 
+import os
 import re
-from typing import List, Dict, Tuple
-from datetime import datetime
+import time
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
+
+from telemetry import telemetry
+
+
+class PatternScanner:
+    """
+    Find which of many regex patterns occur in a text, in one pass
+    
+    All patterns are compiled once into a single alternation, p1|p2|...,
+    so the regex engine walks the text once instead of once per pattern.
+    Each search stops at the next position where some pattern starts (rare
+    in normal messages); the individual patterns are checked there, and the
+    search resumes one character later, so overlapping matches aren't
+    missed. The result is exactly the set of patterns re.search would find
+    one by one.
+    """
+    
+    def __init__(self, patterns: List[str], flags: int = 0):
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+        self._combined = re.compile('|'.join(f'(?:{pattern})' for pattern in self.patterns), flags)
+    
+    def find(self, text: str) -> List[int]:
+        """Indices of the patterns that occur in text, in pattern order"""
+        remaining = list(range(len(self._compiled)))
+        found = []
+        pos = 0
+        while remaining:
+            candidate = self._combined.search(text, pos)
+            if candidate is None:
+                break
+            start = candidate.start()
+            hits = [i for i in remaining if self._compiled[i].match(text, start)]
+            found.extend(hits)
+            remaining = [i for i in remaining if i not in hits]
+            pos = start + 1
+        return sorted(found)
+
+
+# str.lower() leaves these alone, but re.IGNORECASE matches them to i and s
+_IGNORECASE_FOLD = str.maketrans({'\u0131': 'i', '\u017f': 's'})
+
+
+def _fold_case(text: str) -> str:
+    """
+    Lowercase text so that lowercase patterns match it the way
+    re.IGNORECASE patterns match text.lower() (a lot faster)
+    """
+    text = text.lower()
+    return text if text.isascii() else text.translate(_IGNORECASE_FOLD)
+
+
+def _lowercase_pattern(pattern: str) -> str:
+    """Lowercase the literal letters of a pattern, leaving escapes like \\S alone"""
+    return re.sub(r'\\.|[A-Z]', lambda m: m.group().lower() if len(m.group()) == 1 else m.group(),
+                  pattern)
+
+
+def _chunked(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Split an iterable into lists of up to size items, reading it lazily"""
+    iterator = iter(texts)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _check_chunk(guardrails: type, texts: List[str]) -> List[Dict]:
+    """Run in a worker process: check_message for every text in a chunk"""
+    return [guardrails.check_message(text) for text in texts]
 
 
 class SecurityGuardrails:
@@ -46,21 +121,135 @@ class SecurityGuardrails:
         'self harm', 'cut myself'
     ]
     
+    LEAKAGE_INDICATORS = [
+        'system prompt',
+        'my instructions',
+        'i was told to',
+        'my guidelines state'
+    ]
+    
+    WCC_KEYWORDS = [
+        'wcc', 'washtenaw', 'college', 'program', 'course', 
+        'degree', 'admission', 'enroll', 'student', 'tuition',
+        'financial aid', 'apply', 'transfer', 'campus'
+    ]
+    
+    @classmethod
+    def _scanners(cls) -> Dict:
+        """Compiled scanners, built on first use (per class, so subclasses can extend the lists)"""
+        scanners = cls.__dict__.get('_compiled_scanners')
+        if scanners is None:
+            keywords = cls.INAPPROPRIATE_KEYWORDS + cls.CRISIS_KEYWORDS
+            scanners = {
+                # Matched case-insensitively, on _fold_case(text)
+                'injection': PatternScanner([_lowercase_pattern(p) for p in cls.INJECTION_PATTERNS]),
+                'pii': PatternScanner([pattern for pattern, _, _ in cls.PII_PATTERNS]),
+                'pii_compiled': [(re.compile(pattern), replacement, pii_type)
+                                 for pattern, replacement, pii_type in cls.PII_PATTERNS],
+                'keywords': PatternScanner([re.escape(keyword) for keyword in keywords]),
+            }
+            cls._compiled_scanners = scanners
+        return scanners
+    
+    @classmethod
+    def scan(cls, text: str) -> Dict:
+        """
+        Run injection detection, PII redaction and content moderation
+        
+        Returns:
+            Dict with the tuples the individual checks return: 'injection'
+            (detect_prompt_injection), 'pii' (redact_pii) and 'moderation'
+            (moderate_content of the redacted text, as the chatbot runs it)
+        """
+        injection = cls.detect_prompt_injection(text)
+        redacted_text, detected_pii = cls.redact_pii(text)
+        return {
+            'injection': injection,
+            'pii': (redacted_text, detected_pii),
+            'moderation': cls.moderate_content(redacted_text),
+        }
+    
+    @classmethod
+    def check_message(cls, text: str) -> Dict:
+        """
+        scan() plus whether the message would be blocked and how long the checks took
+        
+        Returns:
+            scan()'s dict with 'blocked' (injection, inappropriate content
+            or crisis) and 'seconds'
+        """
+        start = time.perf_counter()
+        result = cls.scan(text)
+        is_injection, _ = result['injection']
+        is_inappropriate, _, is_crisis = result['moderation']
+        result['blocked'] = is_injection or is_inappropriate or is_crisis
+        result['seconds'] = time.perf_counter() - start
+        return result
+    
+    @classmethod
+    def iter_check_messages(cls, texts: Iterable[str], workers: Optional[int] = None,
+                            chunk_size: int = 500) -> Iterator[Dict]:
+        """
+        Check a stream of messages across a process pool, yielding results in input order
+        
+        Messages are read lazily and sent to the workers in chunks, so the
+        cost of passing them between processes is paid once per chunk, not
+        once per message. Only a few chunks per worker are in flight at a
+        time, so a file with millions of lines never has to fit in memory.
+        (Telemetry counters are kept by each worker process, not this one.)
+        
+        Args:
+            texts: Any iterable of messages (a list, an open file, a generator)
+            workers: Worker processes (None = one per CPU; 1 = check in this process)
+            chunk_size: Messages per task sent to a worker
+        
+        Yields:
+            check_message() results, each with its position in texts as 'index'
+        """
+        workers = workers or os.cpu_count() or 1
+        index = 0
+        
+        if workers == 1:
+            for chunk in _chunked(texts, chunk_size):
+                for result in _check_chunk(cls, chunk):
+                    result['index'] = index
+                    index += 1
+                    yield result
+            return
+        
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = deque()
+            chunks = _chunked(texts, chunk_size)
+            while True:
+                # Keep every worker busy, with one more chunk each queued behind it
+                for chunk in itertools.islice(chunks, 2 * workers - len(pending)):
+                    pending.append(pool.submit(_check_chunk, cls, chunk))
+                if not pending:
+                    break
+                for result in pending.popleft().result():
+                    result['index'] = index
+                    index += 1
+                    yield result
+        finally:
+            pool.shutdown(cancel_futures=True)
+    
+    @classmethod
+    def check_messages(cls, texts: Iterable[str], workers: Optional[int] = None,
+                       chunk_size: int = 500) -> List[Dict]:
+        """Batch version of iter_check_messages: all results, in input order"""
+        return list(cls.iter_check_messages(texts, workers=workers, chunk_size=chunk_size))
+    
     @classmethod
     def detect_prompt_injection(cls, text: str) -> Tuple[bool, List[str]]:
         """Detect prompt injection attempts"""
-        detected = []
-        text_lower = text.lower()
+        hits = cls._scanners()['injection'].find(_fold_case(text))
+        detected = [cls.INJECTION_PATTERNS[i] for i in hits]
         
-        for pattern in cls.INJECTION_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                detected.append(pattern)
-                print(f"  🚨 Detected pattern: {pattern}")
+        for pattern in detected:
+            telemetry.count('injection', pattern)
         
         is_malicious = len(detected) > 0
-        if is_malicious:
-            print(f"  ⚠️ ALERT: {len(detected)} injection pattern(s) detected!")
-        
         return is_malicious, detected
     
     @classmethod
@@ -68,35 +257,37 @@ class SecurityGuardrails:
         """Redact personally identifiable information"""
         redacted_text = text
         detected_pii = []
+        scanners = cls._scanners()
         
-        for pattern, replacement, pii_type in cls.PII_PATTERNS:
-            matches = re.findall(pattern, text)
+        # Only the patterns found in the text are run again, to count and replace
+        for i in scanners['pii'].find(text):
+            pattern, replacement, pii_type = scanners['pii_compiled'][i]
+            matches = pattern.findall(text)
             if matches:
                 detected_pii.append({
                     'type': pii_type,
                     'count': len(matches)
                 })
-                redacted_text = re.sub(pattern, replacement, redacted_text)
-                print(f"  🔒 Redacted {len(matches)} {pii_type}(s)")
+                redacted_text = pattern.sub(replacement, redacted_text)
+                telemetry.count('pii', pii_type, len(matches))
         
         return redacted_text, detected_pii
     
     @classmethod
     def moderate_content(cls, text: str) -> Tuple[bool, List[str], bool]:
         """Check for inappropriate content"""
-        text_lower = text.lower()
+        hits = cls._scanners()['keywords'].find(text.lower())
+        n_inappropriate = len(cls.INAPPROPRIATE_KEYWORDS)
         
-        flagged = [word for word in cls.INAPPROPRIATE_KEYWORDS 
-                   if word in text_lower]
+        flagged = [cls.INAPPROPRIATE_KEYWORDS[i] for i in hits if i < n_inappropriate]
         
-        crisis_detected = any(keyword in text_lower 
-                            for keyword in cls.CRISIS_KEYWORDS)
+        crisis_detected = any(i >= n_inappropriate for i in hits)
         
-        if flagged:
-            print(f"  ⚠️ Content flagged: {', '.join(flagged)}")
+        for keyword in flagged:
+            telemetry.count('keyword', keyword)
         
         if crisis_detected:
-            print(f"  🚨 CRISIS DETECTED - Human intervention needed!")
+            telemetry.count('crisis', 'detected')
         
         is_inappropriate = len(flagged) > 0
         
@@ -108,43 +299,63 @@ class SecurityGuardrails:
         issues = []
         response_lower = response.lower()
         
-        leakage_indicators = [
-            'system prompt',
-            'my instructions',
-            'i was told to',
-            'my guidelines state'
-        ]
-        
-        for indicator in leakage_indicators:
+        for indicator in cls.LEAKAGE_INDICATORS:
             if indicator in response_lower:
                 issues.append(f'Prompt leakage: "{indicator}"')
-                print(f"  🚨 Output validation failed: {indicator}")
-        
-        wcc_keywords = [
-            'wcc', 'washtenaw', 'college', 'program', 'course', 
-            'degree', 'admission', 'enroll', 'student', 'tuition',
-            'financial aid', 'apply', 'transfer', 'campus'
-        ]
+                telemetry.count('output', indicator)
         
-        has_topic = any(keyword in response_lower for keyword in wcc_keywords)
+        has_topic = any(keyword in response_lower for keyword in cls.WCC_KEYWORDS)
         
         if not has_topic and len(response) > 100:
             issues.append('Response may be off-topic')
-            print(f"  ⚠️ Response appears off-topic")
+            telemetry.count('output', 'off_topic')
         
         is_safe = len(issues) == 0
         return is_safe, issues
     
     @staticmethod
-    def log_security_event(event_type: str, message: str, severity: str = "INFO"):
-        """Log security events"""
-        timestamp = datetime.now().isoformat()
-        
-        severity_emoji = {
-            'INFO': 'ℹ️',
-            'WARNING': '⚠️',
-            'CRITICAL': '🚨'
-        }
+    def log_security_event(event_type: str, message: str, severity: str = "INFO", **details) -> Optional[Dict]:
+        """Log security events (recorded by telemetry, written in the background)"""
+        return telemetry.record(event_type, message, severity, **details)
+
+
+class StreamingOutputValidator:
+    """
+    validate_output for a response that arrives in chunks
+    
+    feed() checks each chunk for prompt leakage as soon as it arrives
+    (including indicators split across two chunks), so a leaking response
+    can be stopped before it is complete. The off-topic check needs the
+    whole response, so finish() runs validate_output on it: a response
+    that streams through gets exactly the same verdict as without streaming.
+    """
+    
+    def __init__(self, guardrails: type = SecurityGuardrails):
+        self.guardrails = guardrails
+        self.chunks = []
+        self.issues = []
+        self._found = set()
+        self._tail = ''  # End of the text so far, for indicators split across chunks
+        self._tail_size = max(len(indicator) for indicator in guardrails.LEAKAGE_INDICATORS) - 1
+    
+    @property
+    def text(self) -> str:
+        return ''.join(self.chunks)
+    
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk; returns the issues found so far (stop generating if any)"""
+        self.chunks.append(chunk)
+        window = self._tail + chunk.lower()
+        
+        for indicator in self.guardrails.LEAKAGE_INDICATORS:
+            if indicator not in self._found and indicator in window:
+                self._found.add(indicator)
+                self.issues.append(f'Prompt leakage: "{indicator}"')
+                telemetry.count('output', indicator)
         
-        emoji = severity_emoji.get(severity, '📝')
-        print(f"[SECURITY] {emoji} {severity}: {event_type} - {message}")
+        self._tail = window[-self._tail_size:] if self._tail_size else ''
+        return self.issues
+    
+    def finish(self) -> Tuple[bool, List[str]]:
+        """Verdict for the complete response (same as validate_output)"""
+        return self.guardrails.validate_output(self.text)
@@ -0,0 +1,168 @@
+"""
+Security Telemetry
+Structured security events and counters, without blocking the guardrails
+"""
+
+import os
+import json
+import queue
+import random
+import atexit
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Where events are written, one JSON object per line (unset = keep them in memory only)
+SECURITY_LOG_PATH = os.getenv("SECURITY_LOG_PATH")
+
+# Share of INFO events kept (WARNING and CRITICAL events are always kept)
+SECURITY_INFO_SAMPLE_RATE = float(os.getenv("SECURITY_INFO_SAMPLE_RATE", "1.0"))
+
+SEVERITY_EMOJI = {
+    'INFO': 'ℹ️',
+    'WARNING': '⚠️',
+    'CRITICAL': '🚨'
+}
+
+
+def format_event(event: Dict) -> str:
+    """One-line, human-readable form of an event"""
+    emoji = SEVERITY_EMOJI.get(event['severity'], '📝')
+    return f"[SECURITY] {emoji} {event['severity']}: {event['type']} - {event['message']}"
+
+
+class SecurityTelemetry:
+    """
+    Security event pipeline
+
+    - record() keeps the event in an in-memory ring buffer (the most recent
+      buffer_size events) and hands it to a background thread that appends
+      it to a JSONL file. Nothing waits for I/O: if the writer falls behind
+      by more than queue_size events, new events are dropped from the file
+      (and counted) rather than slowing down the caller.
+    - INFO events are sampled (info_sample_rate); WARNING and CRITICAL
+      events are always kept.
+    - count() adds to per-pattern counters, e.g. how often each injection
+      pattern or PII type has been seen.
+
+    Args:
+        log_path: JSONL file to append events to (None = in memory only)
+        buffer_size: Recent events kept in memory
+        info_sample_rate: Share of INFO events kept (0.0 - 1.0)
+        queue_size: Events waiting for the writer before new ones are dropped
+    """
+
+    def __init__(self, log_path: Optional[str] = None, buffer_size: int = 10000,
+                 info_sample_rate: float = 1.0, queue_size: int = 100000):
+        self.log_path = log_path
+        self.info_sample_rate = info_sample_rate
+        self.counters: Dict[str, Counter] = {}
+        self.events_recorded = 0
+        self.events_sampled_out = 0
+        self.events_dropped = 0
+        self.events_written = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+    def record(self, event_type: str, message: str, severity: str = "INFO", **details) -> Optional[Dict]:
+        """
+        Record a security event
+
+        Returns:
+            The event, or None if it was sampled out
+        """
+        if severity == "INFO" and self.info_sample_rate < 1.0 and random.random() >= self.info_sample_rate:
+            with self._lock:
+                self.events_sampled_out += 1
+            return None
+
+        event = {
+            'timestamp': datetime.now().isoformat(),
+            'type': event_type,
+            'severity': severity,
+            'message': message,
+            **details,
+        }
+        with self._lock:
+            self.events_recorded += 1
+            self._buffer.append(event)
+
+        if self.log_path:
+            self._start_writer()
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                with self._lock:
+                    self.events_dropped += 1
+        return event
+
+    def count(self, category: str, name: str, n: int = 1) -> None:
+        """Add n to the counter for name (e.g. a pattern) in category (e.g. 'injection')"""
+        with self._lock:
+            self.counters.setdefault(category, Counter())[name] += n
+
+    def recent(self, n: Optional[int] = None) -> List[Dict]:
+        """The most recent events, oldest first"""
+        with self._lock:
+            events = list(self._buffer)
+        return events[-n:] if n else events
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'events_recorded': self.events_recorded,
+                'events_sampled_out': self.events_sampled_out,
+                'events_dropped': self.events_dropped,
+                'events_written': self.events_written,
+                'counters': {category: dict(counter) for category, counter in self.counters.items()},
+            }
+
+    def reset(self) -> None:
+        """Clear the counters and the in-memory events (the log file is kept)"""
+        with self._lock:
+            self.counters = {}
+            self._buffer.clear()
+            self.events_recorded = self.events_sampled_out = self.events_dropped = 0
+
+    def flush(self) -> None:
+        """Wait until every queued event has been written"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)  # Makes the writer write and flush what it has
+            self._queue.join()
+
+    def _start_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_events, name="security-telemetry",
+                                                daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_events(self) -> None:
+        """Background thread: append queued events to the log file in batches"""
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            while True:
+                events = [self._queue.get()]
+                while True:  # Take everything that is waiting, to write it in one go
+                    try:
+                        events.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                lines = [json.dumps(event, default=str) for event in events if event is not None]
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                f.flush()
+                with self._lock:
+                    self.events_written += len(lines)
+                for _ in events:
+                    self._queue.task_done()
+
+
+# Shared by the guardrails and the chatbot
+telemetry = SecurityTelemetry(log_path=SECURITY_LOG_PATH, info_sample_rate=SECURITY_INFO_SAMPLE_RATE)
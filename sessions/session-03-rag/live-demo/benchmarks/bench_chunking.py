@@ -0,0 +1,106 @@
+"""
+WCC AI Learning Series - Session 3: Chunking Benchmark
+Documents per second for each chunker on a synthetic corpus
+
+Compares:
+- recursive:           LangChain RecursiveCharacterTextSplitter, one blog at a time
+                       (rag_demo's default CHUNKER)
+- sentence (1 worker): chunker.py in this process
+- sentence (N workers): chunker.py on a process pool (CHUNKER=sentence)
+
+The corpus is generated on the fly (blog-sized posts of random sentences,
+same seed every run), so 100k documents never sit in memory at once.
+
+Run from the live-demo folder:
+    python benchmarks/bench_chunking.py --docs 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from typing import Callable, Dict, Iterable, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunker import iter_chunks_parallel
+
+WORDS = ("python community mentorship workshop django cloud data model learning "
+         "career event women coding session project team code review deploy "
+         "vector search embedding question answer retrieval the a of and to in "
+         "is for with on that this we you it our").split()
+
+
+def synthetic_blogs(n: int, seed: int = 42) -> Iterator[Dict]:
+    """Yield n blog posts of 3-6 paragraphs, each 3-6 random sentences"""
+    # Build a pool of paragraphs once, so generating posts costs (almost)
+    # nothing compared with chunking them
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(1000):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = rng.choices(WORDS, k=rng.randint(6, 20))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+
+    for i in range(n):
+        count = 3 + i % 4
+        yield {
+            "title": f"Synthetic Post {i}",
+            "date": "2024-01-01",
+            "url": f"https://example.com/blog/{i}",
+            "content": "\n\n".join(paragraphs[(i * 7 + j * 131) % len(paragraphs)]
+                                    for j in range(count)),
+        }
+
+
+def recursive_chunks(blogs: Iterable[Dict], chunk_size: int = 400,
+                     chunk_overlap: int = 50) -> Iterator[Dict]:
+    """The same chunking as rag_demo.iter_chunks with CHUNKER=recursive"""
+    from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        length_function=len,
+    )
+    for blog in blogs:
+        chunks = text_splitter.split_text(f"Title: {blog['title']}\n\n{blog['content']}")
+        for i, chunk in enumerate(chunks):
+            yield {"text": chunk, "metadata": {"title": blog["title"], "date": blog["date"],
+                                               "url": blog["url"], "chunk_id": i,
+                                               "total_chunks": len(chunks)}}
+
+
+def bench(name: str, chunk_fn: Callable[[Iterable[Dict]], Iterator[Dict]], n_docs: int) -> Dict:
+    start = time.perf_counter()
+    n_chunks = sum(1 for _ in chunk_fn(synthetic_blogs(n_docs)))
+    elapsed = time.perf_counter() - start
+    return {"name": name, "docs": n_docs, "chunks": n_chunks, "seconds": elapsed,
+            "docs_per_sec": n_docs / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure chunking throughput")
+    parser.add_argument("--docs", type=int, default=100_000, help="Synthetic documents")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for the parallel run")
+    args = parser.parse_args()
+
+    runs = [
+        ("recursive", recursive_chunks),
+        ("sentence (1 worker)", lambda blogs: iter_chunks_parallel(blogs, workers=1)),
+    ]
+    if args.workers > 1:
+        runs.append((f"sentence ({args.workers} workers)",
+                     lambda blogs: iter_chunks_parallel(blogs, workers=args.workers)))
+
+    print(f"\n⏱️  Chunking {args.docs:,} synthetic documents")
+    print("-" * 70)
+    for name, chunk_fn in runs:
+        result = bench(name, chunk_fn, args.docs)
+        print(f"  {name:<22} {result['docs_per_sec']:>9,.0f} docs/sec   "
+              f"{result['chunks']:>9,} chunks   {result['seconds']:.1f}s")
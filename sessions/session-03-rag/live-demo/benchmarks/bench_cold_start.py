@@ -0,0 +1,130 @@
+"""
+WCC AI Learning Series - Session 3: Cold Start Benchmark
+Time to the first search result: ChromaDB vs saved local index vs snapshot
+
+Builds a synthetic collection once, saves it three ways, then times each
+in a fresh Python process (nothing imported or cached in memory yet):
+
+- chroma:      open PersistentClient + collection, run one query
+- local index: FlatIndex.load() (reads vectors, parses records.json), search
+- snapshot:    Snapshot() (memory-maps files), search
+
+Also reports each process's private (anonymous) memory growth. Snapshot
+pages are file-backed and shared by every process that maps them, so they
+don't count towards it. Linux only; shown as "n/a" elsewhere.
+
+Run from the live-demo folder:
+    python benchmarks/bench_cold_start.py --vectors 20000 --dim 256
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+LIVE_DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIVE_DEMO_DIR)
+
+from vector_index import FlatIndex
+from snapshot import export_snapshot
+
+SCENARIOS = {
+    "chroma": """
+import chromadb
+collection = chromadb.PersistentClient(path="chroma").get_collection("bench")
+collection.query(query_embeddings=[query], n_results=5)
+""",
+    "local index": """
+from vector_index import FlatIndex
+FlatIndex.load("local_index").search(query, k=5)
+""",
+    "snapshot": """
+from snapshot import Snapshot
+Snapshot("snapshot").search(query, k=5)
+""",
+}
+
+# Timer and memory probe around the scenario code
+TIMED = """
+import time
+import numpy as np
+
+def anon_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1])
+    except OSError:
+        return -1
+    return -1
+
+query = np.random.default_rng(0).normal(size={dim}).astype(np.float32).tolist()
+_memory = anon_kb()
+_start = time.perf_counter()
+{code}
+print(f"SECONDS={{time.perf_counter() - _start:.4f}}")
+print(f"ANON_KB={{anon_kb() - _memory if _memory >= 0 else -1}}")
+"""
+
+
+def build_fixtures(workdir: str, n: int, dim: int, seed: int = 42) -> None:
+    """Write the same synthetic chunks as a ChromaDB collection, a local index and a snapshot"""
+    import chromadb
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(n)]
+    documents = [f"Synthetic chunk {i} about python, mentorship and cloud." for i in range(n)]
+    metadatas = [{"title": f"Post {i // 8}", "date": "2024-01-01",
+                  "url": f"https://example.com/{i // 8}", "chunk_id": i % 8} for i in range(n)]
+
+    collection = chromadb.PersistentClient(path=os.path.join(workdir, "chroma")).create_collection("bench")
+    for start in range(0, n, 5000):
+        end = start + 5000
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end],
+                       documents=documents[start:end], metadatas=metadatas[start:end])
+
+    index = FlatIndex()
+    index.add(ids, vectors, documents, metadatas)
+    index.save(os.path.join(workdir, "local_index"))
+    export_snapshot(index, os.path.join(workdir, "snapshot"))
+
+
+def run_scenario(code: str, workdir: str, dim: int) -> Dict[str, Optional[float]]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = LIVE_DEMO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED.format(code=code, dim=dim)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    values = dict(line.split("=", 1) for line in output.strip().splitlines() if "=" in line)
+    anon_kb = int(values["ANON_KB"])
+    return {"seconds": float(values["SECONDS"]),
+            "anon_mb": anon_kb / 1024 if anon_kb >= 0 else None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time to first search result")
+    parser.add_argument("--vectors", type=int, default=20_000, help="Chunks in the collection")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per scenario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"\n🏗️  Building {args.vectors:,} x {args.dim} fixtures...")
+        build_fixtures(workdir, args.vectors, args.dim)
+
+        print(f"\n⏱️  Time to first search result ({args.repeat} runs each)")
+        print("-" * 60)
+        for name, code in SCENARIOS.items():
+            runs: List[Dict] = [run_scenario(code, workdir, args.dim) for _ in range(args.repeat)]
+            seconds = statistics.median(run["seconds"] for run in runs)
+            anon = runs[-1]["anon_mb"]
+            memory = f"{anon:8.1f} MB private" if anon is not None else "     n/a"
+            print(f"  {name:<12} median {seconds:7.3f}s   {memory}")
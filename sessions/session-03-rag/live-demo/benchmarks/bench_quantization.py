@@ -0,0 +1,86 @@
+"""
+WCC AI Learning Series - Session 3: Quantization Benchmark
+Recall, memory and queries/sec for float32, int8 and binary indexes
+
+Compares the local VECTOR_BACKENDs on a synthetic clustered dataset at a
+production-sized embedding dimension (the demo uses 10 dimensions, which
+is too small for memory to matter):
+
+- flat:   exact float32 search (the reference for recall)
+- int8:   int8 codes + full-precision rescoring of rescore x k candidates
+- binary: 1-bit codes + full-precision rescoring
+
+"Search memory" is what every query scans and has to stay in RAM; the
+quantized indexes also keep the float32 vectors, but memory-mapped on disk
+and only read for the shortlist.
+
+Run from the live-demo folder:
+    python benchmarks/bench_quantization.py --vectors 100000 --dim 768
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import FlatIndex, Int8Index, BinaryIndex
+
+
+def synthetic_embeddings(n: int, dim: int, n_queries: int, seed: int = 42):
+    """Clustered vectors (like embeddings of related posts) and queries near them"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim)).astype(np.float32)
+
+    def sample(count: int) -> np.ndarray:
+        noise = rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+        return centers[rng.integers(len(centers), size=count)] + noise
+
+    return sample(n), sample(n_queries)
+
+
+def bench(index: FlatIndex, queries: np.ndarray, k: int, truth: List[List[str]]) -> Dict:
+    start = time.perf_counter()
+    results = [[doc['text'] for doc in index.search(query, k)] for query in queries]
+    elapsed = time.perf_counter() - start
+    recall = np.mean([len(set(found) & set(expected)) / k
+                      for found, expected in zip(results, truth)])
+    return {"recall": float(recall), "qps": len(queries) / elapsed,
+            "memory_mb": index.search_memory_bytes() / 1e6}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare quantized vector indexes")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Vectors in the index")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to time")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    vectors, queries = synthetic_embeddings(args.vectors, args.dim, args.queries)
+    ids = [str(i) for i in range(args.vectors)]
+    metadatas = [{}] * args.vectors
+
+    runs = [
+        ("flat (float32)", FlatIndex()),
+        ("int8, rescore 4x", Int8Index(rescore=4)),
+        ("binary, rescore 16x", BinaryIndex(rescore=16)),
+        ("binary, rescore 64x", BinaryIndex(rescore=64)),
+    ]
+
+    print(f"\n⏱️  {args.vectors:,} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print("-" * 70)
+    print(f"  {'index':<22} {'recall@k':>9} {'search memory':>15} {'queries/sec':>12}")
+    truth = None
+    for name, index in runs:
+        # Texts are the ids, so results can be compared with the exact search
+        index.add(ids, vectors, ids, metadatas)
+        if truth is None:
+            truth = [[doc['text'] for doc in index.search(query, args.k)] for query in queries]
+        result = bench(index, queries, args.k, truth)
+        print(f"  {name:<22} {result['recall']:>9.3f} {result['memory_mb']:>12.1f} MB "
+              f"{result['qps']:>12,.0f}")
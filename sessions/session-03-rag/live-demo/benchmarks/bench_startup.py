@@ -0,0 +1,105 @@
+"""
+WCC AI Learning Series - Session 3: Startup Benchmark
+How long does `import rag_demo` take?
+
+Each scenario runs in a fresh Python process (so nothing is already
+imported) inside an empty temporary folder (so no real ChromaDB data is
+touched). No API calls are made - creating the Gemini client doesn't need
+the network.
+
+Scenarios:
+- lazy import:      `import rag_demo` - what --search, the Streamlit app and
+                    other importers pay before doing anything
+- first use:        import, then create the client and open the collection
+- eager (previous): what importing rag_demo used to do - import and init
+                    vertexai, create the client, open ChromaDB and load the
+                    text splitter, all up front
+
+Run from the live-demo folder:
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List
+
+LIVE_DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "lazy import": """
+import rag_demo
+""",
+    "first use": """
+import rag_demo
+rag_demo.get_client()
+rag_demo.get_collection()
+""",
+    "eager (previous)": """
+import vertexai
+import rag_demo
+vertexai.init(project=rag_demo.PROJECT_ID, location=rag_demo.LOCATION)
+rag_demo.get_client()
+rag_demo.get_embedding_engine()
+rag_demo.get_collection()
+rag_demo.get_embedding_cache()
+from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+""",
+}
+
+# Timer around the scenario code, printed as the last line of output
+TIMED = """
+_start = time.perf_counter()
+{code}
+print(f"SECONDS={{time.perf_counter() - _start:.4f}}")
+"""
+
+
+def run_scenario(code: str, workdir: str) -> float:
+    """Run code in a fresh interpreter and return its wall time in seconds"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = LIVE_DEMO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("GCP_PROJECT_ID", "startup-benchmark")
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED.format(code=code)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1].split("=", 1)[1])
+
+
+def bench_startup(repeat: int = 3) -> Dict[str, Dict]:
+    """
+    Time every scenario
+
+    Args:
+        repeat: Fresh processes per scenario
+
+    Returns:
+        {scenario: {'min', 'median', 'runs'}} in seconds
+    """
+    results = {}
+    for name, code in SCENARIOS.items():
+        runs: List[float] = []
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                runs.append(run_scenario(code, workdir))
+        results[name] = {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure rag_demo import/startup time")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per scenario")
+    args = parser.parse_args()
+
+    print(f"\n⏱️  rag_demo startup ({args.repeat} runs each)")
+    print("-" * 50)
+    results = bench_startup(args.repeat)
+    for name, result in results.items():
+        print(f"  {name:<18} median {result['median']:.2f}s   min {result['min']:.2f}s")
+
+    saved = results["eager (previous)"]["median"] - results["lazy import"]["median"]
+    print(f"\n✓ Lazy import saves {saved:.2f}s per cold start")
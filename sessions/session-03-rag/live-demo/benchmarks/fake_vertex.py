@@ -0,0 +1,123 @@
+"""
+WCC AI Learning Series - Session 3: Local Vertex AI Stand-in
+A deterministic fake of genai.Client for benchmarks (no network, no cost)
+
+FakeVertexClient has the two methods the pipelines call,
+`client.models.embed_content` and `client.models.generate_content` (plus
+`generate_content_stream`), and returns objects shaped like the real
+responses.
+
+- Embeddings are built from hashes of the words in each text: the same
+  text always gets the same vector, on every machine and every run, and
+  texts that share words get nearby vectors, so search results look
+  realistic.
+- Each call sleeps for a configurable latency (a fixed part per request
+  plus a part per text), so concurrency, batching and caching have
+  something to save.
+- Calls and texts are counted, to check how many requests a change saves.
+
+Usage:
+    client = FakeVertexClient(embed_latency_ms=50, generate_latency_ms=400)
+    rag_demo.set_client(client)                              # Live demo
+    rag = RAGPipeline(project_id="local", client=client)     # Starter template
+"""
+
+import re
+import time
+import hashlib
+import threading
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+
+DEFAULT_DIMENSION = 768  # text-embedding-004 (the demo asks for 10)
+
+
+@lru_cache(maxsize=100_000)
+def _word_vector(word: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def hash_embedding(text: str, dim: int = DEFAULT_DIMENSION) -> List[float]:
+    """Deterministic unit-length embedding: the normalized sum of hash-seeded word vectors"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        vector += _word_vector(word, dim)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return _word_vector("", dim).tolist()
+    return (vector / norm).tolist()
+
+
+class _FakeModels:
+    """The `client.models` part of genai.Client"""
+
+    def __init__(self, embed_latency_ms: float, embed_latency_per_text_ms: float,
+                 generate_latency_ms: float, answer: str):
+        self.embed_latency_ms = embed_latency_ms
+        self.embed_latency_per_text_ms = embed_latency_per_text_ms
+        self.generate_latency_ms = generate_latency_ms
+        self.answer = answer
+        self.embed_calls = 0
+        self.embedded_texts = 0
+        self.generate_calls = 0
+        self._lock = threading.Lock()
+
+    def embed_content(self, model: str, contents: Union[str, List[str]], config=None):
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        with self._lock:
+            self.embed_calls += 1
+            self.embedded_texts += len(texts)
+        time.sleep((self.embed_latency_ms + self.embed_latency_per_text_ms * len(texts)) / 1000)
+
+        dim = getattr(config, "output_dimensionality", None) or DEFAULT_DIMENSION
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=hash_embedding(text, dim))
+                                           for text in texts])
+
+    def generate_content(self, model: str, contents, config=None):
+        with self._lock:
+            self.generate_calls += 1
+        time.sleep(self.generate_latency_ms / 1000)
+        return SimpleNamespace(text=self.answer)
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator:
+        with self._lock:
+            self.generate_calls += 1
+        # Spread the latency over the words, like tokens arriving one by one
+        words = self.answer.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.generate_latency_ms / 1000 / len(words))
+            yield SimpleNamespace(text=word if i == 0 else " " + word)
+
+
+class FakeVertexClient:
+    """
+    Local stand-in for genai.Client(vertexai=True, ...)
+
+    Args:
+        embed_latency_ms: Time per embed_content request
+        embed_latency_per_text_ms: Extra time per text in the request
+        generate_latency_ms: Time per generate_content request
+        answer: Text every generation returns
+    """
+
+    def __init__(self, embed_latency_ms: float = 50.0, embed_latency_per_text_ms: float = 0.1,
+                 generate_latency_ms: float = 400.0,
+                 answer: str = "Based on the sources, here is a short answer [Source 1]."):
+        self.models = _FakeModels(embed_latency_ms, embed_latency_per_text_ms,
+                                  generate_latency_ms, answer)
+
+    def stats(self) -> Dict:
+        return {
+            "embed_calls": self.models.embed_calls,
+            "embedded_texts": self.models.embedded_texts,
+            "generate_calls": self.models.generate_calls,
+        }
+
+    def reset_stats(self) -> None:
+        """Forget calls made so far (e.g. warm-up calls before timing)"""
+        with self.models._lock:
+            self.models.embed_calls = self.models.embedded_texts = self.models.generate_calls = 0
@@ -0,0 +1,271 @@
+"""
+WCC AI Learning Series - Session 3: Pipeline Benchmarks
+End-to-end performance of rag_demo and RAGPipeline without calling Vertex AI
+
+Vertex AI is replaced by the local stand-in in fake_vertex.py (deterministic
+embeddings, configurable latency), so results only change when the code or
+the machine does. For each pipeline and collection size this measures:
+
+- chunking:   docs/sec and chunks/sec
+- embedding:  chunks/sec through the embedding engine (batched, concurrent)
+- ingest:     chunk + embed + store, end to end
+- search:     semantic search latency p50 / p95 / p99 (one query at a time)
+- rag:        rag_query latency p50 / p95 / p99 (search + generation)
+- qps:        searches per second with several queries in flight
+
+Every run uses a fresh temporary folder, so no real ChromaDB data is
+touched. Settings read from the environment (VECTOR_BACKEND, SEARCH_MODE,
+CHUNKER, RERANK, ...) apply as usual and are recorded with the results.
+With --output, results are also written as JSON for tracking regressions
+between commits.
+
+Run from the live-demo folder:
+    python benchmarks/run_benchmarks.py --sizes 100,1000 --output results.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import datetime
+import tempfile
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+LIVE_DEMO_DIR = os.path.dirname(BENCHMARKS_DIR)
+STARTER_DIR = os.path.join(os.path.dirname(LIVE_DEMO_DIR), "starter-template")
+sys.path.insert(0, LIVE_DEMO_DIR)
+sys.path.append(STARTER_DIR)  # The shared modules are identical copies, so either is fine
+
+import rag_demo
+from resources import registry
+from bench_chunking import WORDS, synthetic_blogs
+from fake_vertex import FakeVertexClient
+
+# Settings that change what is measured
+RECORDED_ENV = ["VECTOR_BACKEND", "SEARCH_MODE", "CHUNKER", "RERANK", "SNAPSHOT_PATH",
+                "EMBEDDING_WORKERS", "EMBEDDING_REQUESTS_PER_MINUTE"]
+
+
+def synthetic_questions(n: int, seed: int) -> List[str]:
+    """Distinct questions made of corpus words (so they miss the query caches)"""
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.choices(WORDS, k=rng.randint(4, 9)))} #{i}?" for i in range(n)]
+
+
+def latency_ms(fn: Callable[[str], object], queries: List[str]) -> Dict:
+    """Call fn once per query and summarize the latencies"""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"count": len(samples), "mean": float(np.mean(samples)),
+            "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def throughput(fn: Callable[[str], object], queries: List[str], concurrency: int) -> Dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fn, queries))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "queries": len(queries), "qps": len(queries) / elapsed}
+
+
+def quiet():
+    """Hide the pipelines' progress prints while timing"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+# ============================================================================
+# PIPELINES
+# ============================================================================
+
+def bench_rag_demo(n_docs: int, client: FakeVertexClient, args) -> Dict:
+    """Ingest n_docs into the live demo pipeline (rag_demo.py) and query it"""
+    registry.reset()  # New collection, indexes and caches in the current folder
+    rag_demo.set_client(client)
+    rag_demo.invalidate_query_caches()
+    blogs = list(synthetic_blogs(n_docs))
+
+    start = time.perf_counter()
+    chunks = list(rag_demo.iter_chunks(blogs))
+    chunk_seconds = time.perf_counter() - start
+
+    texts = [chunk["text"] for chunk in chunks]
+    # Untimed warm-up: builds the embedding engine and opens the embedding
+    # cache (a fresh SQLite file in this run's temporary folder), so the
+    # timing below covers embedding only. The warm-up text isn't in the corpus.
+    rag_demo.embed_texts(["benchmark warm-up"])
+    client.reset_stats()
+    embed_start = time.perf_counter()
+    embeddings, _, _ = rag_demo.embed_texts(texts)
+    embed_seconds = time.perf_counter() - embed_start
+
+    store_start = time.perf_counter()
+    with quiet():
+        rag_demo.write_chunks(chunks, embeddings)
+    store_seconds = time.perf_counter() - store_start
+    ingest_seconds = time.perf_counter() - start
+
+    k = args.k
+    return _result("rag_demo", n_docs, len(chunks), chunk_seconds, embed_seconds,
+                   store_seconds, ingest_seconds,
+                   search=lambda q: rag_demo.semantic_search(q, k=k),
+                   answer=lambda q: rag_demo.rag_query(q, k=k),
+                   args=args)
+
+
+def bench_starter(n_docs: int, client: FakeVertexClient, args) -> Dict:
+    """Ingest n_docs into the starter template's RAGPipeline and query it"""
+    from rag_pipeline import RAGPipeline
+
+    documents = [{"title": blog["title"], "content": blog["content"], "source": blog["url"]}
+                 for blog in synthetic_blogs(n_docs)]
+    with quiet():
+        rag = RAGPipeline(project_id="local", client=client)
+
+        start = time.perf_counter()
+        chunks = rag.chunk_documents(documents)
+        chunk_seconds = time.perf_counter() - start
+        embed_stats = rag.embed_and_store()
+        ingest_seconds = time.perf_counter() - start
+
+    # embed_and_store embeds and stores in one go; the engine times its part
+    embed_seconds = embed_stats.get("seconds", 0.0)
+    store_seconds = ingest_seconds - chunk_seconds - embed_seconds
+
+    # RAGPipeline prints as it goes (redirecting once, not per call, is thread-safe)
+    with quiet():
+        return _result("starter", n_docs, len(chunks), chunk_seconds, embed_seconds,
+                       store_seconds, ingest_seconds,
+                       search=lambda q: rag.search(q, k=args.k),
+                       answer=lambda q: rag.query(q, k=args.k),
+                       args=args)
+
+
+def _result(pipeline: str, n_docs: int, n_chunks: int, chunk_seconds: float,
+            embed_seconds: float, store_seconds: float, ingest_seconds: float,
+            search: Callable, answer: Callable, args) -> Dict:
+    """Time the query side and put everything in one result dict"""
+    return {
+        "pipeline": pipeline,
+        "docs": n_docs,
+        "chunks": n_chunks,
+        "chunking": {"seconds": chunk_seconds, "docs_per_sec": n_docs / chunk_seconds,
+                     "chunks_per_sec": n_chunks / chunk_seconds},
+        "embedding": {"seconds": embed_seconds, "chunks_per_sec": n_chunks / embed_seconds},
+        "store": {"seconds": store_seconds},
+        "ingest": {"seconds": ingest_seconds, "chunks_per_sec": n_chunks / ingest_seconds},
+        "search_latency_ms": latency_ms(search, synthetic_questions(args.queries, seed=1)),
+        "rag_latency_ms": latency_ms(answer, synthetic_questions(args.rag_queries, seed=2)),
+        "qps": throughput(search, synthetic_questions(args.queries, seed=3), args.concurrency),
+    }
+
+
+PIPELINES = {"rag_demo": bench_rag_demo, "starter": bench_starter}
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=LIVE_DEMO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pipelines: List[str], sizes: List[int], args) -> Dict:
+    results = []
+    cwd = os.getcwd()
+    # Import the text splitter and google.genai (which the embedding engines
+    # import lazily) now, so the first run isn't charged for them
+    list(rag_demo.iter_chunks(synthetic_blogs(1)))
+    from google.genai import types  # noqa: F401
+    for name in pipelines:
+        for n_docs in sizes:
+            client = FakeVertexClient(embed_latency_ms=args.embed_latency_ms,
+                                      embed_latency_per_text_ms=args.embed_latency_per_text_ms,
+                                      generate_latency_ms=args.generate_latency_ms)
+            with tempfile.TemporaryDirectory() as workdir:
+                os.chdir(workdir)  # Both pipelines keep their data in ./chroma_data
+                try:
+                    result = PIPELINES[name](n_docs, client, args)
+                finally:
+                    os.chdir(cwd)
+                    # ChromaDB reuses open databases by path, and every run's path is ./chroma_data
+                    SharedSystemClient.clear_system_cache()
+            result["vertex_calls"] = client.stats()
+            results.append(result)
+            print_result(result)
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {**vars(args),
+                         "env": {name: os.getenv(name) for name in RECORDED_ENV if os.getenv(name)}},
+        },
+        "results": results,
+    }
+
+
+def print_result(result: Dict) -> None:
+    search = result["search_latency_ms"]
+    rag = result["rag_latency_ms"]
+    print(f"  {result['pipeline']:<9} {result['docs']:>7,} docs {result['chunks']:>8,} chunks | "
+          f"chunk {result['chunking']['docs_per_sec']:>8,.0f} docs/s | "
+          f"embed {result['embedding']['chunks_per_sec']:>7,.0f} chunks/s | "
+          f"ingest {result['ingest']['seconds']:>6.1f}s | "
+          f"search p50/p95/p99 {search['p50']:.0f}/{search['p95']:.0f}/{search['p99']:.0f} ms | "
+          f"rag p50 {rag['p50']:.0f} ms | {result['qps']['qps']:>6,.1f} qps")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the RAG pipelines against a local Vertex AI stand-in")
+    parser.add_argument("--pipelines", default="rag_demo,starter",
+                        help=f"Comma-separated, from: {', '.join(PIPELINES)}")
+    parser.add_argument("--sizes", default="100,1000", help="Comma-separated collection sizes (documents)")
+    parser.add_argument("--queries", type=int, default=100, help="Searches timed per size")
+    parser.add_argument("--rag-queries", type=int, default=20, help="RAG questions timed per size")
+    parser.add_argument("--concurrency", type=int, default=8, help="Searches in flight for the QPS test")
+    parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query")
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="Fake embed_content latency")
+    parser.add_argument("--embed-latency-per-text-ms", type=float, default=0.1,
+                        help="Extra fake latency per text embedded")
+    parser.add_argument("--generate-latency-ms", type=float, default=400.0,
+                        help="Fake generate_content latency")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    pipelines = [name.strip() for name in args.pipelines.split(",") if name.strip()]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"Unknown pipeline(s): {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print(f"\n⏱️  Benchmarking {', '.join(pipelines)} at {', '.join(f'{s:,}' for s in sizes)} documents")
+    print("-" * 70)
+    report = run(pipelines, sizes, args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
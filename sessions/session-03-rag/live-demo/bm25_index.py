@@ -0,0 +1,145 @@
+"""
+WCC AI Learning Series - Session 3: BM25 Lexical Index
+Keyword search to complement embeddings
+
+Embeddings capture meaning, but they are weak at exact terms: names like
+"Django REST Framework" or details like "Tuesday 7pm". BM25 is the classic
+keyword-ranking formula used by search engines - it scores a chunk by how
+often it contains the query's words, giving rare words more weight.
+
+Hybrid search runs both searches and merges the two rankings with
+Reciprocal Rank Fusion (RRF): each result scores 1 / (60 + rank) in every
+list it appears in, so chunks ranked well by both rise to the top.
+"""
+
+import os
+import re
+import json
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens ("Tuesday 7pm" -> ["tuesday", "7pm"])"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring
+
+    Args:
+        k1: Term frequency saturation (higher = repeated words count more)
+        b: Length normalisation (0 = none, 1 = full)
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._doc_terms: Dict[str, Dict[str, int]] = {}  # id -> {term: count}
+        self._doc_len: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {id: count}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index texts (re-adding an id replaces it)"""
+        self.delete([i for i in ids if i in self._doc_terms])
+        for chunk_id, text in zip(ids, texts):
+            terms = Counter(tokenize(text))
+            self._doc_terms[chunk_id] = dict(terms)
+            length = sum(terms.values())
+            self._doc_len[chunk_id] = length
+            self._total_len += length
+            for term, count in terms.items():
+                self._postings[term][chunk_id] = count
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove ids from the index (unknown ids are ignored)"""
+        for chunk_id in ids:
+            terms = self._doc_terms.pop(chunk_id, None)
+            if terms is None:
+                continue
+            self._total_len -= self._doc_len.pop(chunk_id)
+            for term in terms:
+                postings = self._postings[term]
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank chunks by BM25 score for a query
+
+        Returns:
+            Up to k (id, score) pairs, best first (only chunks sharing a term)
+        """
+        n = len(self._doc_terms)
+        if n == 0:
+            return []
+        avg_len = self._total_len / n
+
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            # Rare terms get a higher inverse document frequency
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, count in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                scores[chunk_id] += idf * count * (self.k1 + 1) / (count + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def clear(self) -> None:
+        self.__init__(self.k1, self.b)
+
+    def save(self, path: str) -> None:
+        """Save to a JSON file (postings are rebuilt on load)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_terms": self._doc_terms}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index saved with save() (or an empty one if the file doesn't exist)"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["k1"], data["b"])
+        for chunk_id, terms in data["doc_terms"].items():
+            index._doc_terms[chunk_id] = terms
+            length = sum(terms.values())
+            index._doc_len[chunk_id] = length
+            index._total_len += length
+            for term, count in terms.items():
+                index._postings[term][chunk_id] = count
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge several rankings of ids into one
+
+    Args:
+        rankings: Lists of ids, best first
+        k: Damping constant (60 is the value from the original RRF paper)
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,237 @@
+"""
+WCC AI Learning Series - Session 3: Sentence Chunker
+Token-sized chunks that end on sentence boundaries, chunked in parallel
+
+RecursiveCharacterTextSplitter measures chunks in characters, but the
+embedding model's limits are in tokens - and it runs one document at a
+time. This chunker:
+
+- Splits text into sentences (and list items / lines), never mid-sentence
+  unless a single sentence is longer than a whole chunk
+- Packs sentences into chunks of up to `chunk_tokens` tokens, repeating the
+  last sentences of a chunk (up to `overlap_tokens`) at the start of the next
+- Keeps the original text between sentences, so chunks read naturally
+- Chunks large corpora on a process pool, yielding chunks in input order
+
+How tokens are counted is up to the caller (see make_token_counter):
+- "estimate" (default): ~4 characters per token. A heuristic - fast and
+  dependency-free, but for English prose it sizes chunks much like a
+  character splitter would, and it can be off for code, URLs or other
+  languages
+- a Gemini model name (e.g. "gemini-2.5-flash"): the model's real
+  tokenizer, run locally with google.genai's LocalTokenizer (needs the
+  sentencepiece package and downloads the tokenizer once). Vertex AI
+  doesn't publish the text-embedding-004 tokenizer, so Gemini's is the
+  closest real one available
+
+Chunks have the same shape as rag_demo.chunk_documents:
+    {'text': ..., 'metadata': {'title', 'date', 'date_num', 'url', 'chunk_id', 'total_chunks'}}
+    ('date_num' only if the date is in ISO format)
+"""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from embedding_engine import estimate_tokens
+from metadata_filters import date_metadata
+
+# Candidate sentence ends: . ! ? or a line break (paragraphs, list items),
+# plus the whitespace after them. Matching on these characters first is much
+# faster than a look-behind tried at every position.
+_BOUNDARY_RE = re.compile(r"[.!?\n]\s*")
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """(start, end) positions of each sentence or line in text"""
+    spans = []
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        position = match.start()
+        if text[position] == "\n":
+            end = position
+            while end > start and text[end - 1] in " \t\r\f\v":
+                end -= 1
+        elif match.end() == position + 1 and match.end() < len(text):
+            continue  # No whitespace after it ("3.9", "python.org"): not a sentence end
+        else:
+            end = position + 1
+        if end > start:
+            spans.append((start, end))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+@lru_cache(maxsize=None)
+def make_token_counter(tokenizer: str = "estimate") -> Callable[[str], int]:
+    """
+    Token counting function for a tokenizer name (built once per process)
+
+    Args:
+        tokenizer: "estimate" (~4 characters per token) or a Gemini model
+                   name to count with its real tokenizer
+
+    Raises:
+        ImportError: If a real tokenizer is asked for without sentencepiece
+    """
+    if tokenizer == "estimate":
+        return estimate_tokens
+    from google.genai.local_tokenizer import LocalTokenizer
+    local_tokenizer = LocalTokenizer(model_name=tokenizer)
+    return lambda text: local_tokenizer.count_tokens(text).total_tokens
+
+
+def _cut_by_characters(text: str, start: int, end: int, chunk_tokens: int,
+                       count_tokens: Callable[[str], int]) -> List[Tuple[int, int]]:
+    """Cut a span into the longest pieces of at most chunk_tokens (for words longer than a chunk)"""
+    pieces = []
+    while end - start > 1 and count_tokens(text[start:end]) > chunk_tokens:
+        # Binary search for the longest prefix that fits (at least one character)
+        low, high = start + 1, end - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(text[start:middle]) <= chunk_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        pieces.append((start, low))
+        start = low
+    pieces.append((start, end))
+    return pieces
+
+
+def _split_long(text: str, start: int, end: int, chunk_tokens: int,
+                count_tokens: Callable[[str], int]) -> List[Tuple[int, int]]:
+    """Cut a sentence that is longer than a chunk at word boundaries (no piece over chunk_tokens)"""
+    pieces = []
+    piece_start = start
+    last_space = None
+    for match in re.finditer(r"\s+", text[start:end]):
+        position = start + match.start()
+        if count_tokens(text[piece_start:position]) > chunk_tokens and last_space:
+            pieces.extend(_cut_by_characters(text, piece_start, last_space[0], chunk_tokens, count_tokens))
+            piece_start = last_space[1]
+        last_space = (position, start + match.end())
+    pieces.extend(_cut_by_characters(text, piece_start, end, chunk_tokens, count_tokens))
+    return pieces
+
+
+def chunk_text(text: str, chunk_tokens: int = 100, overlap_tokens: int = 12,
+               count_tokens: Callable[[str], int] = estimate_tokens) -> List[str]:
+    """
+    Split text into chunks of whole sentences
+
+    Args:
+        text: Text to split
+        chunk_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens of trailing sentences repeated in the next chunk
+        count_tokens: Token counter (default: ~4 characters per token,
+                      see make_token_counter)
+
+    Returns:
+        List of chunk strings
+    """
+    if count_tokens is estimate_tokens:
+        # Same formula as estimate_tokens, without copying the text
+        def span_tokens(start: int, end: int) -> int:
+            return (end - start) // 4 + 1
+    else:
+        def span_tokens(start: int, end: int) -> int:
+            return count_tokens(text[start:end])
+
+    sentences = []
+    for start, end in split_sentences(text):
+        if span_tokens(start, end) > chunk_tokens:
+            sentences.extend(_split_long(text, start, end, chunk_tokens, count_tokens))
+        else:
+            sentences.append((start, end))
+
+    chunks = []
+    i = 0
+    while i < len(sentences):
+        # Add sentences until the next one would overflow the chunk
+        j = i + 1
+        while j < len(sentences) and span_tokens(sentences[i][0], sentences[j][1]) <= chunk_tokens:
+            j += 1
+        chunks.append(text[sentences[i][0]:sentences[j - 1][1]])
+        if j == len(sentences):
+            break
+
+        # Start the next chunk with the trailing sentences that fit in the overlap
+        next_start = j
+        while (next_start - 1 > i and
+               span_tokens(sentences[next_start - 1][0], sentences[j - 1][1]) <= overlap_tokens):
+            next_start -= 1
+        i = next_start
+    return chunks
+
+
+def chunk_blog(blog: Dict, chunk_tokens: int = 100, overlap_tokens: int = 12,
+               tokenizer: str = "estimate") -> List[Dict]:
+    """Chunk one blog post, with the same text and metadata layout as chunk_documents"""
+    full_text = f"Title: {blog['title']}\n\n{blog['content']}"
+    chunks = chunk_text(full_text, chunk_tokens, overlap_tokens, make_token_counter(tokenizer))
+    return [{
+        "text": chunk,
+        "metadata": {
+            "title": blog["title"],
+            "date": blog["date"],
+            **date_metadata(blog["date"]),  # date_num, for date range filters
+            "url": blog["url"],
+            "chunk_id": i,
+            "total_chunks": len(chunks)
+        }
+    } for i, chunk in enumerate(chunks)]
+
+
+def _chunk_batch(blogs: List[Dict], chunk_tokens: int, overlap_tokens: int,
+                 tokenizer: str) -> List[Dict]:
+    # Runs in a worker process
+    chunks = []
+    for blog in blogs:
+        chunks.extend(chunk_blog(blog, chunk_tokens, overlap_tokens, tokenizer))
+    return chunks
+
+
+def iter_chunks_parallel(blogs: Iterable[Dict], chunk_tokens: int = 100, overlap_tokens: int = 12,
+                         workers: int = 0, batch_size: int = 256,
+                         tokenizer: str = "estimate") -> Iterator[Dict]:
+    """
+    Chunk blog posts on a process pool, yielding chunks in input order
+
+    Only a few batches are in flight at once, so a generator of millions of
+    blogs is never read into memory. Inputs that fit in a single batch are
+    chunked in this process (starting a pool would cost more than it saves).
+
+    Args:
+        blogs: Iterable of blog post dictionaries
+        chunk_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens repeated between neighbouring chunks
+        workers: Worker processes (0 = one per CPU)
+        batch_size: Blogs sent to a worker at a time
+        tokenizer: How tokens are counted (see make_token_counter)
+    """
+    blogs = iter(blogs)
+    batches = iter(lambda: list(islice(blogs, batch_size)), [])
+    first_batches = list(islice(batches, 2))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(first_batches) < 2:
+        for batch in chain(first_batches, batches):
+            yield from _chunk_batch(batch, chunk_tokens, overlap_tokens, tokenizer)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in chain(first_batches, batches):
+            # Keep every worker busy, with at most 2 batches per worker in flight
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(_chunk_batch, batch, chunk_tokens, overlap_tokens, tokenizer))
+        while pending:
+            yield from pending.popleft().result()
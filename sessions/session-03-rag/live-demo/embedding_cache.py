@@ -0,0 +1,159 @@
+"""
+WCC AI Learning Series - Session 3: Embedding Cache
+Persistent cache so unchanged chunks are never embedded twice
+
+Every embedding costs an API call. If a chunk's text hasn't changed, its
+embedding hasn't either - so we store each embedding in SQLite, keyed by a
+hash of (model name, output dimensionality, chunk text).
+
+- Re-running setup only sends new or changed chunks to Vertex AI
+- The cache is size-bounded: least recently used entries are evicted
+- Several processes (the service, an ingest worker) can share one file:
+  the size is counted in SQLite when evicting, and lookups only read
+  (last-used times are written in batches, not on every hit)
+- Hit/miss counters show how many embeddings (and API calls) were saved
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import List, Dict, Optional
+
+# SQLite limits the number of "?" parameters per statement
+_SQL_BATCH = 500
+
+# Last-used times of hits are written once this many are pending, or this
+# many seconds after the last write (and always before evicting)
+TOUCH_BATCH = 1000
+TOUCH_INTERVAL = 30.0
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache with LRU eviction
+
+    Args:
+        path: SQLite database file
+        model: Embedding model name (part of the cache key)
+        output_dimensionality: Embedding size (part of the cache key)
+        max_entries: Maximum embeddings kept before evicting the least recently used
+    """
+
+    def __init__(self, path: str, model: str, output_dimensionality: int,
+                 max_entries: int = 100_000):
+        self.path = path
+        self.model = model
+        self.output_dimensionality = output_dimensionality
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._touched: Dict[str, float] = {}  # Hits whose last_used isn't written yet
+        self._last_touch_flush = time.monotonic()
+
+    def key(self, text: str) -> str:
+        """Cache key: hash of model, dimensionality and text"""
+        raw = f"{self.model}\x00{self.output_dimensionality}\x00{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts
+
+        Returns:
+            One entry per text: the cached embedding, or None on a miss
+        """
+        keys = [self.key(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for k, blob in rows:
+                    found[k] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            # Mark hits as recently used (written later, in a batch)
+            now = time.time()
+            self._touched.update((k, now) for k in found)
+            if (len(self._touched) >= TOUCH_BATCH
+                    or time.monotonic() - self._last_touch_flush >= TOUCH_INTERVAL):
+                self._flush_touched()
+                self._conn.commit()
+
+            results = [found.get(k) for k in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        """Store embeddings, evicting least recently used entries if over the limit"""
+        now = time.time()
+        rows = [(self.key(text), np.asarray(emb, dtype=np.float32).tobytes(), now)
+                for text, emb in zip(texts, embeddings)]
+
+        with self._lock:
+            self._flush_touched()  # So recent hits aren't evicted as unused
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+
+            # Counted inside this write transaction, so rows added by other
+            # processes sharing the file are included
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (overflow,))
+                self.evictions += overflow
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write pending last-used times (caller holds the lock and commits)"""
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+        self._last_touch_flush = time.monotonic()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Hit/miss counters since this cache was opened"""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._count()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "evictions": self.evictions,
+        }
+
+    def clear(self) -> None:
+        """Delete every cached embedding"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched.clear()
@@ -0,0 +1,249 @@
+"""
+WCC AI Learning Series - Session 3: Embedding Engine
+Concurrent, rate-aware embedding generation
+
+Sending small batches to `embed_content` one after another is easy to read,
+but re-indexing a large corpus that way takes hours. This engine:
+
+- Runs several requests at once on a bounded thread pool
+- Packs batches up to the API's per-request limits (texts and tokens),
+  halving the batch size if a request is rejected as too large (other
+  400 errors, like a bad model name, are raised straight away)
+- Rate-limits requests with a token bucket
+- Retries transient errors (429 / 5xx) with jittered exponential backoff
+- Returns embeddings in the same order as the input texts
+
+Usage:
+    engine = EmbeddingEngine(client, "text-embedding-004")
+    embeddings, stats = engine.embed(texts)
+    print(stats["chunks_per_sec"])
+"""
+
+import re
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Tuple
+
+
+# Vertex AI text-embedding-004 limits: 250 texts and 20,000 tokens per request
+MAX_TEXTS_PER_REQUEST = 250
+MAX_TOKENS_PER_REQUEST = 20000
+
+# Status codes worth retrying (rate limited / server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# How a 400 error says the request was over a size limit (worth splitting)
+BATCH_TOO_LARGE_PATTERN = re.compile(
+    r"token count|tokens? limit|too (?:large|long|many)|exceed|payload size|request size",
+    re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+
+    Tokens refill continuously at `rate` per second, up to `capacity`.
+    Each request takes one token and waits if none are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class _BatchTooLarge(Exception):
+    """Raised when the API rejects a batch that can still be split"""
+
+
+def is_batch_too_large(error: Exception) -> bool:
+    """True for a 400 error whose message says the payload or token limit was exceeded"""
+    message = getattr(error, "message", None) or str(error)
+    return getattr(error, "code", None) == 400 and bool(BATCH_TOO_LARGE_PATTERN.search(message))
+
+
+# ============================================================================
+# EMBEDDING ENGINE
+# ============================================================================
+
+class EmbeddingEngine:
+    """
+    Generate embeddings concurrently with batching, rate limiting and retries
+
+    Args:
+        client: genai.Client used for embed_content
+        model: Embedding model name
+        output_dimensionality: Size of each embedding
+        max_workers: Maximum requests in flight at once
+        max_batch_size: Maximum texts per request
+        max_batch_tokens: Maximum (estimated) tokens per request
+        requests_per_minute: Request rate limit shared by all workers
+        max_retries: Retries per request for transient errors
+        backoff_base: First backoff delay in seconds (doubles per retry)
+        backoff_max: Longest backoff delay in seconds
+    """
+
+    def __init__(self, client, model: str, output_dimensionality: int = 10,
+                 max_workers: int = 4,
+                 max_batch_size: int = MAX_TEXTS_PER_REQUEST,
+                 max_batch_tokens: int = MAX_TOKENS_PER_REQUEST,
+                 requests_per_minute: float = 600,
+                 max_retries: int = 5,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0):
+        self.client = client
+        self.model = model
+        self.output_dimensionality = output_dimensionality
+        self.max_workers = max_workers
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(rate=requests_per_minute / 60.0,
+                                        capacity=max(1, max_workers))
+
+        # Current batch size limit - halves when the API rejects a batch, then
+        # grows back gradually, but never above the smallest rejected size.
+        # Shared by concurrent embed() calls, so only changed under the lock.
+        self._batch_limit = max_batch_size
+        self._batch_ceiling = max_batch_size
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str],
+              max_batch_size: Optional[int] = None) -> Tuple[List[List[float]], Dict]:
+        """
+        Embed texts, returning one embedding per text in input order
+
+        Args:
+            texts: List of text strings to embed
+            max_batch_size: Optional lower cap on texts per request for this call
+
+        Returns:
+            (embeddings, stats): one embedding (list of floats) per text, and
+            this call's chunks, requests, retries, seconds, chunks_per_sec and
+            batch_limit (several calls can run on the engine at once, so the
+            stats are returned rather than kept on it)
+        """
+        start_time = time.perf_counter()
+        # Counted per call (embed() may run on several threads at once)
+        stats = {"requests": 0, "retries": 0}
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        # Batches that failed as "too large" are split and retried first
+        retry_queue = deque()
+        next_index = 0
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while next_index < len(texts) or retry_queue or in_flight:
+                # Keep up to max_workers requests running
+                while len(in_flight) < self.max_workers and (retry_queue or next_index < len(texts)):
+                    if retry_queue:
+                        start, end = retry_queue.popleft()
+                    else:
+                        batch_limit = self._batch_limit
+                        limit = min(batch_limit, max_batch_size or batch_limit)
+                        start, end = next_index, self._next_batch_end(texts, next_index, limit)
+                        next_index = end
+                    future = pool.submit(self._embed_batch, texts[start:end], stats)
+                    in_flight[future] = (start, end)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end = in_flight.pop(future)
+                    try:
+                        results[start:end] = future.result()
+                        self._grow_batch_limit()
+                    except _BatchTooLarge:
+                        # Split in half and lower the limit for new batches
+                        middle = start + (end - start) // 2
+                        self._shrink_batch_limit(end - start)
+                        retry_queue.extend([(start, middle), (middle, end)])
+
+        elapsed = time.perf_counter() - start_time
+        return results, {
+            "chunks": len(texts),
+            "requests": stats["requests"],
+            "retries": stats["retries"],
+            "seconds": elapsed,
+            "chunks_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+            "batch_limit": self._batch_limit,
+        }
+
+    def _next_batch_end(self, texts: List[str], start: int, limit: int) -> int:
+        """Pack texts from `start` until the text or token limit is reached"""
+        end = start
+        tokens = 0
+        while end < len(texts) and end - start < limit:
+            text_tokens = estimate_tokens(texts[end])
+            if end > start and tokens + text_tokens > self.max_batch_tokens:
+                break
+            tokens += text_tokens
+            end += 1
+        return end
+
+    def _grow_batch_limit(self) -> None:
+        with self._lock:
+            if self._batch_limit < self._batch_ceiling:
+                self._batch_limit = min(self._batch_ceiling, self._batch_limit + max(1, self._batch_limit // 4))
+
+    def _shrink_batch_limit(self, rejected_size: int) -> None:
+        with self._lock:
+            self._batch_ceiling = min(self._batch_ceiling, rejected_size - 1)
+            self._batch_limit = max(1, min(self._batch_limit, rejected_size // 2))
+
+    def _embed_batch(self, batch: List[str], stats: Dict[str, int]) -> List[List[float]]:
+        """Send one embed_content request, retrying transient errors (counted in stats)"""
+        # Imported here so importing this module stays fast (google.genai is slow to load)
+        from google.genai import types
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            with self._lock:
+                stats["requests"] += 1
+            try:
+                response = self.client.models.embed_content(
+                    model=self.model,
+                    contents=batch,
+                    config=types.EmbedContentConfig(output_dimensionality=self.output_dimensionality),
+                )
+                return [emb.values for emb in response.embeddings]
+            except Exception as e:
+                status = getattr(e, "code", None)
+                if len(batch) > 1 and is_batch_too_large(e):
+                    raise _BatchTooLarge() from e
+                retryable = status in RETRYABLE_STATUS_CODES or isinstance(e, (ConnectionError, TimeoutError))
+                if not retryable or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    stats["retries"] += 1
+                # Full jitter: sleep a random time up to the exponential backoff
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
@@ -0,0 +1,134 @@
+"""
+WCC AI Learning Series - Session 3: Incremental Ingest
+Stable chunk IDs and delta updates for the vector database
+
+Naming chunks by position (chunk_0, chunk_1, ...) means adding one document
+shifts every id, so the only safe update is a full rebuild. Instead, each
+chunk gets a deterministic id built from:
+
+    <source hash>:<chunk index>:<content hash>
+
+- source hash:  which document the chunk came from (URL, or source + title)
+- chunk index:  position within that document
+- content hash: the chunk text itself
+
+Re-ingesting then becomes a diff against what is already stored:
+- ids that don't exist yet are new or changed chunks -> embed and upsert
+- ids that exist already are unchanged -> skip
+- stored ids that are no longer produced -> stale chunks -> delete
+"""
+
+import hashlib
+from typing import List, Dict, Set
+
+# Upsert/delete in batches (ChromaDB limits the size of a single call)
+WRITE_BATCH_SIZE = 5000
+
+
+def _short_hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def source_key(metadata: Dict) -> str:
+    """Identify a chunk's source document: its URL, or source + title"""
+    if metadata.get("url"):
+        return metadata["url"]
+    return f"{metadata.get('source', '')}/{metadata.get('title', '')}"
+
+
+def make_chunk_id(source: str, chunk_index: int, text: str) -> str:
+    """Deterministic chunk id from source, position and content"""
+    return f"{_short_hash(source)}:{chunk_index}:{_short_hash(text)}"
+
+
+def source_of_id(chunk_id: str) -> str:
+    """Source hash part of a chunk id ('' for ids in another format)"""
+    parts = chunk_id.split(":")
+    return parts[0] if len(parts) == 3 else ""
+
+
+def chunk_id_from_metadata(metadata: Dict) -> str:
+    """Rebuild a stored chunk's id from its metadata ('' if it has no stable id)"""
+    if "source_id" not in metadata or "content_hash" not in metadata:
+        return ""
+    return f"{metadata['source_id']}:{metadata['chunk_id']}:{metadata['content_hash']}"
+
+
+def assign_chunk_ids(chunks: List[Dict]) -> List[str]:
+    """
+    Compute stable ids for chunks
+
+    Also records `source_id` and `content_hash` in each chunk's metadata,
+    so stored chunks can be filtered by source.
+
+    Args:
+        chunks: Chunks from chunk_documents ({'text', 'metadata'})
+
+    Returns:
+        One id per chunk
+    """
+    ids = []
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        chunk_id = make_chunk_id(source_key(metadata), metadata["chunk_id"], chunk["text"])
+        metadata["source_id"] = source_of_id(chunk_id)
+        metadata["content_hash"] = chunk_id.rsplit(":", 1)[1]
+        ids.append(chunk_id)
+    return ids
+
+
+def plan_ingest(existing_ids: Set[str], ids: List[str], prune: bool = False) -> Dict:
+    """
+    Work out what needs to change in the vector database
+
+    Args:
+        existing_ids: Ids already stored in the collection
+        ids: Ids of the chunks being ingested (from assign_chunk_ids)
+        prune: If True, the chunks are the whole corpus - delete everything
+               else, including chunks from sources that disappeared.
+               If False, only replace stale chunks of the sources being ingested.
+
+    Returns:
+        Dict with 'new' (indices of chunks to embed and upsert),
+        'unchanged' (count) and 'delete' (ids to remove)
+    """
+    wanted = set(ids)
+    seen = set()
+    new = []
+    for i, chunk_id in enumerate(ids):
+        if chunk_id not in existing_ids and chunk_id not in seen:
+            new.append(i)
+        seen.add(chunk_id)
+
+    if prune:
+        delete = [i for i in existing_ids if i not in wanted]
+    else:
+        sources = {source_of_id(i) for i in ids}
+        # Ids in another format (e.g. old positional chunk_N ids) are always stale
+        delete = [i for i in existing_ids
+                  if i not in wanted and (source_of_id(i) in sources or not source_of_id(i))]
+
+    return {
+        "new": new,
+        "unchanged": len(seen) - len(new),
+        "delete": sorted(delete),
+    }
+
+
+def existing_chunk_ids(collection) -> Set[str]:
+    """All ids currently stored in a ChromaDB collection"""
+    return set(collection.get(include=[])["ids"])
+
+
+def apply_ingest(collection, ids: List[str], documents: List[str], metadatas: List[Dict],
+                 embeddings: List[List[float]], delete_ids: List[str]) -> None:
+    """Upsert new/changed chunks and delete stale ones, in batches"""
+    for i in range(0, len(ids), WRITE_BATCH_SIZE):
+        collection.upsert(
+            ids=ids[i:i + WRITE_BATCH_SIZE],
+            documents=documents[i:i + WRITE_BATCH_SIZE],
+            metadatas=metadatas[i:i + WRITE_BATCH_SIZE],
+            embeddings=embeddings[i:i + WRITE_BATCH_SIZE],
+        )
+    for i in range(0, len(delete_ids), WRITE_BATCH_SIZE):
+        collection.delete(ids=delete_ids[i:i + WRITE_BATCH_SIZE])
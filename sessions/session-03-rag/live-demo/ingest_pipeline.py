@@ -0,0 +1,233 @@
+"""
+WCC AI Learning Series - Session 3: Streaming Ingest Pipeline
+load → chunk → embed → store, without holding the corpus in memory
+
+demo_setup() builds every chunk and every embedding in memory before a
+single write - fine for 5 blog posts, impossible for millions of chunks.
+This pipeline streams instead:
+
+- Each stage runs in its own thread, connected by bounded queues, so a
+  slow stage applies back-pressure instead of filling up RAM
+- Chunks are written to the vector database in fixed-size batches
+- After every batch a checkpoint records how many chunks are stored;
+  after a crash, the next run skips straight to that point
+
+Resuming relies on chunking being deterministic and on stable chunk ids
+(see incremental_ingest.py): re-storing a batch that was written just
+before a crash is a harmless upsert.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Marks the end of a stream between stages
+_DONE = object()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Stream documents from a JSON Lines file (one document per line)"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def source_fingerprint(path: str) -> str:
+    """Identifies an input file: resolved path, size and modification time"""
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class StreamingIngestPipeline:
+    """
+    Bounded-memory ingest with resumable checkpoints
+
+    Args:
+        chunk_fn: Turns an iterable of documents into an iterator of chunks
+                  ({'text', 'metadata'}), e.g. rag_demo.iter_chunks
+        embed_fn: Embeds a list of texts, returning embeddings in the same order
+        store_fn: Writes a batch of chunks and their embeddings
+        batch_size: Chunks per embed/store batch
+        queue_size: Batches allowed to wait between stages
+        checkpoint_path: JSON file used to resume (None = no checkpointing)
+        fingerprint: Identifies the input and the ingest settings; a checkpoint
+                     written with a different fingerprint is ignored
+    """
+
+    def __init__(self, chunk_fn: Callable[[Iterable[Dict]], Iterator[Dict]],
+                 embed_fn: Callable[[List[str]], List[List[float]]],
+                 store_fn: Callable[[List[Dict], List[List[float]]], None],
+                 batch_size: int = 1000,
+                 queue_size: int = 4,
+                 checkpoint_path: Optional[str] = None,
+                 fingerprint: str = ""):
+        self.chunk_fn = chunk_fn
+        self.embed_fn = embed_fn
+        self.store_fn = store_fn
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.checkpoint_path = checkpoint_path
+        self.fingerprint = fingerprint
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    # ------------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------------
+
+    def load_checkpoint(self) -> int:
+        """Number of chunks already stored by a previous run (0 = start fresh)"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("fingerprint") != self.fingerprint:
+            return 0
+        return checkpoint.get("chunks_done", 0)
+
+    def _save_checkpoint(self, chunks_done: int) -> None:
+        if not self.checkpoint_path:
+            return
+        # Write to a temp file and rename, so a crash never leaves half a checkpoint
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "chunks_done": chunks_done,
+                       "updated": time.time()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self) -> None:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # ------------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Put with back-pressure; gives up if another stage failed"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _chunk_stage(self, documents: Iterable[Dict], skip: int, out: queue.Queue) -> None:
+        try:
+            batch = []
+            position = 0
+            for chunk in self.chunk_fn(documents):
+                position += 1
+                if position <= skip:
+                    continue  # Already stored by a previous run
+                batch.append(chunk)
+                if len(batch) == self.batch_size:
+                    if not self._put(out, batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(out, batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _DONE)
+
+    def _embed_stage(self, inp: queue.Queue, out: queue.Queue) -> None:
+        try:
+            while True:
+                batch = self._get(inp)
+                if batch is _DONE:
+                    break
+                embeddings = self.embed_fn([chunk["text"] for chunk in batch])
+                if not self._put(out, (batch, embeddings)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _DONE)
+
+    def _fail(self, error: BaseException) -> None:
+        self._errors.append(error)
+        self._stop.set()
+
+    # ------------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------------
+
+    def run(self, documents: Iterable[Dict], resume: bool = True,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Stream documents through chunk → embed → store
+
+        Args:
+            documents: Any iterable of documents (a generator keeps memory flat)
+            resume: Continue from the last checkpoint if there is one
+            progress: Optional callback, called with stats after every stored batch
+
+        Returns:
+            Stats dict: chunks stored this run, chunks skipped, seconds, chunks/sec
+        """
+        self._stop.clear()
+        self._errors = []
+        skip = self.load_checkpoint() if resume else 0
+        chunks_done = skip
+        stored = 0
+        start_time = time.perf_counter()
+
+        chunk_queue = queue.Queue(maxsize=self.queue_size)
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._chunk_stage, args=(documents, skip, chunk_queue), daemon=True),
+            threading.Thread(target=self._embed_stage, args=(chunk_queue, embed_queue), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Store stage runs here, so batches are written (and checkpointed) in order
+        try:
+            while True:
+                item = self._get(embed_queue)
+                if item is _DONE:
+                    break
+                batch, embeddings = item
+                self.store_fn(batch, embeddings)
+                chunks_done += len(batch)
+                stored += len(batch)
+                self._save_checkpoint(chunks_done)
+                if progress:
+                    progress(self._stats(stored, skip, start_time))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        self.clear_checkpoint()
+        return self._stats(stored, skip, start_time)
+
+    @staticmethod
+    def _stats(stored: int, skipped: int, start_time: float) -> Dict:
+        elapsed = time.perf_counter() - start_time
+        return {
+            "chunks_stored": stored,
+            "chunks_skipped": skipped,
+            "seconds": elapsed,
+            "chunks_per_sec": stored / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,210 @@
+"""
+WCC AI Learning Series - Session 3: Query Caches
+Skip repeated work for repeated questions
+
+Two tiers:
+1. QueryEmbeddingCache - exact match: the same question text never has to be
+   embedded twice (LRU, with a time-to-live)
+2. SemanticAnswerCache - near match: if a new question's embedding is very
+   close (cosine similarity above a threshold) to one we already answered,
+   return that answer and its sources instead of calling Gemini again.
+   Small embeddings can't be trusted for this: with 10 dimensions, unrelated
+   questions can score above 0.98. Below `min_dimensions`, only the
+   same question (after normalize_question) reuses an answer.
+
+Both tiers are cleared whenever the collection changes, and answers are
+stored with the collection version they were built from (see
+rag_demo.sync_collection_version), so cached answers never refer to stale
+content - even after another process wrote to the collection.
+"""
+
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a time-to-live
+
+    Args:
+        max_entries: Entries kept before evicting the least recently used
+        ttl: Seconds an entry stays valid (None = forever)
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._data[key]  # Expired
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._data),
+        }
+
+
+class QueryEmbeddingCache(LRUCache):
+    """Exact-match cache of query embeddings, keyed by (model, dimensionality, text)"""
+
+    def __init__(self, model: str, output_dimensionality: int,
+                 max_entries: int = 1024, ttl: Optional[float] = 3600):
+        super().__init__(max_entries, ttl)
+        self.model = model
+        self.output_dimensionality = output_dimensionality
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        return self.get((self.model, self.output_dimensionality, text))
+
+    def put_embedding(self, text: str, embedding: List[float]) -> None:
+        self.put((self.model, self.output_dimensionality, text), embedding)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of RAG answers, looked up by embedding similarity
+
+    Args:
+        threshold: Minimum cosine similarity for a cached answer to be reused
+        max_entries: Answers kept before evicting the oldest
+        ttl: Seconds an answer stays valid (None = forever)
+        min_dimensions: Smallest embedding size for which similar questions
+                        share answers; smaller embeddings only match the
+                        same normalized question text
+    """
+
+    def __init__(self, threshold: float = 0.98, max_entries: int = 1000,
+                 ttl: Optional[float] = 3600, min_dimensions: int = 256):
+        self.threshold = threshold
+        self.min_dimensions = min_dimensions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)  # Unit-length question embeddings
+        self._entries: List[Dict] = []  # {'question', 'k', 'scope', 'result', 'created'}
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding: List[float], k: int, scope: Hashable = None,
+               question: str = "") -> Optional[Dict]:
+        """
+        Find a cached answer for a question embedding
+
+        Args:
+            embedding: Embedding of the new question
+            k: Number of chunks the answer must have been built from
+            scope: Anything else the answer depended on (e.g. search filters
+                   and the collection version)
+            question: Text of the question (needed below min_dimensions)
+
+        Returns:
+            The cached result dict, or None
+        """
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if len(embedding) < self.min_dimensions:
+                # Too few dimensions to tell questions apart: same question only
+                key = normalize_question(question)
+                candidates = [i for i in range(len(self._entries) - 1, -1, -1)
+                              if self._entries[i]["question"] == key]
+            else:
+                query = self._normalize(embedding)
+                similarities = self._vectors @ query
+                order = np.argsort(-similarities)
+                candidates = order[:np.count_nonzero(similarities >= self.threshold)]
+            for i in candidates:
+                if self._entries[i]["k"] == k and self._entries[i]["scope"] == scope:
+                    self.hits += 1
+                    return self._entries[i]["result"]
+            self.misses += 1
+            return None
+
+    def store(self, embedding: List[float], k: int, result: Dict, scope: Hashable = None,
+              question: str = "") -> None:
+        """Remember the answer for a question embedding (and its text)"""
+        with self._lock:
+            vector = self._normalize(embedding)[None, :]
+            if not self._entries:
+                self._vectors = vector
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+            self._entries.append({"question": normalize_question(question),
+                                  "k": k, "scope": scope, "result": result,
+                                  "created": time.monotonic()})
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                self._entries = self._entries[overflow:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._entries = []
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _expire(self) -> None:
+        # Entries are in insertion order, so expired ones are at the front
+        if self.ttl is None or not self._entries:
+            return
+        now = time.monotonic()
+        expired = 0
+        while expired < len(self._entries) and now - self._entries[expired]["created"] >= self.ttl:
+            expired += 1
+        if expired:
+            self._vectors = self._vectors[expired:]
+            self._entries = self._entries[expired:]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
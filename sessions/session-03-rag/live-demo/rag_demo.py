@@ -11,15 +11,29 @@ This demo shows:
 """
 
 import os
-import chromadb
-import vertexai
-from typing import List, Dict
-from google import genai
-from google.genai import types
-from chromadb.config import Settings
-from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+import hashlib
+import time
+import shutil
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Union
 from dotenv import load_dotenv
 from sample_data import SAMPLE_BLOGS
+from resources import registry
+from vector_index import load_or_create_index, index_from_collection
+from embedding_engine import EmbeddingEngine
+from embedding_cache import EmbeddingCache
+from incremental_ingest import (
+    assign_chunk_ids, plan_ingest, existing_chunk_ids, apply_ingest, chunk_id_from_metadata
+)
+from ingest_pipeline import StreamingIngestPipeline, iter_jsonl, source_fingerprint
+from query_cache import QueryEmbeddingCache, SemanticAnswerCache
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from context_builder import build_context, format_context
+from chunker import iter_chunks_parallel
+from metadata_filters import date_metadata, filters_key, normalize_filters, to_chroma_where
+from reranker import Reranker
+from snapshot import Snapshot, snapshot_exists, snapshot_from_collection
+from concurrent.futures import ThreadPoolExecutor
 
 # ============================================================================
 # CONFIGURATION
@@ -31,30 +45,285 @@ load_dotenv()
 PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 LOCATION = os.getenv("GCP_LOCATION", "us-central1")
 
-# Initialize Vertex AI and Generative AI client
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-client = genai.Client(
-    vertexai=True, project=PROJECT_ID, location=LOCATION)
-
 # Initialize models
 GENERATION_MODEL_NAME = os.getenv("GENERATION_MODEL_NAME", "gemini-2.5-flash-lite")
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-004")
 
-# Initialize ChromaDB (local, persistent storage)
-# chroma_client = chromadb.Client(Settings(
-#    anonymized_telemetry=False,
-#    allow_reset=True
-#))
-chroma_client = chromadb.PersistentClient(path="./chroma_data")
-
-# Create or get collection
+# ChromaDB (local, persistent storage)
+CHROMA_PATH = "./chroma_data"
 collection_name = "wcc_blogs"
-try:
-    collection = chroma_client.get_collection(collection_name)
-    print(f"✓ Using existing collection: {collection_name}")
-except:
-    collection = chroma_client.create_collection(collection_name)
-    print(f"✓ Created new collection: {collection_name}")
+
+# Vector search backend:
+#   "chroma" - query ChromaDB directly (default)
+#   "flat"   - exact search over an in-process NumPy matrix
+#   "ivf"    - approximate search over k-means clusters (fastest for large collections)
+#   "int8"   - int8 codes (4x smaller), shortlist re-scored at full precision
+#   "binary" - 1-bit codes (32x smaller), shortlist re-scored at full precision
+# The local index is a copy of the collection, saved next to the ChromaDB files.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+LOCAL_INDEX_PATH = os.path.join(CHROMA_PATH, "local_index", collection_name)
+
+# Snapshot: with SNAPSHOT_PATH set, searches use a read-only, memory-mapped
+# export of the collection (snapshot.py) instead of VECTOR_BACKEND. Opening
+# it is instant and worker processes share its pages; every write to the
+# collection exports a fresh one. Create one with --snapshot.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+
+# Search mode:
+#   "vector" - embedding similarity only (default)
+#   "hybrid" - embeddings + BM25 keyword search, merged with reciprocal rank
+#              fusion; finds exact names and times that 10-dim embeddings miss
+# The BM25 index is saved next to the ChromaDB files and updated on every write.
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Results taken from each ranking
+BM25_INDEX_PATH = os.path.join(CHROMA_PATH, "bm25", f"{collection_name}.json")
+
+# Reranking: fetch RERANK_FETCH_FACTOR x k candidates, re-order them with a
+# cheap lexical scorer (reranker.py) and keep the best k. If scoring takes
+# longer than RERANK_BUDGET_MS, the plain vector order is used instead.
+RERANK = os.getenv("RERANK", "off")  # "off" or "lexical"
+RERANK_FETCH_FACTOR = int(os.getenv("RERANK_FETCH_FACTOR", "4"))
+reranker = Reranker(budget_ms=float(os.getenv("RERANK_BUDGET_MS", "50")))
+
+# Chunker:
+#   "recursive" - LangChain's RecursiveCharacterTextSplitter, sized in characters (default)
+#   "sentence"  - chunker.py: sized in tokens (chunk_size / 4), split on sentence
+#                 boundaries, run on a process pool for large corpora
+# CHUNK_TOKENIZER decides how the sentence chunker counts tokens: "estimate"
+# (~4 characters per token - a heuristic, so chunks come out about the same
+# size as with the character splitter) or a Gemini model name such as
+# "gemini-2.5-flash" to count with its real tokenizer (needs sentencepiece).
+CHUNKER = os.getenv("CHUNKER", "recursive")
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "estimate")
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0"))  # 0 = one per CPU
+
+# Prompt context: retrieved chunks are merged, de-duplicated and trimmed to
+# this many (estimated) tokens before they are sent to Gemini
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Embedding cache: unchanged chunks are served from disk instead of Vertex AI
+# (set EMBEDDING_CACHE_MAX_ENTRIES=0 to disable)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# Query caches: repeated questions skip the embedding call, and questions
+# close enough to one already answered (cosine similarity >= threshold)
+# reuse that answer. Our 10-dim embeddings are below ANSWER_CACHE_MIN_DIMENSIONS,
+# so only the same question (ignoring case, spacing and trailing punctuation)
+# reuses an answer - at 10 dims, different questions can be 0.98 similar.
+# Both are cleared whenever the collection changes, in this process or another.
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+query_embedding_cache = QueryEmbeddingCache(
+    EMBEDDING_MODEL_NAME,
+    output_dimensionality=10,
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024")),
+    ttl=QUERY_CACHE_TTL,
+)
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.98")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+    ttl=QUERY_CACHE_TTL,
+    min_dimensions=int(os.getenv("ANSWER_CACHE_MIN_DIMENSIONS", "256")),
+)
+
+# Collection version: every write stamps this file, so other processes
+# (the Streamlit app, rag_service) notice a --sync or --ingest run from the
+# CLI, drop their cached answers and reload their local indexes
+COLLECTION_VERSION_PATH = os.path.join(CHROMA_PATH, f"{collection_name}.version")
+
+
+# ============================================================================
+# RESOURCES (created on first use)
+# ============================================================================
+# Clients, the collection and the indexes are slow to set up, so nothing is
+# created at import. Each get_*() builds its resource the first time it is
+# called and reuses it for the rest of the process (see resources.py).
+
+def _make_client():
+    from google import genai
+    return genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
+
+def _make_embedding_engine():
+    # Concurrent batched requests with rate limiting and retries
+    return EmbeddingEngine(
+        get_client(),
+        EMBEDDING_MODEL_NAME,
+        output_dimensionality=10,
+        max_workers=int(os.getenv("EMBEDDING_WORKERS", "4")),
+        requests_per_minute=float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "600")),
+    )
+
+def _make_chroma_client():
+    import chromadb
+    return chromadb.PersistentClient(path=CHROMA_PATH)
+
+def _make_collection():
+    # Create or get collection
+    chroma_client = get_chroma_client()
+    try:
+        collection = chroma_client.get_collection(collection_name)
+        print(f"✓ Using existing collection: {collection_name}")
+    except:
+        collection = chroma_client.create_collection(collection_name)
+        print(f"✓ Created new collection: {collection_name}")
+    return collection
+
+def _make_local_index():
+    if SNAPSHOT_PATH:
+        if not snapshot_exists(SNAPSHOT_PATH):
+            print(f"📸 Exporting snapshot to {SNAPSHOT_PATH}...")
+            return snapshot_from_collection(get_collection(), SNAPSHOT_PATH)
+        snapshot = Snapshot(SNAPSHOT_PATH)
+        print(f"✓ Using snapshot {SNAPSHOT_PATH} ({len(snapshot)} vectors, memory-mapped)")
+        return snapshot
+    if VECTOR_BACKEND == "chroma":
+        return None
+    # Rebuild from ChromaDB if the saved index is missing or out of date
+    # (e.g. the backend was switched on an existing collection)
+    local_index = load_or_create_index(VECTOR_BACKEND, LOCAL_INDEX_PATH)
+    collection = get_collection()
+    if len(local_index) != collection.count():
+        print(f"🔄 Rebuilding local '{VECTOR_BACKEND}' index from ChromaDB...")
+        local_index = index_from_collection(collection, VECTOR_BACKEND)
+        local_index.save(LOCAL_INDEX_PATH)
+    print(f"✓ Using local '{VECTOR_BACKEND}' index ({len(local_index)} vectors)")
+    return local_index
+
+def _make_bm25_index():
+    if SEARCH_MODE != "hybrid":
+        return None
+    bm25_index = BM25Index.load(BM25_INDEX_PATH)
+    if len(bm25_index) != stored_chunk_count():
+        bm25_index = BM25Index()
+        local_index = get_local_index() if SNAPSHOT_PATH else None
+        if isinstance(local_index, Snapshot):
+            # Snapshots replace ChromaDB for reads, so rebuild from the snapshot
+            print("🔄 Rebuilding BM25 index from the snapshot...")
+            bm25_index.add(list(local_index.ids), list(local_index.documents))
+        else:
+            print("🔄 Rebuilding BM25 index from ChromaDB...")
+            stored = get_collection().get(include=["documents"])
+            bm25_index.add(stored["ids"], stored["documents"])
+        bm25_index.save(BM25_INDEX_PATH)
+    print(f"✓ Using hybrid search (BM25 index: {len(bm25_index)} chunks)")
+    return bm25_index
+
+def _make_embedding_cache():
+    if EMBEDDING_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return EmbeddingCache(
+        os.path.join(CHROMA_PATH, "embedding_cache.sqlite"),
+        EMBEDDING_MODEL_NAME,
+        output_dimensionality=10,
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    )
+
+def _make_title_catalog():
+    # Sorted distinct titles, for turning title_prefix filters into a where clause
+    if get_local_index() is not None:
+        return get_local_index().titles
+    metadatas = get_collection().get(include=["metadatas"])["metadatas"]
+    return sorted({metadata.get("title", "") for metadata in metadatas})
+
+registry.register("client", _make_client)
+registry.register("embedding_engine", _make_embedding_engine)
+registry.register("chroma_client", _make_chroma_client)
+registry.register("collection", _make_collection)
+registry.register("local_index", _make_local_index)
+registry.register("bm25_index", _make_bm25_index)
+registry.register("embedding_cache", _make_embedding_cache)
+registry.register("title_catalog", _make_title_catalog)
+
+def get_client():
+    """Generative AI client (Vertex AI)"""
+    return registry.get("client")
+
+def set_client(new_client) -> None:
+    """Use a different Generative AI client (e.g. a fake one in tests)"""
+    registry.set("client", new_client)
+    registry.reset("embedding_engine")  # Rebuilt with the new client on next use
+
+def get_embedding_engine() -> EmbeddingEngine:
+    return registry.get("embedding_engine")
+
+def get_chroma_client():
+    return registry.get("chroma_client")
+
+def get_collection():
+    """The ChromaDB collection holding the blog chunks"""
+    return registry.get("collection")
+
+def get_local_index():
+    """The local vector index or snapshot (None when VECTOR_BACKEND is 'chroma' and there is no snapshot)"""
+    sync_collection_version()
+    return registry.get("local_index")
+
+def get_bm25_index() -> Optional[BM25Index]:
+    """The BM25 keyword index (None unless SEARCH_MODE is 'hybrid')"""
+    sync_collection_version()
+    return registry.get("bm25_index")
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """The embedding cache, or None if it is disabled"""
+    return registry.get("embedding_cache")
+
+def get_title_catalog() -> List[str]:
+    """Sorted distinct chunk titles (rebuilt after every write)"""
+    sync_collection_version()
+    return registry.get("title_catalog")
+
+# Version of the collection this process last saw (None = not looked yet)
+_seen_collection_version: Optional[str] = None
+
+def collection_version() -> str:
+    """Stamp of the last write to the collection, by any process ("" = none recorded)"""
+    try:
+        with open(COLLECTION_VERSION_PATH, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+def bump_collection_version() -> None:
+    """Record a write to the collection (call once the indexes on disk are saved)"""
+    global _seen_collection_version
+    version = f"{time.time_ns()}-{os.getpid()}"
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    tmp_path = f"{COLLECTION_VERSION_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, COLLECTION_VERSION_PATH)
+    _seen_collection_version = version
+
+def sync_collection_version() -> str:
+    """
+    The collection version, after dropping anything built from an older one
+    
+    If another process wrote to the collection since this one last looked,
+    the query caches are cleared and the local index, BM25 index and title
+    catalog are reloaded from disk on next use.
+    """
+    global _seen_collection_version
+    version = collection_version()
+    if version != _seen_collection_version:
+        if _seen_collection_version is not None:
+            for name in ("local_index", "bm25_index", "title_catalog"):
+                registry.reset(name)
+            invalidate_query_caches()
+        _seen_collection_version = version
+    return version
+
+def answer_scope(filters: Optional[Dict]) -> tuple:
+    """What a cached answer depends on besides the question: collection version and filters"""
+    return (sync_collection_version(), filters_key(filters))
+
+# Old module attributes (rag_demo.client, rag_demo.collection, ...) still work,
+# but are created on first access
+_LAZY_ATTRIBUTES = {"client", "embedding_engine", "chroma_client", "collection",
+                    "local_index", "bm25_index", "embedding_cache"}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================================================
@@ -73,6 +342,22 @@ def chunk_documents(blogs: List[Dict], chunk_size: int = 400, chunk_overlap: int
     Returns:
         List of document chunks with metadata
     """
+    return list(iter_chunks(blogs, chunk_size, chunk_overlap))
+
+def iter_chunks(blogs: Iterable[Dict], chunk_size: int = 400, chunk_overlap: int = 50) -> Iterator[Dict]:
+    """
+    Generator version of chunk_documents: yields chunks one blog at a time,
+    so a large corpus never has to fit in memory
+    """
+    if CHUNKER == "sentence":
+        # chunk_size is in characters; at ~4 characters per token that is chunk_size // 4 tokens
+        yield from iter_chunks_parallel(blogs, chunk_tokens=chunk_size // 4,
+                                        overlap_tokens=chunk_overlap // 4, workers=CHUNK_WORKERS,
+                                        tokenizer=CHUNK_TOKENIZER)
+        return
+    
+    from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+    
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -80,8 +365,6 @@ def chunk_documents(blogs: List[Dict], chunk_size: int = 400, chunk_overlap: int
         length_function=len,
     )
     
-    all_chunks = []
-    
     for blog in blogs:
         # Create a combined text with title and content
         full_text = f"Title: {blog['title']}\n\n{blog['content']}"
@@ -91,117 +374,281 @@ def chunk_documents(blogs: List[Dict], chunk_size: int = 400, chunk_overlap: int
         
         # Add metadata to each chunk
         for i, chunk in enumerate(chunks):
-            all_chunks.append({
+            yield {
                 "text": chunk,
                 "metadata": {
                     "title": blog["title"],
                     "date": blog["date"],
+                    **date_metadata(blog["date"]),  # date_num, for date range filters
                     "url": blog["url"],
                     "chunk_id": i,
                     "total_chunks": len(chunks)
                 }
-            })
-    
-    return all_chunks
+            }
 
 # ============================================================================
 # STEP 2: GENERATE EMBEDDINGS
 # ============================================================================
 
-def generate_embeddings(texts: List[str], batch_size: int = 5) -> List[List[float]]:
+def generate_embeddings(texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
     """
     Generate embeddings for a list of texts using Vertex AI
     
+    Chunks already in the embedding cache are not sent again. The rest are
+    sent concurrently by the embedding engine, which also handles rate
+    limits and retries (see embedding_engine.py).
+    
     Args:
         texts: List of text strings to embed
-        batch_size: Number of texts to process at once
+        batch_size: Maximum texts per request (default: the API limit)
     
     Returns:
         List of embeddings (each embedding is a list of floats)
     """
-    all_embeddings = []
-    
     print(f"Generating embeddings for {len(texts)} chunks...")
     
-    # Process in batches to avoid rate limits
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        
-        # Get embeddings for this batch
-        response = client.models.embed_content(
-            model=EMBEDDING_MODEL_NAME,
-            contents=batch,
-            config=types.EmbedContentConfig(output_dimensionality=10),
-        )
-        
-        # Extract the values (list of floats) from each embedding
-        batch_embeddings = [emb.values for emb in response.embeddings]
-        all_embeddings.extend(batch_embeddings)
-        
-        # Progress update
-        if (i + batch_size) % 10 == 0:
-            print(f"  Processed {min(i+batch_size, len(texts))}/{len(texts)} chunks")
+    all_embeddings, missing, stats = embed_texts(texts, batch_size)
+    
+    if missing:
+        print(f"  Throughput: {stats['chunks_per_sec']:.1f} chunks/sec "
+              f"({stats['requests']} requests, {stats['retries']} retries, {stats['seconds']:.1f}s)")
+    
+    if get_embedding_cache() is not None:
+        print(f"  Cache: {len(texts) - len(missing)} hits, {len(missing)} misses "
+              f"({len(texts) - len(missing)} chunks not re-embedded)")
     
     print(f"✓ Generated {len(all_embeddings)} embeddings")
     print(f"  Embedding dimension: {len(all_embeddings[0])}")
     
     return all_embeddings
 
+def embed_texts(texts: List[str],
+                batch_size: Optional[int] = None) -> Tuple[List[List[float]], List[int], Optional[Dict]]:
+    """
+    Embed texts without printing (used by generate_embeddings and the streaming ingest)
+    
+    Returns:
+        (embeddings, indices of the texts that were not in the cache,
+         embedding engine stats for those texts - None if all were cached)
+    """
+    # Only embed texts the cache hasn't seen
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        all_embeddings = embedding_cache.get_many(texts)
+    else:
+        all_embeddings = [None] * len(texts)
+    missing = [i for i, emb in enumerate(all_embeddings) if emb is None]
+    stats = None
+    
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        new_embeddings, stats = get_embedding_engine().embed(missing_texts, max_batch_size=batch_size)
+        for i, emb in zip(missing, new_embeddings):
+            all_embeddings[i] = emb
+        if embedding_cache is not None:
+            embedding_cache.put_many(missing_texts, new_embeddings)
+    
+    return all_embeddings, missing, stats
+
 # ============================================================================
 # STEP 3: STORE IN CHROMADB
 # ============================================================================
 
-def store_in_vectordb(chunks: List[Dict], embeddings: List[List[float]]) -> None:
+def plan_vectordb_update(chunks: List[Dict], prune: bool = True) -> Dict:
+    """
+    Compare chunks with what is already in ChromaDB
+    
+    Chunk ids are stable (source + position + content hash), so unchanged
+    chunks keep their id and don't need to be embedded again.
+    
+    Args:
+        chunks: List of document chunks with metadata
+        prune: Treat chunks as the whole corpus and delete everything else
+    
+    Returns:
+        Dict with 'new' (indices of chunks to embed), 'unchanged' (count)
+        and 'delete' (ids of stale chunks)
+    """
+    ids = assign_chunk_ids(chunks)
+    return plan_ingest(existing_chunk_ids(get_collection()), ids, prune=prune)
+
+def store_in_vectordb(chunks: List[Dict], embeddings: List[List[float]],
+                      delete_ids: Optional[List[str]] = None) -> None:
     """
     Store chunks, embeddings, and metadata in ChromaDB
     
+    Chunks are upserted under stable ids, so storing the same chunk twice
+    never creates a duplicate.
+    
     Args:
         chunks: List of document chunks with metadata
         embeddings: List of embeddings corresponding to chunks
+        delete_ids: Ids of stale chunks to remove (see plan_vectordb_update)
     """
+    delete_ids = delete_ids or []
+    write_chunks(chunks, embeddings, delete_ids)
+    
+    print(f"✓ Stored {len(chunks)} chunks in ChromaDB")
+    if delete_ids:
+        print(f"  Removed {len(delete_ids)} stale chunks")
+    print(f"  Collection size: {get_collection().count()}")
+
+def write_chunks(chunks: List[Dict], embeddings: List[List[float]],
+                 delete_ids: Optional[List[str]] = None, save_index: bool = True) -> None:
+    """Upsert chunks and delete stale ids in ChromaDB and the local index, without printing"""
     # Prepare data for ChromaDB
-    ids = [f"chunk_{i}" for i in range(len(chunks))]
+    ids = assign_chunk_ids(chunks)
     documents = [chunk["text"] for chunk in chunks]
     metadatas = [chunk["metadata"] for chunk in chunks]
+    delete_ids = delete_ids or []
     
-    # Add to collection
-    collection.add(
-        embeddings=embeddings,
-        documents=documents,
-        metadatas=metadatas,
-        ids=ids
-    )
+    # Load the indexes first, so a rebuild doesn't already include this write
+    local_index = get_local_index()
+    bm25_index = get_bm25_index()
     
-    print(f"✓ Stored {len(chunks)} chunks in ChromaDB")
-    print(f"  Collection size: {collection.count()}")
+    # Upsert new/changed chunks and remove stale ones
+    apply_ingest(get_collection(), ids, documents, metadatas, embeddings, delete_ids)
+    
+    # Keep the local index in sync with ChromaDB (snapshots are read-only,
+    # so a new one is exported instead)
+    if isinstance(local_index, Snapshot):
+        if save_index:
+            refresh_snapshot()
+    elif local_index is not None:
+        local_index.add(ids, embeddings, documents, metadatas)
+        local_index.delete(delete_ids)
+        if save_index:
+            local_index.save(LOCAL_INDEX_PATH)
+    
+    # ... and the keyword index
+    if bm25_index is not None:
+        bm25_index.add(ids, documents)
+        bm25_index.delete(delete_ids)
+        if save_index:
+            bm25_index.save(BM25_INDEX_PATH)
+    
+    # Cached answers may refer to content that just changed (other processes
+    # find out from the version stamp, once the indexes on disk are saved)
+    if ids or delete_ids:
+        invalidate_query_caches()
+        registry.reset("title_catalog")
+        if save_index:
+            bump_collection_version()
+
+def refresh_snapshot(path: Optional[str] = None) -> Snapshot:
+    """
+    Export the collection as a snapshot (see snapshot.py)
+    
+    Args:
+        path: Snapshot folder (default: SNAPSHOT_PATH, or ./chroma_data/snapshot)
+    
+    Returns:
+        The new snapshot; if it is at SNAPSHOT_PATH, searches switch to it
+    """
+    path = path or SNAPSHOT_PATH or os.path.join(CHROMA_PATH, "snapshot")
+    snapshot = snapshot_from_collection(get_collection(), path)
+    if path == SNAPSHOT_PATH:
+        registry.set("local_index", snapshot)
+        registry.reset("title_catalog")
+    return snapshot
+
+def chunk_counts_by_title() -> Dict[str, int]:
+    """Stored chunks per blog title (read from the snapshot when one is in use)"""
+    local_index = get_local_index() if SNAPSHOT_PATH else None
+    if isinstance(local_index, Snapshot):
+        titles = (local_index.metadata(row)["title"] for row in range(len(local_index)))
+    else:
+        titles = (m["title"] for m in get_collection().get(include=["metadatas"])["metadatas"])
+    counts: Dict[str, int] = {}
+    for title in titles:
+        counts[title] = counts.get(title, 0) + 1
+    return counts
+
+def stored_chunk_count() -> int:
+    """Chunks available to search (without opening ChromaDB if a snapshot is in use)"""
+    if SNAPSHOT_PATH:
+        return len(get_local_index())
+    return get_collection().count()
+
+def backfill_date_numbers(batch_size: int = 1000) -> int:
+    """
+    Add the numeric `date_num` field to chunks stored before date filters existed
+    
+    Unchanged chunks are never re-written by an ingest, so older collections
+    need this once for date_from/date_to filters to find them.
+    
+    Returns:
+        Number of chunks updated
+    """
+    collection = get_collection()
+    stored = collection.get(include=["metadatas"])
+    ids, metadatas = [], []
+    for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+        date_fields = date_metadata(metadata.get("date")) if "date_num" not in metadata else {}
+        if date_fields:  # Dates that aren't ISO format stay without date_num
+            ids.append(chunk_id)
+            metadatas.append({**metadata, **date_fields})
+    
+    for start in range(0, len(ids), batch_size):
+        collection.update(ids=ids[start:start + batch_size],
+                          metadatas=metadatas[start:start + batch_size])
+    if ids:
+        bump_collection_version()
+    return len(ids)
 
 # ============================================================================
 # STEP 4: SEMANTIC SEARCH
 # ============================================================================
 
-def semantic_search(query: str, k: int = 5) -> List[Dict]:
+def semantic_search(query: str, k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
     """
     Search for relevant chunks given a query
     
     Args:
         query: User's search query
         k: Number of results to return
+        filters: Optional metadata filters, e.g. {"date_from": "2024", "title_prefix": "Django"}
+                 (see metadata_filters.py); only matching chunks are searched
     
     Returns:
         List of relevant documents with metadata and scores
     """
-    # Embed the query
-    response = client.models.embed_content(
-            model=EMBEDDING_MODEL_NAME,
-            contents=[query],
-            config=types.EmbedContentConfig(output_dimensionality=10),
-        )
+    return retrieve(query, embed_query(query), k=k, filters=filters)
+
+def embed_query(query: str) -> List[float]:
+    """Embed a search query (repeated queries come from the query cache)"""
+    query_embedding = query_embedding_cache.get_embedding(query)
+    if query_embedding is not None:
+        return query_embedding
+    
+    from google.genai import types
+    
+    response = get_client().models.embed_content(
+        model=EMBEDDING_MODEL_NAME,
+        contents=[query],
+        config=types.EmbedContentConfig(output_dimensionality=10),
+    )
     query_embedding = response.embeddings[0].values
+    query_embedding_cache.put_embedding(query, query_embedding)
+    return query_embedding
+
+def search_by_embedding(query_embedding: List[float], k: int = 5,
+                        filters: Optional[Dict] = None) -> List[Dict]:
+    """Find the k chunks closest to an already-computed query embedding"""
+    # Search the in-process index if one is configured
+    local_index = get_local_index()
+    if local_index is not None:
+        return local_index.search(query_embedding, k=k, filters=filters)
     
-    # Search the vector database
-    results = collection.query(
+    where = chroma_where(filters)
+    if where == {}:
+        return []  # No chunk can match
+    
+    # Search the vector database (ChromaDB applies the filter first)
+    results = get_collection().query(
         query_embeddings=[query_embedding],
-        n_results=k
+        n_results=k,
+        where=where
     )
     
     # Format results
@@ -209,6 +656,7 @@ def semantic_search(query: str, k: int = 5) -> List[Dict]:
     if results['documents'] and len(results['documents'][0]) > 0:
         for i in range(len(results['documents'][0])):
             relevant_docs.append({
+                'id': results['ids'][0][i],
                 'text': results['documents'][0][i],
                 'metadata': results['metadatas'][0][i],
                 'distance': results['distances'][0][i]  # Lower = more similar
@@ -216,11 +664,179 @@ def semantic_search(query: str, k: int = 5) -> List[Dict]:
     
     return relevant_docs
 
+def semantic_search_batch(queries: List[str], k: int = 5,
+                          filters: Optional[Dict] = None) -> List[List[Dict]]:
+    """
+    Search for many queries at once (e.g. for offline evaluation)
+    
+    All queries are embedded together (one embed_content call per 250
+    queries) and searched with a single collection.query call.
+    
+    Args:
+        queries: List of search queries
+        k: Number of results per query
+        filters: Optional metadata filters, applied to every query
+    
+    Returns:
+        One result list per query, in the same order
+    """
+    return retrieve_batch(queries, embed_queries(queries), k=k, filters=filters)
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """Embed many queries, sending only uncached ones to Vertex AI"""
+    embeddings = [query_embedding_cache.get_embedding(q) for q in queries]
+    missing = [i for i, emb in enumerate(embeddings) if emb is None]
+    
+    if missing:
+        new_embeddings, _ = get_embedding_engine().embed([queries[i] for i in missing])
+        for i, emb in zip(missing, new_embeddings):
+            embeddings[i] = emb
+            query_embedding_cache.put_embedding(queries[i], emb)
+    
+    return embeddings
+
+def search_by_embeddings(query_embeddings: List[List[float]], k: int = 5,
+                         filters: Optional[Dict] = None) -> List[List[Dict]]:
+    """Batch version of search_by_embedding: one result list per embedding"""
+    if not query_embeddings:
+        return []
+    
+    local_index = get_local_index()
+    if local_index is not None:
+        return local_index.search_batch(query_embeddings, k=k, filters=filters)
+    
+    where = chroma_where(filters)
+    if where == {}:
+        return [[] for _ in query_embeddings]
+    
+    # One query call for every embedding
+    results = get_collection().query(
+        query_embeddings=query_embeddings,
+        n_results=k,
+        where=where
+    )
+    
+    all_docs = []
+    for q in range(len(query_embeddings)):
+        all_docs.append([{
+            'id': results['ids'][q][i],
+            'text': results['documents'][q][i],
+            'metadata': results['metadatas'][q][i],
+            'distance': results['distances'][q][i]  # Lower = more similar
+        } for i in range(len(results['documents'][q]))])
+    return all_docs
+
+def chroma_where(filters: Optional[Dict]) -> Optional[Dict]:
+    """ChromaDB where clause for metadata filters (None = no filter, {} = nothing matches)"""
+    if filters and filters.get("title_prefix"):
+        return to_chroma_where(filters, get_title_catalog())
+    return to_chroma_where(filters)
+
+def retrieve(query: str, query_embedding: List[float], k: int = 5,
+             filters: Optional[Dict] = None) -> List[Dict]:
+    """Find the k best chunks for a query, using SEARCH_MODE"""
+    return retrieve_batch([query], [query_embedding], k=k, filters=filters)[0]
+
+def retrieve_batch(queries: List[str], query_embeddings: List[List[float]],
+                   k: int = 5, filters: Optional[Dict] = None) -> List[List[Dict]]:
+    """Batch version of retrieve: one result list per query"""
+    # Over-fetch when reranking, so the reranker has candidates to choose from
+    fetch_k = k * RERANK_FETCH_FACTOR if RERANK != "off" else k
+    
+    if SEARCH_MODE != "hybrid":
+        all_docs = search_by_embeddings(query_embeddings, k=fetch_k, filters=filters)
+    else:
+        # Take more vector candidates than needed, so fusion has something to rerank
+        all_vector_docs = search_by_embeddings(query_embeddings, k=max(fetch_k, HYBRID_CANDIDATES),
+                                               filters=filters)
+        all_docs = [hybrid_fuse(query, emb, vector_docs, fetch_k, filters=filters)
+                    for query, emb, vector_docs in zip(queries, query_embeddings, all_vector_docs)]
+    
+    if RERANK == "off":
+        return all_docs
+    return [reranker.rerank(query, docs, k) for query, docs in zip(queries, all_docs)]
+
+def hybrid_fuse(query: str, query_embedding: List[float],
+                vector_docs: List[Dict], k: int, filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Merge vector results with BM25 keyword results (reciprocal rank fusion)
+    
+    Args:
+        query: Search query (for BM25)
+        query_embedding: Its embedding (to compute distances of keyword-only hits)
+        vector_docs: Vector search results, best first
+        k: Number of results to return
+        filters: Metadata filters the keyword results must also match
+    
+    Returns:
+        Top k chunks, each with its vector 'distance' and fused 'rrf_score'
+    """
+    docs_by_id = {result_id(doc): doc for doc in vector_docs}
+    vector_ids = list(docs_by_id)
+    keyword_ids = [chunk_id for chunk_id, _ in
+                   get_bm25_index().search(query, k=max(k, HYBRID_CANDIDATES))]
+    
+    # The keyword index doesn't know about metadata: with filters, look up
+    # keyword-only hits first and keep the ones that match
+    if normalize_filters(filters):
+        docs_by_id.update(_fetch_chunks([i for i in keyword_ids if i not in docs_by_id],
+                                        query_embedding, filters=filters))
+        keyword_ids = [i for i in keyword_ids if i in docs_by_id]
+    
+    fused = reciprocal_rank_fusion([vector_ids, keyword_ids])[:k]
+    
+    # Chunks found only by keyword search still need their text and distance
+    missing = [chunk_id for chunk_id, _ in fused if chunk_id not in docs_by_id]
+    docs_by_id.update(_fetch_chunks(missing, query_embedding))
+    
+    return [{**docs_by_id[chunk_id], 'rrf_score': score}
+            for chunk_id, score in fused if chunk_id in docs_by_id]
+
+def result_id(doc: Dict) -> str:
+    """
+    Key a search result by chunk id, the ids the BM25 index uses
+    
+    Results carry the id they are stored under; older ones may not, so fall
+    back to the id rebuilt from metadata, then to a hash of the text (chunks
+    stored without source_id/content_hash would otherwise all share "").
+    """
+    return (doc.get('id') or chunk_id_from_metadata(doc['metadata'])
+            or hashlib.sha256(doc['text'].encode("utf-8")).hexdigest())
+
+def _fetch_chunks(ids: List[str], query_embedding: List[float],
+                  filters: Optional[Dict] = None) -> Dict[str, Dict]:
+    """Load chunks by id (from the snapshot if one is in use, else ChromaDB), with their distance to the query"""
+    if not ids:
+        return {}
+    local_index = get_local_index() if SNAPSHOT_PATH else None
+    if isinstance(local_index, Snapshot):
+        return local_index.fetch(ids, query_embedding, filters=filters)
+    
+    where = chroma_where(filters)
+    if where == {}:
+        return {}
+    stored = get_collection().get(ids=ids, where=where,
+                                  include=["documents", "metadatas", "embeddings"])
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    docs = {}
+    for chunk_id, text, metadata, embedding in zip(
+            stored['ids'], stored['documents'], stored['metadatas'], stored['embeddings']):
+        diff = np.asarray(embedding, dtype=np.float32) - query_vector
+        docs[chunk_id] = {
+            'id': chunk_id,
+            'text': text,
+            'metadata': metadata,
+            'distance': float(diff @ diff)  # Squared L2, like ChromaDB
+        }
+    return docs
+
 # ============================================================================
 # STEP 5: RAG PIPELINE
 # ============================================================================
 
-def rag_query(question: str, k: int = 5, verbose: bool = False) -> Dict:
+def rag_query(question: str, k: int = 5, verbose: bool = False,
+              filters: Optional[Dict] = None,
+              query_embedding: Optional[List[float]] = None) -> Dict:
     """
     Complete RAG pipeline: retrieve relevant context and generate answer
     
@@ -228,6 +844,9 @@ def rag_query(question: str, k: int = 5, verbose: bool = False) -> Dict:
         question: User's question
         k: Number of context chunks to retrieve
         verbose: Whether to print detailed information
+        filters: Optional metadata filters (see semantic_search)
+        query_embedding: The question's embedding, if already computed
+                         (e.g. by a batched embed_queries call)
     
     Returns:
         Dictionary with answer, sources, and retrieved chunks
@@ -236,7 +855,18 @@ def rag_query(question: str, k: int = 5, verbose: bool = False) -> Dict:
     if verbose:
         print(f"\n🔍 Searching for: {question}")
     
-    relevant_docs = semantic_search(question, k=k)
+    if query_embedding is None:
+        query_embedding = embed_query(question)
+    
+    # Reuse the answer to a near-identical question if we have one
+    scope = answer_scope(filters)
+    cached = answer_cache.lookup(query_embedding, k, scope, question)
+    if cached is not None:
+        if verbose:
+            print("⚡ Answered from cache")
+        return cached
+    
+    relevant_docs = retrieve(question, query_embedding, k=k, filters=filters)
     
     if not relevant_docs:
         return {
@@ -250,17 +880,34 @@ def rag_query(question: str, k: int = 5, verbose: bool = False) -> Dict:
         for i, doc in enumerate(relevant_docs):
             print(f"  [{i+1}] {doc['metadata']['title']} (distance: {doc['distance']:.3f})")
     
-    # 2. Build context from retrieved chunks
-    context_parts = []
-    for i, doc in enumerate(relevant_docs):
-        context_parts.append(f"""[Source {i+1}: {doc['metadata']['title']}]
-{doc['text']}
-""")
+    # 2-3. Build the prompt from the passages that fit the context budget
+    passages = select_passages(relevant_docs)
+    prompt = build_rag_prompt(question, passages)
     
-    context = "\n\n".join(context_parts)
+    # 4. Generate answer with Gemini
+    if verbose:
+        print("🤖 Generating answer with Gemini...")
     
-    # 3. Build prompt for LLM
-    prompt = f"""You are a helpful assistant for the Women Coding Community (WCC).
+    answer = generate_answer(prompt)
+    
+    # 5. Sources numbered as in the prompt
+    result = rag_result(answer, passages)
+    answer_cache.store(query_embedding, k, result, scope, question)
+    return result
+
+def select_passages(relevant_docs: List[Dict]) -> List[Dict]:
+    """
+    Passages for the prompt: neighbouring chunks are merged, overlap and
+    near-duplicates removed, and the total kept within CONTEXT_TOKEN_BUDGET
+    """
+    return build_context(relevant_docs, token_budget=CONTEXT_TOKEN_BUDGET)
+
+def build_rag_prompt(question: str, passages: List[Dict]) -> str:
+    """Build the Gemini prompt: instructions, numbered sources (passages), question"""
+    context = format_context(passages)
+    
+    # Build prompt for LLM
+    return f"""You are a helpful assistant for the Women Coding Community (WCC).
 Answer the question based ONLY on the provided context below.
 If the context doesn't contain enough information to answer the question, say so.
 Always cite your sources using the format [Source X] where X is the source number.
@@ -271,32 +918,215 @@ Context:
 Question: {question}
 
 Answer (with citations):"""
+
+def generate_answer(prompt: str) -> str:
+    """Generate an answer with Gemini"""
+    from google.genai import types
     
-    # 4. Generate answer with Gemini
-    if verbose:
-        print("🤖 Generating answer with Gemini...")
-    
-    response = client.models.generate_content(
+    response = get_client().models.generate_content(
         model=GENERATION_MODEL_NAME,
         contents=[prompt],
         config=types.GenerateContentConfig()
     )
+    return response.text
+
+def generate_answer_stream(prompt: str) -> Iterator[str]:
+    """Generate an answer with Gemini, yielding text as it arrives"""
+    from google.genai import types
     
-    # 5. Extract unique sources
-    unique_sources = []
-    seen_titles = set()
-    for doc in relevant_docs:
-        title = doc['metadata']['title']
-        if title not in seen_titles:
-            seen_titles.add(title)
-            unique_sources.append(doc['metadata'])
+    for chunk in get_client().models.generate_content_stream(
+        model=GENERATION_MODEL_NAME,
+        contents=[prompt],
+        config=types.GenerateContentConfig()
+    ):
+        if chunk.text:
+            yield chunk.text
+
+def rag_query_stream(question: str, k: int = 5,
+                     filters: Optional[Dict] = None) -> Iterator[Union[str, Dict]]:
+    """
+    Streaming version of rag_query
     
+    Yields pieces of the answer as Gemini generates them, so the first words
+    can be shown while the rest is still being written. The last item is the
+    full result dict (answer, sources, chunks), as returned by rag_query.
+    
+    Usage:
+        for item in rag_query_stream("What is RAG?"):
+            if isinstance(item, dict):
+                result = item
+            else:
+                print(item, end="", flush=True)
+    
+    Args:
+        question: User's question
+        k: Number of context chunks to retrieve
+        filters: Optional metadata filters (see semantic_search)
+    """
+    query_embedding = embed_query(question)
+    
+    scope = answer_scope(filters)
+    cached = answer_cache.lookup(query_embedding, k, scope, question)
+    if cached is not None:
+        yield cached['answer']
+        yield cached
+        return
+    
+    relevant_docs = retrieve(question, query_embedding, k=k, filters=filters)
+    
+    if not relevant_docs:
+        answer = "I couldn't find any relevant information to answer that question."
+        yield answer
+        yield {'answer': answer, 'sources': [], 'chunks': []}
+        return
+    
+    passages = select_passages(relevant_docs)
+    parts = []
+    for text in generate_answer_stream(build_rag_prompt(question, passages)):
+        parts.append(text)
+        yield text
+    
+    result = rag_result("".join(parts), passages)
+    answer_cache.store(query_embedding, k, result, scope, question)
+    yield result
+
+def rag_result(answer: str, passages: List[Dict]) -> Dict:
+    """
+    Result dict for an answer generated from passages
+    
+    sources[i] is the post behind [Source i+1] in the prompt, so the
+    answer's citations index into it; chunks are the chunks the passages
+    were built from, in the same order. Retrieved chunks dropped as
+    duplicates or over the token budget are in neither.
+    """
     return {
-        'answer': response.text,
-        'sources': unique_sources,
-        'chunks': relevant_docs  # Include for debugging
+        'answer': answer,
+        'sources': [passage['chunks'][0]['metadata'] for passage in passages],
+        'chunks': [chunk for passage in passages for chunk in passage['chunks']]
     }
 
+def rag_query_batch(questions: List[str], k: int = 5, max_workers: int = 8,
+                    filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Answer many questions at once
+    
+    Questions are embedded and searched in one batch (see
+    semantic_search_batch), then answers are generated concurrently.
+    
+    Args:
+        questions: List of questions
+        k: Number of context chunks per question
+        max_workers: Gemini calls in flight at once
+        filters: Optional metadata filters, applied to every question
+    
+    Returns:
+        One rag_query-style result dict per question, in the same order
+    """
+    query_embeddings = embed_queries(questions)
+    scope = answer_scope(filters)
+    results: List[Optional[Dict]] = [answer_cache.lookup(emb, k, scope, question)
+                                     for emb, question in zip(query_embeddings, questions)]
+    
+    # Retrieve context for everything the answer cache couldn't serve
+    todo = [i for i, result in enumerate(results) if result is None]
+    all_docs = retrieve_batch([questions[i] for i in todo],
+                              [query_embeddings[i] for i in todo], k=k, filters=filters)
+    
+    def answer(i: int, relevant_docs: List[Dict]) -> Dict:
+        if not relevant_docs:
+            return {
+                'answer': "I couldn't find any relevant information to answer that question.",
+                'sources': [],
+                'chunks': []
+            }
+        passages = select_passages(relevant_docs)
+        result = rag_result(generate_answer(build_rag_prompt(questions[i], passages)), passages)
+        answer_cache.store(query_embeddings[i], k, result, scope, questions[i])
+        return result
+    
+    # Generation is the slow part - run it concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, result in zip(todo, pool.map(answer, todo, all_docs)):
+            results[i] = result
+    
+    return results
+
+def invalidate_query_caches() -> None:
+    """Forget cached query embeddings and answers (call after the collection changes)"""
+    query_embedding_cache.clear()
+    answer_cache.clear()
+
+def cache_stats() -> Dict:
+    """Hit rates for the query embedding and answer caches"""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "answers": answer_cache.stats(),
+    }
+
+# ============================================================================
+# STREAMING INGEST (LARGE CORPORA)
+# ============================================================================
+
+def ingest_stream(blogs: Iterable[Dict], source: Optional[str] = None, batch_size: int = 1000,
+                  resume: bool = True, chunk_size: int = 400, chunk_overlap: int = 50) -> Dict:
+    """
+    Ingest a large corpus without holding it in memory
+    
+    Blogs are chunked, embedded and stored in batches by a streaming
+    pipeline (see ingest_pipeline.py). Progress is checkpointed after every
+    batch, so an interrupted run continues where it stopped - but only for
+    the same input: the checkpoint records the source, and a different (or
+    changed) file starts from the beginning.
+    
+    Args:
+        blogs: Iterable of blog post dictionaries (e.g. iter_jsonl("blogs.jsonl"))
+        source: Identifies the input, e.g. source_fingerprint("blogs.jsonl")
+                (None = unknown input, so nothing is checkpointed or resumed)
+        batch_size: Chunks embedded and stored per batch
+        resume: Continue from the last checkpoint if there is one
+        chunk_size: Target size for each chunk
+        chunk_overlap: Overlap between chunks
+    
+    Returns:
+        Stats dict with chunks stored, chunks skipped and chunks/sec
+    """
+    def store_batch(chunks, embeddings):
+        # Saving the local index rewrites it, so only do it once at the end
+        write_chunks(chunks, embeddings, save_index=False)
+    
+    def report(stats):
+        print(f"  Stored {stats['chunks_skipped'] + stats['chunks_stored']:,} chunks "
+              f"({stats['chunks_per_sec']:.1f} chunks/sec)")
+    
+    pipeline = StreamingIngestPipeline(
+        chunk_fn=lambda docs: iter_chunks(docs, chunk_size, chunk_overlap),
+        embed_fn=lambda texts: embed_texts(texts)[0],
+        store_fn=store_batch,
+        batch_size=batch_size,
+        checkpoint_path=os.path.join(CHROMA_PATH, "ingest_checkpoint.json") if source else None,
+        fingerprint=f"{source}|{collection_name}:{CHUNKER}:{CHUNK_TOKENIZER}:{chunk_size}:{chunk_overlap}:{batch_size}",
+    )
+    
+    resume = resume and source is not None
+    skipped = pipeline.load_checkpoint() if resume else 0
+    if skipped:
+        print(f"⏩ Resuming from checkpoint: skipping {skipped:,} chunks already stored")
+    
+    try:
+        stats = pipeline.run(blogs, resume=resume, progress=report)
+    finally:
+        if isinstance(registry.peek("local_index"), Snapshot):
+            refresh_snapshot()
+        elif registry.peek("local_index") is not None:
+            get_local_index().save(LOCAL_INDEX_PATH)
+        if registry.peek("bm25_index") is not None:
+            get_bm25_index().save(BM25_INDEX_PATH)
+        bump_collection_version()
+    
+    print(f"✓ Ingested {stats['chunks_stored']:,} chunks in {stats['seconds']:.1f}s")
+    print(f"  Collection size: {get_collection().count()}")
+    return stats
+
 # ============================================================================
 # DEMO FUNCTIONS
 # ============================================================================
@@ -314,17 +1144,28 @@ def demo_setup():
     print(f"✓ Created {len(chunks)} chunks from {len(SAMPLE_BLOGS)} blog posts")
     print(f"  First chunk preview: {chunks[0]['text'][:100]}...")
     
+    # Only new or changed chunks need embedding
+    plan = plan_vectordb_update(chunks, prune=True)
+    new_chunks = [chunks[i] for i in plan["new"]]
+    print(f"  {len(new_chunks)} new or changed, {plan['unchanged']} unchanged, "
+          f"{len(plan['delete'])} stale")
+    
     # Step 2: Generate embeddings
     print("\n🧮 STEP 2: Generating Embeddings")
     print("-" * 70)
-    texts = [chunk["text"] for chunk in chunks]
-    embeddings = generate_embeddings(texts)
+    texts = [chunk["text"] for chunk in new_chunks]
+    embeddings = generate_embeddings(texts) if texts else []
+    if not texts:
+        print("✓ Nothing to embed - all chunks are up to date")
     
     # Step 3: Store in vector database
     print("\n💾 STEP 3: Storing in ChromaDB")
     print("-" * 70)
-    store_in_vectordb(chunks, embeddings)
-    
+    store_in_vectordb(new_chunks, embeddings, delete_ids=plan["delete"])
+    backfilled = backfill_date_numbers()
+    if backfilled:
+        print(f"✓ Added date_num to {backfilled} older chunks (for date filters)")
+
     print("\n✅ Setup complete! Ready for queries.")
     print("="*70)
 
@@ -341,12 +1182,13 @@ def demo_search():
         "Tell me about mentorship at WCC"
     ]
     
-    for query in test_queries:
+    # Embed and search every query in one batch
+    all_results = semantic_search_batch(test_queries, k=3)
+    
+    for query, results in zip(test_queries, all_results):
         print(f"\n🔍 Query: {query}")
         print("-" * 70)
         
-        results = semantic_search(query, k=3)
-        
         for i, result in enumerate(results):
             print(f"\n  Result {i+1}:")
             print(f"  Title: {result['metadata']['title']}")
@@ -367,11 +1209,16 @@ def demo_rag():
         "What cloud platforms were discussed?"
     ]
     
-    for question in test_questions:
+    # Retrieve for all questions in one batch, then generate answers concurrently
+    print(f"\n🤖 Answering {len(test_questions)} questions...")
+    all_results = rag_query_batch(test_questions, k=3)
+    
+    for question, result in zip(test_questions, all_results):
         print(f"\n❓ Question: {question}")
         print("-" * 70)
         
-        result = rag_query(question, k=3, verbose=True)
+        for i, doc in enumerate(result['chunks']):
+            print(f"  [{i+1}] {doc['metadata']['title']} (distance: {doc['distance']:.3f})")
         
         print(f"\n💬 Answer:")
         print(result['answer'])
@@ -397,13 +1244,33 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         if sys.argv[1] == "--reset":
             print("\n🔄 Resetting collection...")
-            chroma_client.delete_collection(collection_name)
-            collection = chroma_client.create_collection(collection_name)
+            get_chroma_client().delete_collection(collection_name)
+            registry.set("collection", get_chroma_client().create_collection(collection_name))
+            # Indexes are rebuilt (empty) from the new collection on next use
+            if SNAPSHOT_PATH:
+                shutil.rmtree(SNAPSHOT_PATH, ignore_errors=True)
+            registry.reset("local_index")
+            registry.reset("bm25_index")
+            invalidate_query_caches()
+            bump_collection_version()
+            demo_setup()
+        elif sys.argv[1] == "--sync":
+            print("\n🔄 Syncing collection with SAMPLE_BLOGS...")
             demo_setup()
+        elif sys.argv[1] == "--ingest":
+            if len(sys.argv) < 3:
+                print("Usage: python rag_demo.py --ingest <blogs.jsonl>")
+                sys.exit(1)
+            print(f"\n📥 Streaming ingest from {sys.argv[2]}...")
+            ingest_stream(iter_jsonl(sys.argv[2]), source=source_fingerprint(sys.argv[2]))
         elif sys.argv[1] == "--search":
             demo_search()
         elif sys.argv[1] == "--rag":
             demo_rag()
+        elif sys.argv[1] == "--snapshot":
+            snapshot = refresh_snapshot(sys.argv[2] if len(sys.argv) > 2 else None)
+            print(f"\n📸 Exported {len(snapshot)} chunks to {snapshot.path}")
+            print(f"  Serve from it with: SNAPSHOT_PATH={snapshot.path} streamlit run streamlit_app.py")
         elif sys.argv[1] == "--all":
             demo_setup()
             input("\n⏩ Press Enter to run the semantic search demo...")
@@ -412,16 +1279,19 @@ if __name__ == "__main__":
             demo_rag()
     else:
         # Default behavior: check status and auto-setup if needed
-        if collection.count() == 0:
+        if get_collection().count() == 0:
             print("\n⚠️  Collection is empty. Running setup...")
             demo_setup()
         else:
-            print(f"\n✓ Collection already contains {collection.count()} documents")
-            print("  (Use '--reset' to clear and re-setup)")
+            print(f"\n✓ Collection already contains {get_collection().count()} documents")
+            print("  (Use '--sync' to apply changes, or '--reset' to clear and re-setup)")
         
         print("\n💡 Usage:")
         print("  python rag_demo.py           # Check status")
+        print("  python rag_demo.py --sync    # Apply changed blogs (delta update)")
         print("  python rag_demo.py --reset   # Reset and re-setup")
+        print("  python rag_demo.py --ingest <blogs.jsonl>  # Stream a large corpus (resumable)")
+        print("  python rag_demo.py --snapshot [path]  # Export a memory-mapped snapshot")
         print("  python rag_demo.py --search  # Demo search")
         print("  python rag_demo.py --rag     # Demo RAG pipeline")
         print("  python rag_demo.py --all     # Run all demos")
@@ -0,0 +1,198 @@
+"""
+WCC AI Learning Series - Session 3: RAG API Service
+An asyncio HTTP service around semantic_search and rag_query
+
+Endpoints:
+    POST /search  {"query": "...", "k": 5, "filters": {...}}     -> matching chunks
+    POST /ask     {"question": "...", "k": 5, "filters": {...}}  -> answer + sources
+    GET  /stats   coalescing, batching and cache hit rates
+    GET  /        health check
+
+Everything expensive is shared by all requests in the process: one Vertex AI
+client (and its connection pool), one collection or snapshot, and one
+bounded thread pool for the blocking calls. On top of that:
+
+- Identical questions in flight at the same time are answered once
+  (after lowercasing and dropping trailing punctuation)
+- Questions whose embeddings are nearly identical share one Gemini call
+  (only with embeddings of at least COALESCE_MIN_DIMENSIONS; the demo's
+  10-dim embeddings can't tell similar-looking questions apart)
+- Query embeddings arriving within EMBED_BATCH_WAIT_MS are sent to
+  Vertex AI together in one embed_content call
+
+Run from the live-demo folder:
+    uvicorn rag_service:app --port 8080
+    python rag_service.py                # Same, on $PORT (default 8080)
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+import rag_demo
+from metadata_filters import filters_key, normalize_filters
+from query_cache import normalize_question
+from request_coalescing import Coalescer, EmbeddingBatcher, SimilarCoalescer
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Blocking calls (Vertex AI, ChromaDB) run on this many threads, which also
+# caps the requests each process sends to Vertex AI at once
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "8"))
+
+# How long the first query embedding waits for others to batch with
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "250"))
+
+# Questions at least this similar (cosine) share one answer while in flight,
+# if their embeddings have at least COALESCE_MIN_DIMENSIONS dimensions
+COALESCE_THRESHOLD = float(os.getenv("COALESCE_THRESHOLD", "0.98"))
+COALESCE_MIN_DIMENSIONS = int(os.getenv("COALESCE_MIN_DIMENSIONS", "256"))
+
+executor = ThreadPoolExecutor(max_workers=SERVICE_WORKERS, thread_name_prefix="rag")
+batcher = EmbeddingBatcher(rag_demo.embed_queries, max_batch=EMBED_BATCH_MAX,
+                           max_wait_ms=EMBED_BATCH_WAIT_MS, executor=executor)
+search_coalescer = Coalescer()
+ask_coalescer = Coalescer()
+similar_coalescer = SimilarCoalescer(threshold=COALESCE_THRESHOLD, min_dimensions=COALESCE_MIN_DIMENSIONS)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the service thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+# ============================================================================
+# SEARCH AND ANSWER
+# ============================================================================
+
+async def search(query: str, k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
+    """Async semantic_search, with coalescing and batched embedding"""
+    key = ("search", normalize_question(query), k, filters_key(filters))
+
+    async def compute() -> List[Dict]:
+        query_embedding = await batcher.embed(query)
+        return await run_blocking(rag_demo.retrieve, query, query_embedding, k=k, filters=filters)
+
+    return await search_coalescer.run(key, compute)
+
+
+async def ask(question: str, k: int = 5, filters: Optional[Dict] = None) -> Dict:
+    """Async rag_query, with coalescing and batched embedding"""
+    scope = (k, filters_key(filters))
+
+    async def compute() -> Dict:
+        query_embedding = await batcher.embed(question)
+        return await similar_coalescer.run(query_embedding, scope, partial(
+            run_blocking, rag_demo.rag_query, question, k=k, filters=filters,
+            query_embedding=query_embedding))
+
+    return await ask_coalescer.run(("ask", normalize_question(question), *scope), compute)
+
+
+def service_stats() -> Dict:
+    return {
+        "search_coalescing": search_coalescer.stats(),
+        "ask_coalescing": ask_coalescer.stats(),
+        "similar_question_coalescing": similar_coalescer.stats(),
+        "embedding_batches": batcher.stats(),
+        "caches": rag_demo.cache_stats(),
+    }
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("Initializing RAG service...")
+    # Create the client and open the collection (or snapshot) now, not on the first request
+    await run_blocking(rag_demo.get_client)
+    chunks = await run_blocking(rag_demo.stored_chunk_count)
+    print(f"✅ Ready: {chunks} chunks, {SERVICE_WORKERS} worker threads")
+    yield
+    executor.shutdown(wait=False)
+
+
+app = FastAPI(title="WCC RAG API", lifespan=lifespan)
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = Field(5, ge=1, le=50)
+    filters: Optional[Dict[str, str]] = None
+
+
+class SearchResponse(BaseModel):
+    results: List[Dict]
+
+
+class AskRequest(BaseModel):
+    question: str
+    k: int = Field(5, ge=1, le=50)
+    filters: Optional[Dict[str, str]] = None
+    include_chunks: bool = False
+
+
+class AskResponse(BaseModel):
+    answer: str
+    sources: List[Dict]
+    chunks: Optional[List[Dict]] = None
+
+
+def check_filters(filters: Optional[Dict]) -> None:
+    try:
+        normalize_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/")
+async def root():
+    return {"message": "WCC RAG API is running! Go to /docs to test it."}
+
+
+@app.get("/stats")
+async def stats():
+    return service_stats()
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search_endpoint(request: SearchRequest):
+    check_filters(request.filters)
+    try:
+        return SearchResponse(results=await search(request.query, request.k, request.filters))
+    except Exception as e:
+        print(f"ERROR IN SEARCH ENDPOINT: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask_endpoint(request: AskRequest):
+    check_filters(request.filters)
+    try:
+        result = await ask(request.question, request.k, request.filters)
+    except Exception as e:
+        print(f"ERROR IN ASK ENDPOINT: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+    return AskResponse(
+        answer=result['answer'],
+        sources=result['sources'],
+        chunks=result['chunks'] if request.include_chunks else None,
+    )
+
+
+if __name__ == "__main__":
+    # Cloud Run sets PORT; 0.0.0.0 is needed inside a container
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
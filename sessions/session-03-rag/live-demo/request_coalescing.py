@@ -0,0 +1,234 @@
+"""
+WCC AI Learning Series - Session 3: Request Coalescing
+Share work between concurrent requests in an asyncio server
+
+When many users ask at the same time, they often ask the same thing (the
+question on the slide, a link shared in chat). Without coordination each
+request embeds the question, searches and calls Gemini again. Three tools:
+
+1. Coalescer - identical requests in flight at once share one computation
+   (the first runs it, the rest wait for its result)
+2. SimilarCoalescer - the same, for requests whose embeddings are nearly
+   identical (cosine similarity above a threshold), like "What is RAG?"
+   and "What does RAG mean?" (only for embeddings large enough to tell
+   questions apart; smaller ones are never merged)
+3. EmbeddingBatcher - queries arriving within a few milliseconds of each
+   other are embedded together in one embed_content call, instead of one
+   call each
+
+None of these cache anything: once a computation finishes it is forgotten
+(the query caches in query_cache.py handle repeats over time).
+
+Usage (inside async code):
+    coalescer = Coalescer()
+    batcher = EmbeddingBatcher(embed_queries)
+    embedding = await batcher.embed("What is RAG?")
+    result = await coalescer.run(key, lambda: answer(question))
+"""
+
+import asyncio
+import numpy as np
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+# ============================================================================
+# COALESCING
+# ============================================================================
+
+class Coalescer:
+    """
+    Run one computation per key, however many requests ask for it at once
+
+    A request that arrives while the computation for its key is running
+    waits for that result instead of starting its own. If the computation
+    fails, every waiting request gets the error. A request that is
+    cancelled (e.g. the client disconnected) doesn't cancel the shared
+    computation.
+    """
+
+    def __init__(self):
+        self.leaders = 0    # Requests that ran the computation
+        self.followers = 0  # Requests that shared someone else's
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        Get the result for a key
+
+        Args:
+            key: Identifies the computation (requests with equal keys share it)
+            compute: Starts the computation; only called if none is in flight
+
+        Returns:
+            The computation's result (the same object for every request)
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.followers += 1
+            return await asyncio.shield(task)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(compute())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict:
+        requests = self.leaders + self.followers
+        return {
+            "requests": requests,
+            "coalesced": self.followers,
+            "coalesced_rate": self.followers / requests if requests else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+class SimilarCoalescer:
+    """
+    Coalesce requests whose embeddings are nearly identical
+
+    Works like Coalescer, but requests are matched by cosine similarity
+    instead of by key. Embeddings smaller than min_dimensions are too coarse
+    for this (different questions can score above the threshold), so those
+    requests always run their own computation - put a Coalescer keyed on
+    the normalized question in front to still share identical ones.
+
+    Args:
+        threshold: Minimum cosine similarity to share a computation
+                   (the same default as the semantic answer cache)
+        min_dimensions: Smallest embedding size that is matched by similarity
+                        (the same default as the semantic answer cache)
+    """
+
+    def __init__(self, threshold: float = 0.98, min_dimensions: int = 256):
+        self.threshold = threshold
+        self.min_dimensions = min_dimensions
+        self.leaders = 0
+        self.followers = 0
+        self._in_flight: Dict[asyncio.Task, Tuple[np.ndarray, Hashable]] = {}
+
+    async def run(self, embedding: List[float], scope: Hashable,
+                  compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        Get the result for a query embedding
+
+        Args:
+            embedding: Embedding of the request's query
+            scope: Anything else the result depends on (k, filters, ...);
+                   only requests with the same scope are coalesced
+            compute: Starts the computation if nothing similar is in flight
+        """
+        if len(embedding) < self.min_dimensions:
+            self.leaders += 1
+            return await compute()
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+
+        # Only a handful of requests are ever in flight, so a scan is enough
+        for task, (other, other_scope) in self._in_flight.items():
+            if other_scope == scope and float(other @ vector) >= self.threshold:
+                self.followers += 1
+                return await asyncio.shield(task)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(compute())
+        self._in_flight[task] = (vector, scope)
+        task.add_done_callback(self._in_flight.pop)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        requests = self.leaders + self.followers
+        return {
+            "requests": requests,
+            "coalesced": self.followers,
+            "coalesced_rate": self.followers / requests if requests else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+class EmbeddingBatcher:
+    """
+    Group concurrent embedding requests into one batched call
+
+    The first text to arrive starts a short timer (max_wait_ms); every text
+    that arrives before it fires, up to max_batch, goes into the same call.
+    Duplicate texts in a batch are embedded once.
+
+    Args:
+        embed: Blocking function texts -> embeddings (e.g. rag_demo.embed_queries),
+               run on the executor so it doesn't block the event loop
+        max_batch: Texts per call (250 is the embed_content limit)
+        max_wait_ms: How long the first text waits for others to join it
+        executor: Thread pool for the blocking calls (None = asyncio's default)
+    """
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]],
+                 max_batch: int = 250, max_wait_ms: float = 5.0,
+                 executor: Optional[Executor] = None):
+        self._embed = embed
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self.batches = 0
+        self.texts = 0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()  # Keeps batch tasks alive until they finish
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed one text, batched with whatever else arrives at the same time"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.texts += len(batch)
+        try:
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(self.executor, self._embed, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, embeddings))
+        for text, future in batch:
+            if not future.done():  # Skip requests that were cancelled meanwhile
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,157 @@
+"""
+WCC AI Learning Series - Session 3: Reranking
+Re-order retrieved chunks before they reach the prompt
+
+Vector search is fast but coarse, especially with 10-dimensional
+embeddings. A reranker looks at the query and each candidate chunk
+together and re-orders them, so we can fetch more candidates (e.g. 4 x k),
+keep only the best k, and send Gemini a shorter, more precise prompt.
+
+The default scorer is lexical (query word overlap, weighted by how rare
+each word is among the candidates, plus a bonus for word pairs that appear
+together), so it needs no model and runs in well under a millisecond. Any
+function `score(query, texts) -> scores` can be plugged in instead, e.g. a
+small CPU cross-encoder:
+
+    from sentence_transformers import CrossEncoder
+    model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    reranker = Reranker(lambda query, texts: model.predict([(query, t) for t in texts]))
+
+Reranking has a time budget per query. If scoring takes longer, the
+results fall back to plain vector order, so a slow or overloaded reranker
+costs at most the budget (plus one scorer call) and never fails a query.
+"""
+
+import math
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+from bm25_index import tokenize
+
+# Words that match almost every chunk and say nothing about relevance
+STOPWORDS = frozenset(
+    "a an and are as at be by can did do does for from has have how i in is it "
+    "me my of on or our the their this to was we what when where which who why "
+    "will with you your".split()
+)
+
+
+class LexicalScorer:
+    """
+    Score texts by overlap with the query's words
+
+    Args:
+        pair_weight: Extra weight for adjacent query word pairs found in the text
+    """
+
+    def __init__(self, pair_weight: float = 0.5):
+        self.pair_weight = pair_weight
+
+    def __call__(self, query: str, texts: Sequence[str]) -> List[float]:
+        query_terms = [term for term in tokenize(query) if term not in STOPWORDS]
+        if not query_terms:
+            return [0.0] * len(texts)
+        query_set = set(query_terms)
+        query_pairs = set(zip(query_terms, query_terms[1:]))
+
+        doc_terms = []
+        doc_pairs = []
+        for text in texts:
+            terms = tokenize(text)
+            doc_terms.append(query_set.intersection(terms))
+            doc_pairs.append(query_pairs.intersection(zip(terms, terms[1:])) if query_pairs else ())
+
+        # Rare words among the candidates say more than words they all share
+        n = len(texts)
+        idf = {term: math.log(1 + n / (1 + sum(term in found for found in doc_terms)))
+               for term in query_set}
+        total = sum(idf.values())
+
+        scores = []
+        for found, pairs in zip(doc_terms, doc_pairs):
+            score = sum(idf[term] for term in found) / total
+            if query_pairs:
+                score += self.pair_weight * len(pairs) / len(query_pairs)
+            scores.append(score)
+        return scores
+
+
+class Reranker:
+    """
+    Rerank search results within a time budget
+
+    Args:
+        scorer: Function (query, texts) -> one relevance score per text
+                (default: LexicalScorer)
+        budget_ms: Time allowed per query; over budget, vector order is kept
+        rank_weight: Weight of the original (vector) rank in the final score,
+                     so semantic matches aren't thrown away for word overlap
+        batch_size: Texts per scorer call, with the budget checked between
+                    calls (0 = all at once; set it for slow model scorers so
+                    they stop early instead of finishing a large batch)
+    """
+
+    def __init__(self, scorer: Optional[Callable[[str, Sequence[str]], Sequence[float]]] = None,
+                 budget_ms: float = 50.0, rank_weight: float = 0.3, batch_size: int = 0):
+        self.scorer = scorer or LexicalScorer()
+        self.budget_ms = budget_ms
+        self.rank_weight = rank_weight
+        self.batch_size = batch_size
+        self.reranked = 0
+        self.fallbacks = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def rerank(self, query: str, docs: List[Dict], k: int) -> List[Dict]:
+        """
+        Keep the k best of the candidate docs
+
+        Args:
+            query: The user's query
+            docs: Candidates in vector order (best first), usually more than k
+            k: Number of results to keep
+
+        Returns:
+            Top k docs with an added 'rerank_score', or docs[:k] unchanged
+            if scoring ran over budget
+        """
+        if len(docs) <= 1:
+            return docs[:k]
+
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        texts = [doc['text'] for doc in docs]
+        batch_size = self.batch_size or len(texts)
+        scores: List[float] = []
+        for batch_start in range(0, len(texts), batch_size):
+            scores.extend(self.scorer(query, texts[batch_start:batch_start + batch_size]))
+            if time.perf_counter() > deadline:
+                self._record(start, fallback=True)
+                return docs[:k]
+
+        # Blend in the vector rank: 1.0 for the first candidate, 0 for the last
+        n = len(docs)
+        final = [float(score) + self.rank_weight * (1 - rank / (n - 1))
+                 for rank, score in enumerate(scores)]
+        order = sorted(range(n), key=lambda i: -final[i])[:k]
+
+        self._record(start, fallback=False)
+        return [{**docs[i], 'rerank_score': final[i]} for i in order]
+
+    def stats(self) -> Dict:
+        """Queries reranked, how many fell back to vector order, and mean time"""
+        with self._lock:
+            queries = self.reranked + self.fallbacks
+            return {
+                "reranked": self.reranked,
+                "fallbacks": self.fallbacks,
+                "avg_ms": self.total_ms / queries if queries else 0.0,
+            }
+
+    def _record(self, start: float, fallback: bool) -> None:
+        with self._lock:
+            self.total_ms += (time.perf_counter() - start) * 1000
+            if fallback:
+                self.fallbacks += 1
+            else:
+                self.reranked += 1
@@ -0,0 +1,71 @@
+"""
+WCC AI Learning Series - Session 3: Resource Registry
+Create expensive clients on first use, once per process
+
+Building the Gemini client, opening ChromaDB and loading indexes all take
+time. Doing it at import means every `import rag_demo` (and every cold
+start of the Streamlit app) pays for all of them, even when a command only
+needs one. The registry holds a factory per resource and only calls it the
+first time the resource is asked for.
+
+Usage:
+    registry.register("client", make_client)
+    client = registry.get("client")       # Created now, reused afterwards
+    registry.set("client", FakeClient())  # Override (tests, benchmarks)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ResourceRegistry:
+    """Thread-safe, lazily populated map of named resources"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Set how to build a resource (it is not built until get() is called)"""
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """Return a resource, building it on first use"""
+        # Fast path without the lock once the resource exists
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown resource: {name}")
+                # Factories may get() other resources, hence the re-entrant lock
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def set(self, name: str, value: Any) -> None:
+        """Replace a resource (e.g. a fake client in tests)"""
+        with self._lock:
+            self._instances[name] = value
+
+    def is_created(self, name: str) -> bool:
+        return name in self._instances
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Return a resource if it has been created, without creating it"""
+        return self._instances.get(name)
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Forget one resource (or all), so the next get() builds it again"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+# One registry per process
+registry = ResourceRegistry()
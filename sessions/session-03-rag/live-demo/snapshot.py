@@ -0,0 +1,369 @@
+"""
+WCC AI Learning Series - Session 3: Vector Snapshots
+A read-only, memory-mapped copy of the collection for fast cold starts
+
+Opening ChromaDB (or loading a saved local index, which parses every
+document and metadata dict from JSON) takes longer the bigger the
+collection gets, and every worker process pays for it and holds its own
+copy. A snapshot is a folder of flat files that are memory-mapped instead
+of loaded. Each export goes into a new version folder, and a pointer file
+names the live one:
+
+    CURRENT                     name of the live version folder
+    <version>/
+        manifest.json           count, dimension, creation time
+        vectors.npy             float32 matrix, one row per chunk
+        sq_norms.npy            squared length of each row
+        ids / documents / metadatas
+            <name>.bin          UTF-8 strings back to back (metadata as JSON)
+            <name>.offsets.npy  where each string starts and ends
+        ivf_*.npy               optional k-means clusters for approximate search
+
+Publishing a new export only replaces CURRENT (an atomic rename), so the
+snapshot path always points at a complete version: a process opening it
+while an export finishes gets either the old version or the new one.
+
+Opening one reads only the manifest, so it takes milliseconds whatever the
+size. Pages are read from disk when a search first touches them and live in
+the OS page cache, so every process that opens the same snapshot shares
+them instead of each holding a copy. Documents and metadata are decoded
+only for the rows a search returns.
+
+Usage:
+    snapshot_from_collection(collection, "./snapshot")   # Export
+    snapshot = Snapshot("./snapshot")                     # Open (zero copy)
+    results = snapshot.search(query_embedding, k=5)
+"""
+
+import os
+import json
+import time
+import shutil
+import datetime
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence
+from metadata_filters import MetadataIndex, normalize_filters
+from vector_index import FlatIndex, IVFIndex
+
+SNAPSHOT_FORMAT = 1
+
+# Pointer file naming the live version folder inside a snapshot path
+CURRENT_FILE = "CURRENT"
+
+# Version folders kept after an export: the live one and the one before it,
+# which processes that opened the snapshot just before the switch may still read
+KEEP_VERSIONS = 2
+
+
+# ============================================================================
+# STRING TABLES
+# ============================================================================
+
+class _StringTable:
+    """Memory-mapped list of strings"""
+
+    def __init__(self, path: str, name: str):
+        self._offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+        data_path = os.path.join(path, f"{name}.bin")
+        # np.memmap can't map an empty file
+        if os.path.getsize(data_path):
+            self._data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self._data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._data[self._offsets[i]:self._offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @staticmethod
+    def write(path: str, name: str, strings: Iterable[str]) -> None:
+        offsets = [0]
+        with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+            for string in strings:
+                data = string.encode("utf-8")
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.save(os.path.join(path, f"{name}.offsets.npy"), np.array(offsets, dtype=np.int64))
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_snapshot(index: FlatIndex, path: str) -> None:
+    """
+    Write a local index (flat or IVF) as a snapshot
+
+    IVF clusters are included if the index has been trained, so the
+    snapshot can be searched approximately too. The export is written to a
+    new version folder and published by atomically replacing the CURRENT
+    pointer, so `path` never points at a missing or half-written version.
+    Processes that still have the old version open keep reading its files.
+    """
+    os.makedirs(path, exist_ok=True)
+    version = f"{time.time_ns():020d}-{os.getpid()}"
+    tmp_path = os.path.join(path, version + ".tmp")
+    os.makedirs(tmp_path)
+
+    vectors = np.ascontiguousarray(index.vectors, dtype=np.float32)
+    np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+    np.save(os.path.join(tmp_path, "sq_norms.npy"), np.einsum("ij,ij->i", vectors, vectors))
+    _StringTable.write(tmp_path, "ids", index.ids)
+    _StringTable.write(tmp_path, "documents", index.documents)
+    _StringTable.write(tmp_path, "metadatas", (json.dumps(m) for m in index.metadatas))
+
+    lists = index.inverted_lists() if isinstance(index, IVFIndex) else None
+    if lists is not None:
+        for name, array in zip(("centroids", "order", "offsets"), lists):
+            np.save(os.path.join(tmp_path, f"ivf_{name}.npy"), array)
+
+    with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": SNAPSHOT_FORMAT,
+            "count": len(index),
+            "dim": int(vectors.shape[1]),
+            "ivf": lists is not None,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        }, f)
+
+    # Publish: the folder gets its final name, then CURRENT points to it
+    os.rename(tmp_path, os.path.join(path, version))
+    pointer_tmp = os.path.join(path, f"{CURRENT_FILE}.{version}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(path, CURRENT_FILE))
+
+    # Remove old versions (never the live one, if another export published after us)
+    current = os.path.basename(current_version_path(path))
+    versions = sorted(name for name in os.listdir(path)
+                      if name[0].isdigit() and not name.endswith(".tmp"))
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != current:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def current_version_path(path: str) -> str:
+    """Folder of the live version of the snapshot at path"""
+    with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+        return os.path.join(path, f.read().strip())
+
+
+def snapshot_from_collection(collection, path: str, ivf_min_size: int = 1000) -> "Snapshot":
+    """
+    Export everything in a ChromaDB collection as a snapshot and open it
+
+    Args:
+        collection: ChromaDB collection
+        path: Snapshot folder
+        ivf_min_size: Chunks needed before IVF clusters are added
+
+    Returns:
+        The new snapshot
+    """
+    index = IVFIndex(min_train_size=ivf_min_size)
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    if data["ids"]:
+        index.add(data["ids"], data["embeddings"], data["documents"], data["metadatas"])  # Trains the clusters
+    export_snapshot(index, path)
+    return Snapshot(path)
+
+
+def snapshot_exists(path: str) -> bool:
+    return os.path.exists(os.path.join(path, CURRENT_FILE))
+
+
+# ============================================================================
+# READ-ONLY SEARCH
+# ============================================================================
+
+class Snapshot:
+    """
+    Search a snapshot without loading it
+
+    Searches are exact by default. If the snapshot has IVF clusters,
+    unfiltered searches only compare the `nprobe` closest clusters (set
+    nprobe=0 to always search exactly).
+
+    Args:
+        path: Snapshot folder (see export_snapshot); the version CURRENT
+              names when it is opened is used until the Snapshot is reopened
+        nprobe: Clusters searched per query when IVF clusters are present
+    """
+
+    kind = "snapshot"
+
+    # Upper bound on queries x rows of distances held at once
+    max_distance_cells = 1 << 24
+
+    def __init__(self, path: str, nprobe: int = 8, attempts: int = 3):
+        self.path = path
+        self.nprobe = nprobe
+        self._rows: Optional[Dict[str, int]] = None  # Chunk id -> row, built on first use
+        for attempt in range(attempts):
+            try:
+                self._open(current_version_path(path))
+                return
+            except FileNotFoundError:
+                # Two exports finished while we were opening (our version was
+                # pruned): read CURRENT again
+                if attempt == attempts - 1:
+                    raise
+
+    def _open(self, version_path: str) -> None:
+        with open(os.path.join(version_path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format in {version_path}: {self.manifest.get('format')}")
+
+        path = self.version_path = version_path
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self._sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode="r")
+        self.ids = _StringTable(path, "ids")
+        self.documents = _StringTable(path, "documents")
+        self._metadatas = _StringTable(path, "metadatas")
+        self._metadata_index: Optional[MetadataIndex] = None
+
+        self._ivf = None
+        if self.manifest.get("ivf"):
+            self._ivf = tuple(np.load(os.path.join(path, f"ivf_{name}.npy"), mmap_mode="r")
+                              for name in ("centroids", "order", "offsets"))
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.manifest["dim"]
+
+    def search_memory_bytes(self) -> int:
+        """Bytes an exact search scans (memory-mapped, shared between processes)"""
+        return self.vectors.nbytes + self._sq_norms.nbytes
+
+    def metadata(self, row: int) -> Dict:
+        return json.loads(self._metadatas[row])
+
+    def row_of(self, chunk_id: str) -> Optional[int]:
+        """Row holding a chunk id (None if it isn't in the snapshot)"""
+        if self._rows is None:
+            # Decodes every id once, on first use
+            self._rows = {stored_id: row for row, stored_id in enumerate(self.ids)}
+        return self._rows.get(chunk_id)
+
+    def fetch(self, ids: Sequence[str], query_embedding: Sequence[float],
+              filters: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Look up chunks by id, with their distance to a query
+
+        Args:
+            ids: Chunk ids (unknown ids are skipped)
+            query_embedding: Query the distances are measured from
+            filters: Optional metadata filters the chunks must match
+
+        Returns:
+            {chunk id: {'id', 'text', 'metadata', 'distance'}}
+        """
+        rows = [(chunk_id, self.row_of(chunk_id)) for chunk_id in ids]
+        rows = [(chunk_id, row) for chunk_id, row in rows if row is not None]
+        allowed = self.filter_rows(filters)
+        if allowed is not None:
+            allowed = set(allowed.tolist())
+            rows = [(chunk_id, row) for chunk_id, row in rows if row in allowed]
+        if not rows:
+            return {}
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        diff = self.vectors[[row for _, row in rows]] - query
+        distances = np.einsum("ij,ij->i", diff, diff)
+        return {chunk_id: self._result(row, distance)
+                for (chunk_id, row), distance in zip(rows, distances)}
+
+    def filter_rows(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """Rows whose metadata matches the filters (None = no filters, all rows)"""
+        if not normalize_filters(filters):
+            return None
+        return self._get_metadata_index().rows(filters)
+
+    @property
+    def titles(self) -> List[str]:
+        """Sorted distinct titles in the snapshot"""
+        return self._get_metadata_index().titles
+
+    def _get_metadata_index(self) -> MetadataIndex:
+        # The only operation that decodes every metadata row (once, on first use)
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex([json.loads(m) for m in self._metadatas])
+        return self._metadata_index
+
+    def search(self, query_embedding: Sequence[float], k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Find the k nearest chunks to a query embedding
+
+        Returns:
+            List of {'id', 'text', 'metadata', 'distance'} dicts, closest first
+            (the same format as FlatIndex.search)
+        """
+        return self.search_batch([query_embedding], k, filters=filters)[0]
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], k: int = 5,
+                     block_size: int = 256, filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """Search for many queries at once (one result list per query)"""
+        rows = self.filter_rows(filters)
+        if len(self) == 0 or k <= 0 or (rows is not None and len(rows) == 0):
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if rows is None and self._ivf is not None and self.nprobe > 0:
+            return [self._search_rows(query, self._probe(query), k) for query in queries]
+
+        if rows is None:
+            vectors, sq_norms = self.vectors, self._sq_norms
+        else:
+            vectors, sq_norms = self.vectors[rows], self._sq_norms[rows]
+
+        block_size = max(1, min(block_size, self.max_distance_cells // len(vectors)))
+        k = min(k, len(vectors))
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            distances = (sq_norms[None, :] - 2.0 * (block @ vectors.T)
+                         + np.einsum("ij,ij->i", block, block)[:, None])
+            np.maximum(distances, 0.0, out=distances)
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            for row_distances, row_top in zip(distances, top):
+                row_top = row_top[np.argsort(row_distances[row_top], kind="stable")]
+                results.append([
+                    self._result(int(row if rows is None else rows[row]), row_distances[row])
+                    for row in row_top])
+        return results
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        """Rows in the nprobe clusters closest to the query, in file order"""
+        centroids, order, offsets = self._ivf
+        nprobe = min(self.nprobe, len(centroids))
+        c_dist = np.einsum("ij,ij->i", centroids, centroids) - 2.0 * (centroids @ query)
+        probes = np.argpartition(c_dist, nprobe - 1)[:nprobe]
+        return np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes]))
+
+    def _search_rows(self, query: np.ndarray, rows: np.ndarray, k: int) -> List[Dict]:
+        if len(rows) == 0:
+            return []
+        distances = self._sq_norms[rows] - 2.0 * (self.vectors[rows] @ query) + float(query @ query)
+        np.maximum(distances, 0.0, out=distances)
+        k = min(k, len(rows))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [self._result(int(rows[i]), distances[i]) for i in top]
+
+    def _result(self, row: int, distance: float) -> Dict:
+        return {
+            'id': self.ids[row],
+            'text': self.documents[row],
+            'metadata': self.metadata(row),
+            'distance': float(distance)  # Lower = more similar
+        }
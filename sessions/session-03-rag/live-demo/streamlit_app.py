@@ -12,10 +12,16 @@ from typing import Dict, List
 # Import our RAG functions
 from rag_demo import (
     semantic_search,
-    rag_query,
-    collection,
+    rag_query_stream,
+    get_collection,
+    get_client,
+    stored_chunk_count,
+    chunk_counts_by_title,
+    SNAPSHOT_PATH,
+    registry,
     SAMPLE_BLOGS,
-    demo_setup
+    demo_setup,
+    cache_stats
 )
 
 # ============================================================================
@@ -29,6 +35,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ============================================================================
+# SHARED RESOURCES
+# ============================================================================
+
+# Streamlit reruns this script on every interaction. Cached resources are
+# created once per server process and handed to rag_demo, so reruns (and
+# code reloads) never reopen ChromaDB or rebuild the Gemini client.
+# With SNAPSHOT_PATH set, searches and chunk counts read the memory-mapped
+# snapshot, so ChromaDB is only opened when something is written.
+
+@st.cache_resource
+def load_collection():
+    return get_collection()
+
+@st.cache_resource
+def load_client():
+    return get_client()
+
+if not SNAPSHOT_PATH:
+    registry.set("collection", load_collection())
+
 # ============================================================================
 # CUSTOM CSS
 # ============================================================================
@@ -103,12 +130,32 @@ with st.sidebar:
         help="Display distance scores (lower = more similar)"
     )
     
+    st.markdown("### 🗂️ Filters")
+    
+    blog_urls = {blog['url']: blog['title'] for blog in SAMPLE_BLOGS}
+    source_filter = st.selectbox(
+        "Blog post",
+        options=[""] + list(blog_urls),
+        format_func=lambda url: blog_urls.get(url, "All blog posts"),
+        help="Only search chunks from this post"
+    )
+    
+    title_filter = st.text_input(
+        "Title starts with",
+        help="Only search posts whose title starts with this text (case-sensitive)"
+    )
+    
+    # Applied before the vector search (see metadata_filters.py); blank
+    # fields mean no filter, so unfiltered questions can use the IVF index
+    filters = {"source": source_filter, "title_prefix": title_filter.strip()}
+    filters = {key: value for key, value in filters.items() if value} or None
+    
     st.markdown("---")
     
     st.markdown("### 📊 System Status")
     
     # Check collection status
-    doc_count = collection.count()
+    doc_count = stored_chunk_count()
     
     if doc_count > 0:
         st.success(f"✓ {doc_count} chunks indexed")
@@ -126,6 +173,12 @@ with st.sidebar:
     **LLM:** gemini-2.5-flash-lite
     """)
     
+    stats = cache_stats()
+    st.markdown(f"""
+    **Answer cache hit rate:** {stats['answers']['hit_rate']:.0%}  
+    **Query cache hit rate:** {stats['query_embeddings']['hit_rate']:.0%}
+    """)
+    
     st.markdown("---")
     
     st.markdown("""
@@ -145,7 +198,7 @@ st.markdown('<p class="sub-header">Ask questions about Women Coding Community co
             unsafe_allow_html=True)
 
 # Check if system is initialized
-if collection.count() == 0:
+if stored_chunk_count() == 0:
     st.error("⚠️ System not initialized. Please click 'Initialize System' in the sidebar.")
     st.stop()
 
@@ -180,12 +233,22 @@ with tab1:
             question = "What advice do you have for mentees?"
     
     if question:
-        with st.spinner("🔍 Searching and generating answer..."):
-            result = rag_query(question, k=num_results)
+        # The Gemini client is only needed once someone asks a question
+        registry.set("client", load_client())
         
-        # Display answer
+        # Display answer as it is generated
         st.markdown("### 💬 Answer")
-        st.markdown(result['answer'])
+        result = {}
+        
+        def answer_stream():
+            # Text pieces go to the page; the final dict holds sources and chunks
+            for item in rag_query_stream(question, k=num_results, filters=filters):
+                if isinstance(item, dict):
+                    result.update(item)
+                else:
+                    yield item
+        
+        st.write_stream(answer_stream())
         
         # Display sources
         if result['sources']:
@@ -240,8 +303,10 @@ with tab2:
             search_query = "how to learn programming"
     
     if search_query:
+        registry.set("client", load_client())
+        
         with st.spinner("🔍 Searching..."):
-            results = semantic_search(search_query, k=num_results)
+            results = semantic_search(search_query, k=num_results, filters=filters)
         
         if results:
             st.markdown(f"### Found {len(results)} relevant chunks")
@@ -273,6 +338,7 @@ with tab2:
 with tab3:
     st.markdown("### 📚 Indexed Blog Posts")
     st.markdown(f"Currently indexing **{len(SAMPLE_BLOGS)}** blog posts")
+    chunk_counts = chunk_counts_by_title()
     
     for i, blog in enumerate(SAMPLE_BLOGS, 1):
         with st.expander(f"{i}. {blog['title']}"):
@@ -282,9 +348,7 @@ with tab3:
                 st.markdown(f"**URL:** [{blog['url']}]({blog['url']})")
             with col2:
                 # Count chunks for this blog
-                chunks_in_blog = sum(1 for j in range(collection.count()) 
-                                   if collection.get(ids=[f"chunk_{j}"])['metadatas'][0]['title'] == blog['title'])
-                st.metric("Chunks", chunks_in_blog)
+                st.metric("Chunks", chunk_counts.get(blog['title'], 0))
             
             st.markdown("**Content Preview:**")
             st.markdown(f'<div class="chunk-preview">{blog["content"][:500]}...</div>', 
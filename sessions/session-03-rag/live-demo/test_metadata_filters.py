@@ -0,0 +1,52 @@
+"""
+Tests for posts whose date isn't in ISO format
+
+Run from the live-demo folder:
+    python -m pytest test_metadata_filters.py
+"""
+
+from chunker import chunk_blog
+from metadata_filters import date_metadata, date_number
+from vector_index import FlatIndex
+
+
+def make_blog(title, date):
+    return {"title": title, "date": date, "url": f"https://example.com/{title}",
+            "content": "Women Coding Community meetup notes. " * 20}
+
+
+def test_non_iso_date_has_no_date_num():
+    assert date_metadata("2024-10-15") == {"date_num": 20241015}
+    assert date_metadata("October 15, 2024") == {}
+    assert date_metadata("15/10/2024") == {}
+    assert date_metadata("") == {}
+
+
+def test_date_number_still_rejects_bad_filter_dates():
+    for date in ["October 2024", "2024-13", "2024-02-40"]:
+        try:
+            date_number(date)
+        except ValueError:
+            continue
+        raise AssertionError(f"{date!r} was accepted")
+
+
+def test_chunking_keeps_posts_with_non_iso_dates():
+    chunks = chunk_blog(make_blog("meetup", "October 15, 2024"))
+    assert chunks
+    for chunk in chunks:
+        assert chunk["metadata"]["date"] == "October 15, 2024"
+        assert "date_num" not in chunk["metadata"]
+
+
+def test_non_iso_dated_chunks_are_searchable_but_not_date_matched():
+    index = FlatIndex()
+    chunks = chunk_blog(make_blog("iso", "2024-10-15"))[:1] + chunk_blog(make_blog("loose", "Oct 2024"))[:1]
+    index.add(["iso", "loose"], [[1.0, 0.0], [0.9, 0.1]],
+              [chunk["text"] for chunk in chunks], [chunk["metadata"] for chunk in chunks])
+
+    titles = lambda results: sorted(r["metadata"]["title"] for r in results)
+    assert titles(index.search([1.0, 0.0], k=2)) == ["iso", "loose"]
+    assert titles(index.search([1.0, 0.0], k=2, filters={"date_from": "2024"})) == ["iso"]
+    assert titles(index.search([1.0, 0.0], k=2, filters={"date_to": "2024-12-31"})) == ["iso"]
+    assert titles(index.search([1.0, 0.0], k=2, filters={"source": "https://example.com/loose"})) == ["loose"]
@@ -0,0 +1,822 @@
+"""
+WCC AI Learning Series - Session 3: Local Vector Index
+In-process vector search over a NumPy matrix
+
+ChromaDB is perfect for learning, but every `collection.query` is a round trip
+through its storage layer. Once a collection grows large, we can keep a copy
+of the embeddings in memory and search them directly with NumPy:
+
+- FlatIndex: exact brute-force search (one matrix-vector product per query)
+- IVFIndex: inverted file index - vectors are grouped into clusters with
+  k-means, and only the `nprobe` closest clusters are searched per query
+- Int8Index / BinaryIndex: search compact int8 or 1-bit codes (4x / 32x
+  smaller), then re-score a shortlist with the full-precision vectors
+
+All return the same {'id', 'text', 'metadata', 'distance'} dicts as
+rag_demo.semantic_search and accept the same metadata filters (answered
+from secondary indexes, see metadata_filters.py). Distances are squared L2,
+which is ChromaDB's default "l2" space, so scores look the same whichever
+backend is used.
+"""
+
+import os
+import json
+import threading
+import numpy as np
+from typing import List, Dict, Optional, Sequence
+from metadata_filters import MetadataIndex, normalize_filters
+
+
+def _write_file(path: str, write) -> None:
+    """
+    Write a file via a temporary file and a rename, so a crash never leaves it
+    half-written and a memory-mapped copy being read is never overwritten
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    _write_file(path, lambda f: np.save(f, array))
+
+
+def _append_rows(array: np.ndarray, buffer: Optional[np.ndarray],
+                 rows: np.ndarray) -> tuple:
+    """
+    Append rows to an array kept at the front of a larger buffer
+
+    The buffer doubles in size when it is full, so adding rows batch by batch
+    copies each row O(1) times on average instead of once per batch.
+
+    Returns:
+        (array with the rows appended, buffer it lives in)
+    """
+    n = len(array)
+    needed = n + len(rows)
+    if (buffer is None or array.base is not buffer or len(buffer) < needed
+            or buffer.dtype != rows.dtype or buffer.shape[1:] != rows.shape[1:]):
+        # First rows, or the array was replaced (delete / load / refit): start a new buffer
+        buffer = np.empty((max(needed, 2 * n, 64),) + rows.shape[1:], dtype=rows.dtype)
+        if n:
+            buffer[:n] = array
+    buffer[n:needed] = rows
+    return buffer[:needed], buffer
+
+
+# ============================================================================
+# FLAT INDEX (EXACT SEARCH)
+# ============================================================================
+
+class FlatIndex:
+    """
+    Exact nearest-neighbour search over an in-memory float32 matrix.
+
+    Rows are kept in insertion order. Adding an id that already exists
+    replaces its vector, text and metadata (upsert semantics).
+    """
+
+    kind = "flat"
+    mmap_mode: Optional[str] = None  # How load() opens vectors.npy ("r" = memory-mapped)
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self._metadata_index: Optional[MetadataIndex] = None  # Rebuilt lazily
+        self._buffers: Dict[str, np.ndarray] = {}  # Spare capacity behind growing arrays
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self._vectors.shape[1]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The float32 embedding matrix, one row per chunk (don't modify it)"""
+        return self._vectors
+
+    # ------------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------------
+
+    def add(self, ids: Sequence[str], embeddings: Sequence[Sequence[float]],
+            documents: Sequence[str], metadatas: Sequence[Dict]) -> None:
+        """
+        Add (or replace) vectors with their documents and metadata
+
+        Args:
+            ids: Unique chunk ids
+            embeddings: One embedding per id
+            documents: Chunk texts
+            metadatas: Chunk metadata dicts
+        """
+        if not ids:
+            return
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(self) and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        # Replace existing ids first so every id appears exactly once
+        existing = [i for i in ids if i in self._rows]
+        if existing:
+            self.delete(existing)
+
+        start = len(self)
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+        self._vectors = self._append("_vectors", vectors)
+        self._sq_norms = self._append("_sq_norms", self._row_norms(vectors))
+        for offset, chunk_id in enumerate(ids):
+            self._rows[chunk_id] = start + offset
+        self._metadata_index = None
+        self._on_rows_added(start)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove vectors by id (unknown ids are ignored)"""
+        drop = {self._rows[i] for i in ids if i in self._rows}
+        if not drop:
+            return
+
+        keep = np.array([row not in drop for row in range(len(self))], dtype=bool)
+        self.ids = [x for x, k in zip(self.ids, keep) if k]
+        self.documents = [x for x, k in zip(self.documents, keep) if k]
+        self.metadatas = [x for x, k in zip(self.metadatas, keep) if k]
+        self._vectors = self._vectors[keep]
+        self._sq_norms = self._sq_norms[keep]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._metadata_index = None
+        self._on_rows_deleted(keep)
+
+    def clear(self) -> None:
+        """Remove everything from the index"""
+        self.__init__()
+
+    def _append(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """The array stored in attribute `name` with rows appended (amortized O(rows))"""
+        array, self._buffers[name] = _append_rows(getattr(self, name), self._buffers.get(name), rows)
+        return array
+
+    @staticmethod
+    def _row_norms(vectors: np.ndarray) -> np.ndarray:
+        """Squared length of each row (used to expand ||v - q||^2)"""
+        return np.einsum("ij,ij->i", vectors, vectors)
+
+    def search_memory_bytes(self) -> int:
+        """Bytes every query scans (what has to stay in memory for fast search)"""
+        return self._vectors.nbytes + self._sq_norms.nbytes
+
+    # Hooks for subclasses that keep per-row state
+    def _on_rows_added(self, start: int) -> None:
+        pass
+
+    def _on_rows_deleted(self, keep: np.ndarray) -> None:
+        pass
+
+    # ------------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------------
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to compare against the query (None = all rows)"""
+        return None
+
+    def filter_rows(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """Rows whose metadata matches the filters (None = no filters, all rows)"""
+        if not normalize_filters(filters):
+            return None  # No filters, or only empty ones (e.g. blank UI fields)
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex(self.metadatas)
+        return self._metadata_index.rows(filters)
+
+    @property
+    def titles(self) -> List[str]:
+        """Sorted distinct titles in the index"""
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex(self.metadatas)
+        return self._metadata_index.titles
+
+    def search(self, query_embedding: Sequence[float], k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Find the k nearest chunks to a query embedding
+
+        Args:
+            query_embedding: Embedding of the query
+            k: Number of results to return
+            filters: Optional metadata filters (see metadata_filters.py);
+                     only matching rows are compared with the query
+
+        Returns:
+            List of {'id', 'text', 'metadata', 'distance'} dicts, closest first
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # Filtered searches are exact over the matching rows
+        rows = self.filter_rows(filters)
+        if rows is None:
+            rows = self._candidate_rows(query)
+        if rows is not None and len(rows) == 0:
+            return []
+
+        if rows is None:
+            vectors, sq_norms = self._vectors, self._sq_norms
+        else:
+            vectors, sq_norms = self._vectors[rows], self._sq_norms[rows]
+
+        # ||v - q||^2 = ||v||^2 - 2 v.q + ||q||^2
+        distances = sq_norms - 2.0 * (vectors @ query) + float(query @ query)
+        np.maximum(distances, 0.0, out=distances)
+
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+
+        results = []
+        for position in top:
+            row = int(position if rows is None else rows[position])
+            results.append({
+                'id': self.ids[row],
+                'text': self.documents[row],
+                'metadata': self.metadatas[row],
+                'distance': float(distances[position])  # Lower = more similar
+            })
+        return results
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], k: int = 5,
+                     block_size: int = 256, filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Search for many queries at once
+
+        Exact search turns into one matrix-matrix product per block of
+        queries, which is much faster than one search() call per query.
+
+        Args:
+            query_embeddings: One embedding per query
+            k: Number of results per query
+            block_size: Queries per matrix product (bounds memory use)
+            filters: Optional metadata filters, applied to every query
+
+        Returns:
+            One result list per query, in the same order
+        """
+        rows = self.filter_rows(filters)
+        if len(self) == 0 or k <= 0 or (rows is not None and len(rows) == 0):
+            return [[] for _ in query_embeddings]
+
+        if rows is None:
+            vectors, sq_norms = self._vectors, self._sq_norms
+        else:
+            vectors, sq_norms = self._vectors[rows], self._sq_norms[rows]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        k = min(k, len(vectors))
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            distances = (sq_norms[None, :] - 2.0 * (block @ vectors.T)
+                         + np.einsum("ij,ij->i", block, block)[:, None])
+            np.maximum(distances, 0.0, out=distances)
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            for row_distances, row_top in zip(distances, top):
+                row_top = row_top[np.argsort(row_distances[row_top], kind="stable")]
+                results.append([{
+                    'id': self.ids[row if rows is None else int(rows[row])],
+                    'text': self.documents[row if rows is None else int(rows[row])],
+                    'metadata': self.metadatas[row if rows is None else int(rows[row])],
+                    'distance': float(row_distances[row])
+                } for row in row_top])
+        return results
+
+    # ------------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """
+        Save the index to a directory
+
+        Layout:
+            vectors.npy   - float32 matrix, one row per chunk
+            records.json  - index kind, ids, documents and metadata
+
+        Every file is replaced atomically, and records.json is written last:
+        if saving stops halfway, load() sees the vectors don't match the
+        records and load_or_create_index() starts again from an empty index.
+        """
+        os.makedirs(path, exist_ok=True)
+        _save_array(os.path.join(path, "vectors.npy"), self._vectors)
+        self._save_extra(path)
+        records = json.dumps({
+            "kind": self.kind,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "params": self._params(),
+        })
+        _write_file(os.path.join(path, "records.json"), lambda f: f.write(records.encode("utf-8")))
+
+    @classmethod
+    def load(cls, path: str) -> "FlatIndex":
+        """Load an index previously written by save()"""
+        with open(os.path.join(path, "records.json"), encoding="utf-8") as f:
+            records = json.load(f)
+
+        index = cls(**records.get("params", {}))
+        index.ids = records["ids"]
+        index.documents = records["documents"]
+        index.metadatas = records["metadatas"]
+        index._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=cls.mmap_mode)
+        if len(index._vectors) != len(index.ids):
+            raise ValueError(f"Index at {path} is incomplete: {len(index._vectors)} vectors "
+                             f"for {len(index.ids)} records")
+        index._sq_norms = index._row_norms(index._vectors)
+        index._rows = {chunk_id: row for row, chunk_id in enumerate(index.ids)}
+        index._load_extra(path)
+        return index
+
+    def _params(self) -> Dict:
+        return {}
+
+    def _save_extra(self, path: str) -> None:
+        pass
+
+    def _load_extra(self, path: str) -> None:
+        pass
+
+
+# ============================================================================
+# IVF INDEX (APPROXIMATE SEARCH)
+# ============================================================================
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted file index: approximate search over k-means clusters.
+
+    Each vector is assigned to its nearest centroid. A query is compared
+    with the centroids first, then only with vectors in the `nprobe`
+    closest clusters. Small collections (fewer than `min_train_size`
+    vectors) are searched exactly until there is enough data to train.
+
+    Training happens when vectors are added (first at `min_train_size`,
+    again each time the data has grown 4x) or loaded, never during a
+    search, and the clusters are swapped under a lock, so searches from
+    several threads always see a consistent set of clusters.
+
+    Args:
+        nlist: Number of clusters (0 = choose ~sqrt(n) automatically)
+        nprobe: Number of clusters to search per query
+        min_train_size: Vectors needed before clustering kicks in
+    """
+
+    kind = "ivf"
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, min_train_size: int = 1000):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+        self._lists: Optional[tuple] = None  # (row order, offsets), rebuilt lazily
+        self._lock = threading.RLock()  # Guards the clusters and inverted lists
+
+    def clear(self) -> None:
+        self.__init__(self.nlist, self.nprobe, self.min_train_size)
+
+    def train(self, n_iter: int = 10, sample_size: int = 64, seed: int = 0) -> None:
+        """
+        Cluster the stored vectors with k-means (Lloyd's algorithm)
+
+        Args:
+            n_iter: k-means iterations
+            sample_size: Training points per cluster (caps training cost)
+            seed: Random seed, so rebuilding gives the same clusters
+        """
+        with self._lock:
+            self._train(n_iter, sample_size, seed)
+
+    def _train(self, n_iter: int, sample_size: int, seed: int) -> None:
+        n = len(self)
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+
+        sample = self._vectors
+        if n > nlist * sample_size:
+            sample = sample[rng.choice(n, nlist * sample_size, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = self._nearest_centroid(sample, centroids)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+                else:
+                    # Re-seed empty clusters with a random point
+                    centroids[c] = sample[rng.integers(len(sample))]
+
+        self._centroids = centroids
+        self._assignments = self._nearest_centroid(self._vectors, centroids)
+        self._trained_size = n
+        self._lists = None
+
+    @staticmethod
+    def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        c_norms = np.einsum("ij,ij->i", centroids, centroids)
+        # argmin ||v - c||^2 == argmin ||c||^2 - 2 v.c
+        return np.argmin(c_norms - 2.0 * (vectors @ centroids.T), axis=1).astype(np.int32)
+
+    def _needs_training(self) -> bool:
+        """True when first large enough, or when the data has grown 4x since training"""
+        n = len(self)
+        return n >= self.min_train_size and (self._centroids is None or n > 4 * self._trained_size)
+
+    def _on_rows_added(self, start: int) -> None:
+        with self._lock:
+            if self._needs_training():
+                self._train(n_iter=10, sample_size=64, seed=0)
+                return
+            if self._centroids is not None:
+                new = self._nearest_centroid(self._vectors[start:], self._centroids)
+                self._assignments = self._append("_assignments", new)
+            self._lists = None
+
+    def _on_rows_deleted(self, keep: np.ndarray) -> None:
+        with self._lock:
+            if self._centroids is not None:
+                self._assignments = self._assignments[keep]
+            self._lists = None
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if len(self) < self.min_train_size:
+            return None
+        lists = self.inverted_lists()
+        if lists is None:
+            return None
+        centroids, order, offsets = lists
+
+        nprobe = min(self.nprobe, len(centroids))
+        c_dist = np.einsum("ij,ij->i", centroids, centroids) - 2.0 * (centroids @ query)
+        probes = np.argpartition(c_dist, nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes])
+
+    def inverted_lists(self) -> Optional[tuple]:
+        """
+        The clusters, or None before training
+
+        Returns:
+            (centroids, row order, offsets): rows of cluster c are
+            order[offsets[c]:offsets[c + 1]]
+        """
+        with self._lock:
+            if self._centroids is None:
+                return None
+            if self._lists is None:
+                order = np.argsort(self._assignments, kind="stable")
+                offsets = np.searchsorted(self._assignments[order],
+                                          np.arange(len(self._centroids) + 1))
+                self._lists = (order, offsets)
+            return (self._centroids,) + self._lists
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], k: int = 5,
+                     block_size: int = 256, filters: Optional[Dict] = None) -> List[List[Dict]]:
+        # Each query probes different clusters, so search them one at a time
+        # (filtered searches are exact over the matching rows, like FlatIndex)
+        if len(self) < self.min_train_size or normalize_filters(filters):
+            return super().search_batch(query_embeddings, k, block_size, filters)
+        return [self.search(query, k) for query in query_embeddings]
+
+    def _params(self) -> Dict:
+        return {"nlist": self.nlist, "nprobe": self.nprobe, "min_train_size": self.min_train_size}
+
+    def _save_extra(self, path: str) -> None:
+        ivf_path = os.path.join(path, "ivf.npz")
+        if self._centroids is not None:
+            _write_file(ivf_path, lambda f: np.savez(
+                f, centroids=self._centroids, assignments=self._assignments,
+                trained_size=self._trained_size))
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+
+    def _load_extra(self, path: str) -> None:
+        ivf_path = os.path.join(path, "ivf.npz")
+        data = np.load(ivf_path) if os.path.exists(ivf_path) else None
+        if data is not None and len(data["assignments"]) == len(self):
+            self._centroids = data["centroids"]
+            self._assignments = data["assignments"]
+            self._trained_size = int(data["trained_size"])
+        elif self._needs_training():
+            self.train()  # Saved before it was trained, or the clusters don't match
+
+
+# ============================================================================
+# QUANTIZED INDEXES (COMPACT CODES + FULL-PRECISION RESCORING)
+# ============================================================================
+
+# Number of 1 bits in every byte value, for Hamming distances
+# (NumPy 2 has a vectorised np.bitwise_count, which is ~5x faster)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_popcount = getattr(np, "bitwise_count", _POPCOUNT_TABLE.__getitem__)
+
+
+class QuantizedIndex(FlatIndex):
+    """
+    Search compact codes, then re-score a shortlist at full precision.
+
+    Every query scans all the codes, so they are what has to fit in memory:
+    int8 codes are 4x smaller than float32 vectors, binary codes 32x. Only
+    the best `rescore` x k candidates are then compared using their float32
+    vectors. A saved index memory-maps both files: the vectors stay on disk
+    (only shortlisted rows are read) and processes that load the same index
+    share the code pages. Adding or deleting chunks loads the vectors into
+    memory again until the next save/load.
+
+    The quantizer is fitted on the vectors present when the index is first
+    filled, and refitted when the data has grown 4x (like IVF training).
+
+    Args:
+        rescore: Shortlist size as a multiple of k (higher = better recall, slower)
+    """
+
+    mmap_mode = "r"
+
+    # Upper bound on queries x rows of approximate distances held at once
+    max_distance_cells = 1 << 24
+
+    def __init__(self, rescore: int = 4):
+        super().__init__()
+        self.rescore = rescore
+        self._codes: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+    def clear(self) -> None:
+        self.__init__(self.rescore)
+
+    # Implemented by each quantizer
+    def _fit(self, vectors: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _approximate_distances(self, queries: np.ndarray,
+                               rows: Optional[np.ndarray]) -> np.ndarray:
+        """(queries x rows) distances, only good enough for ranking"""
+        raise NotImplementedError
+
+    def _quantizer_state(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _set_quantizer_state(self, state: Dict[str, np.ndarray]) -> None:
+        raise NotImplementedError
+
+    def _on_codes_changed(self) -> None:
+        pass
+
+    @staticmethod
+    def _row_norms(vectors: np.ndarray) -> np.ndarray:
+        # Not needed: rescoring computes exact distances for the shortlist only
+        return np.zeros(len(vectors), dtype=np.float32)
+
+    def search_memory_bytes(self) -> int:
+        return 0 if self._codes is None else self._codes.nbytes
+
+    def _on_rows_added(self, start: int) -> None:
+        n = len(self)
+        if self._codes is None or n > 4 * self._trained_size:
+            self._fit(np.asarray(self._vectors))
+            self._trained_size = n
+            self._codes = self._encode(self._vectors)
+        else:
+            self._codes = self._append("_codes", self._encode(self._vectors[start:]))
+        self._on_codes_changed()
+
+    def _on_rows_deleted(self, keep: np.ndarray) -> None:
+        if self._codes is not None:
+            self._codes = self._codes[keep]
+            self._on_codes_changed()
+
+    def search(self, query_embedding: Sequence[float], k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        return self.search_batch([query_embedding], k, filters=filters)[0]
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], k: int = 5,
+                     block_size: int = 256, filters: Optional[Dict] = None) -> List[List[Dict]]:
+        rows = self.filter_rows(filters)
+        if len(self) == 0 or k <= 0 or (rows is not None and len(rows) == 0):
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        n_rows = len(self) if rows is None else len(rows)
+        block_size = max(1, min(block_size, self.max_distance_cells // n_rows))
+        shortlist_size = min(n_rows, k * self.rescore)
+
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            # 1. Approximate distances on the codes -> shortlist per query
+            approximate = self._approximate_distances(block, rows)
+            shortlists = np.argpartition(approximate, shortlist_size - 1, axis=1)[:, :shortlist_size]
+            for query, shortlist in zip(block, shortlists):
+                if rows is not None:
+                    shortlist = rows[shortlist]
+                results.append(self._rescore(query, np.sort(shortlist), k))
+        return results
+
+    def _rescore(self, query: np.ndarray, shortlist: np.ndarray, k: int) -> List[Dict]:
+        """2. Exact distances for the shortlist only (sorted rows = file order reads)"""
+        diff = self._vectors[shortlist] - query
+        distances = np.einsum("ij,ij->i", diff, diff)
+        k = min(k, len(shortlist))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [{
+            'id': self.ids[int(shortlist[i])],
+            'text': self.documents[int(shortlist[i])],
+            'metadata': self.metadatas[int(shortlist[i])],
+            'distance': float(distances[i])
+        } for i in top]
+
+    def _params(self) -> Dict:
+        return {"rescore": self.rescore}
+
+    def _save_extra(self, path: str) -> None:
+        if self._codes is None:
+            return
+        _save_array(os.path.join(path, "codes.npy"), self._codes)
+        _write_file(os.path.join(path, "quantizer.npz"), lambda f: np.savez(
+            f, trained_size=self._trained_size, **self._quantizer_state()))
+
+    def _load_extra(self, path: str) -> None:
+        codes_path = os.path.join(path, "codes.npy")
+        codes = np.load(codes_path, mmap_mode="r") if len(self) and os.path.exists(codes_path) else None
+        if codes is not None and len(codes) == len(self):
+            self._codes = codes
+            state = dict(np.load(os.path.join(path, "quantizer.npz")))
+            self._trained_size = int(state.pop("trained_size"))
+            self._set_quantizer_state(state)
+            self._on_codes_changed()
+        elif len(self):
+            self._on_rows_added(0)
+
+
+class Int8Index(QuantizedIndex):
+    """
+    Scalar quantization: each dimension is mapped to 256 levels between
+    its minimum and maximum value (1 byte per dimension instead of 4).
+    """
+
+    kind = "int8"
+
+    # Codes are converted to float32 a block of rows at a time, into a
+    # reused buffer small enough to stay in CPU cache
+    block_rows = 1024
+
+    def _fit(self, vectors: np.ndarray) -> None:
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self._offset = low.astype(np.float32)
+        self._step = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self._offset) / self._step) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def _on_codes_changed(self) -> None:
+        self._code_norms = None  # Recomputed on the next search
+
+    def _approximate_distances(self, queries: np.ndarray,
+                               rows: Optional[np.ndarray]) -> np.ndarray:
+        # With weights w = step^2 and the queries in code units q:
+        #   sum_d w_d (c_d - q_d)^2 = sum_d w_d c_d^2 - 2 c.(w q) + const
+        # The constant doesn't change the ranking, so it is left out.
+        weights = self._step ** 2
+        if self._code_norms is None:
+            self._code_norms = self._scan(self._codes, None, weights)
+        weighted_queries = ((queries - self._offset) / self._step - 128) * weights
+
+        codes = self._codes if rows is None else self._codes[rows]
+        norms = self._code_norms if rows is None else self._code_norms[rows]
+        return norms[None, :] - 2.0 * self._scan(codes, weighted_queries, weights)
+
+    def _scan(self, codes: np.ndarray, weighted_queries: Optional[np.ndarray],
+              weights: np.ndarray) -> np.ndarray:
+        """codes @ weighted_queries.T (or weighted squared norms of codes), block by block"""
+        width = 1 if weighted_queries is None else len(weighted_queries)
+        out = np.empty((len(codes), width), dtype=np.float32)
+        buffer = np.empty((min(self.block_rows, len(codes)), codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), self.block_rows):
+            block = codes[start:start + self.block_rows]
+            floats = buffer[:len(block)]
+            np.copyto(floats, block, casting="unsafe")
+            if weighted_queries is None:
+                out[start:start + len(block), 0] = (floats * floats) @ weights
+            else:
+                out[start:start + len(block)] = floats @ weighted_queries.T
+        return out[:, 0] if weighted_queries is None else out.T
+
+    def _quantizer_state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self._offset, "step": self._step}
+
+    def _set_quantizer_state(self, state: Dict[str, np.ndarray]) -> None:
+        self._offset = state["offset"]
+        self._step = state["step"]
+
+
+class BinaryIndex(QuantizedIndex):
+    """
+    Binary quantization: 1 bit per dimension (above or below that
+    dimension's mean), compared by Hamming distance. 32x smaller than
+    float32 but coarse, so it re-scores a longer shortlist by default.
+    """
+
+    kind = "binary"
+
+    def __init__(self, rescore: int = 16):
+        super().__init__(rescore)
+
+    def _fit(self, vectors: np.ndarray) -> None:
+        self._center = vectors.mean(axis=0).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(np.asarray(vectors) > self._center, axis=1)
+
+    def _approximate_distances(self, queries: np.ndarray,
+                               rows: Optional[np.ndarray]) -> np.ndarray:
+        codes = self._codes if rows is None else self._codes[rows]
+        query_bits = np.packbits(queries > self._center, axis=1)
+        return np.stack([_popcount(np.bitwise_xor(codes, bits)).sum(axis=1, dtype=np.int32)
+                         for bits in query_bits])
+
+    def _quantizer_state(self) -> Dict[str, np.ndarray]:
+        return {"center": self._center}
+
+    def _set_quantizer_state(self, state: Dict[str, np.ndarray]) -> None:
+        self._center = state["center"]
+
+
+# ============================================================================
+# FACTORY HELPERS
+# ============================================================================
+
+INDEX_TYPES = {
+    FlatIndex.kind: FlatIndex,
+    IVFIndex.kind: IVFIndex,
+    Int8Index.kind: Int8Index,
+    BinaryIndex.kind: BinaryIndex,
+}
+
+
+def load_or_create_index(kind: str, path: str) -> FlatIndex:
+    """
+    Load the index saved at `path`, or create an empty one
+
+    Args:
+        kind: Index type ("flat", "ivf", "int8" or "binary")
+        path: Directory the index is persisted in
+
+    Returns:
+        Index instance (empty if nothing was saved, or if the saved
+        index is a different kind or incomplete)
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}'. Choose from: {', '.join(INDEX_TYPES)}")
+
+    index_cls = INDEX_TYPES[kind]
+    records_path = os.path.join(path, "records.json")
+    if os.path.exists(records_path):
+        with open(records_path, encoding="utf-8") as f:
+            saved_kind = json.load(f).get("kind")
+        if saved_kind == kind:
+            try:
+                return index_cls.load(path)
+            except (ValueError, OSError, KeyError) as e:
+                print(f"⚠️  Ignoring saved index: {e}")
+    return index_cls()
+
+
+def index_from_collection(collection, kind: str) -> FlatIndex:
+    """
+    Build a local index from everything stored in a ChromaDB collection
+
+    Used when switching an existing collection to a local backend.
+    """
+    index = INDEX_TYPES[kind]()
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    if data["ids"]:
+        index.add(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+    return index
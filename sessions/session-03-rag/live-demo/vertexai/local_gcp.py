@@ -0,0 +1,244 @@
+"""
+WCC AI Learning Series - Session 3: Local GCP Stand-ins
+Run vertex_ai_rag_managed.py without a GCP project
+
+In-memory versions of the parts of Cloud Storage and Vertex AI RAG Engine
+the demo uses, with realistic waits, so uploads and imports can be tested
+and timed offline:
+
+- LocalStorageClient: buckets and blobs in memory. Each upload takes a
+  fixed latency plus size / bandwidth.
+- LocalRagEngine: create_corpus, import_files, list_files, retrieval_query
+  and delete_corpus. Imports take a fixed time plus a time per file (like
+  the real long-running operation) and split files into chunks. Retrieval
+  ranks chunks by word overlap with the question.
+- LocalGenAIClient: generate_content with a RAG retrieval tool. It
+  retrieves from a LocalRagEngine and answers with the best chunk,
+  after a configurable latency.
+
+Usage:
+    python vertex_ai_rag_managed.py --all --local
+
+    local_storage = LocalStorageClient(upload_latency_ms=50)
+    local_rag = LocalRagEngine(local_storage, import_seconds=2)
+    set_clients(local_storage, local_rag, LocalGenAIClient(local_rag))
+"""
+
+import re
+import time
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from concurrent.futures import TimeoutError as OperationTimeout
+
+from google.api_core.exceptions import NotFound
+
+
+# ============================================================================
+# CLOUD STORAGE
+# ============================================================================
+
+class _LocalBlob:
+    def __init__(self, client: "LocalStorageClient", bucket_name: str, name: str):
+        self._client = client
+        self._bucket_name = bucket_name
+        self.name = name
+
+    def upload_from_string(self, data, content_type: str = "text/plain") -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        client = self._client
+        time.sleep(client.upload_latency_ms / 1000 + len(data) / (client.bandwidth_mbps * 125_000))
+        with client._lock:
+            client._buckets[self._bucket_name][self.name] = data
+            client.uploads += 1
+
+    def download_as_text(self) -> str:
+        return self._client._buckets[self._bucket_name][self.name].decode("utf-8")
+
+
+class _LocalBucket:
+    def __init__(self, client: "LocalStorageClient", name: str):
+        self._client = client
+        self.name = name
+
+    def blob(self, name: str) -> _LocalBlob:
+        return _LocalBlob(self._client, self.name, name)
+
+    def list_blobs(self, prefix: str = "") -> List[_LocalBlob]:
+        with self._client._lock:
+            names = sorted(self._client._buckets[self.name])
+        return [self.blob(name) for name in names if name.startswith(prefix)]
+
+
+class LocalStorageClient:
+    """
+    In-memory stand-in for google.cloud.storage.Client
+
+    Args:
+        upload_latency_ms: Fixed time per upload (request round trip)
+        bandwidth_mbps: Upload speed, in megabits per second
+    """
+
+    def __init__(self, upload_latency_ms: float = 80.0, bandwidth_mbps: float = 50.0):
+        self.upload_latency_ms = upload_latency_ms
+        self.bandwidth_mbps = bandwidth_mbps
+        self.uploads = 0
+        self._buckets: Dict[str, Dict[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, name: str) -> _LocalBucket:
+        if name not in self._buckets:
+            raise NotFound(f"Bucket {name} not found")
+        return _LocalBucket(self, name)
+
+    def create_bucket(self, name: str, location: Optional[str] = None) -> _LocalBucket:
+        with self._lock:
+            self._buckets.setdefault(name, {})
+        return _LocalBucket(self, name)
+
+    def resolve(self, path: str) -> Dict[str, str]:
+        """Files matching gs://bucket/prefix or gs://bucket/prefix* -> {uri: text}"""
+        match = re.match(r"gs://([^/]+)/(.*)", path)
+        if not match or match.group(1) not in self._buckets:
+            return {}
+        bucket_name, prefix = match.group(1), match.group(2).rstrip("*")
+        bucket = self.get_bucket(bucket_name)
+        return {f"gs://{bucket_name}/{blob.name}": blob.download_as_text()
+                for blob in bucket.list_blobs(prefix)}
+
+
+# ============================================================================
+# RAG ENGINE
+# ============================================================================
+
+class LocalRagEngine:
+    """
+    In-memory stand-in for vertexai.preview.rag
+
+    Args:
+        storage_client: Where import_files reads gs:// paths from
+        import_seconds: Fixed time per import operation
+        import_seconds_per_file: Extra time per imported file
+    """
+
+    RagResource = SimpleNamespace  # rag.RagResource(rag_corpus=...)
+    RagCorpus = SimpleNamespace    # rag.RagCorpus(name=...)
+
+    def __init__(self, storage_client: LocalStorageClient,
+                 import_seconds: float = 2.0, import_seconds_per_file: float = 0.2):
+        self.storage_client = storage_client
+        self.import_seconds = import_seconds
+        self.import_seconds_per_file = import_seconds_per_file
+        self._corpora: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create_corpus(self, display_name: str, description: str = "") -> SimpleNamespace:
+        with self._lock:
+            name = f"projects/local/locations/local/ragCorpora/{len(self._corpora) + 1}"
+            self._corpora[name] = {"files": {}, "chunks": []}
+        return SimpleNamespace(name=name, display_name=display_name, description=description)
+
+    def delete_corpus(self, name: str) -> None:
+        with self._lock:
+            if name not in self._corpora:
+                raise NotFound(f"Corpus {name} not found")
+            del self._corpora[name]
+
+    def import_files(self, corpus_name: str, paths: List[str], chunk_size: int = 1024,
+                     chunk_overlap: int = 200, timeout: int = 600, **kwargs) -> SimpleNamespace:
+        """Chunk and index files; returns when done, like the real import_files"""
+        corpus = self._get_corpus(corpus_name)
+        files = {}
+        for path in paths:
+            files.update(self.storage_client.resolve(path))
+        new_files = {uri: text for uri, text in files.items() if corpus["files"].get(uri) != text}
+
+        duration = self.import_seconds + self.import_seconds_per_file * len(new_files)
+        if duration > timeout:
+            time.sleep(timeout)
+            raise OperationTimeout(f"Import did not finish within {timeout}s")
+        time.sleep(duration)
+
+        step = max(1, chunk_size - chunk_overlap)
+        with self._lock:
+            for uri, text in new_files.items():
+                corpus["chunks"] = [c for c in corpus["chunks"] if c["source_uri"] != uri]
+                corpus["chunks"].extend({"source_uri": uri, "text": text[i:i + chunk_size]}
+                                        for i in range(0, max(1, len(text) - chunk_overlap), step))
+                corpus["files"][uri] = text
+        return SimpleNamespace(imported_rag_files_count=len(new_files),
+                               skipped_rag_files_count=len(files) - len(new_files),
+                               failed_rag_files_count=0)
+
+    def list_files(self, corpus_name: str) -> List[SimpleNamespace]:
+        corpus = self._get_corpus(corpus_name)
+        with self._lock:
+            return [SimpleNamespace(name=f"{corpus_name}/ragFiles/{i}", display_name=uri.rsplit("/", 1)[-1])
+                    for i, uri in enumerate(corpus["files"], 1)]
+
+    def retrieval_query(self, text: str, rag_resources: Optional[List] = None,
+                        similarity_top_k: Optional[int] = None, **kwargs) -> SimpleNamespace:
+        """Chunks ranked by word overlap with the question (distance = 1 - overlap)"""
+        query_words = set(re.findall(r"\w+", text.lower()))
+        scored = []
+        for resource in rag_resources or []:
+            for chunk in self._get_corpus(resource.rag_corpus)["chunks"]:
+                chunk_words = set(re.findall(r"\w+", chunk["text"].lower()))
+                overlap = len(query_words & chunk_words) / max(1, len(query_words))
+                scored.append(SimpleNamespace(source_uri=chunk["source_uri"], text=chunk["text"],
+                                              distance=1.0 - overlap))
+        scored.sort(key=lambda context: context.distance)
+        return SimpleNamespace(contexts=SimpleNamespace(contexts=scored[:similarity_top_k or 10]))
+
+    def _get_corpus(self, name: str) -> Dict:
+        if name not in self._corpora:
+            raise NotFound(f"Corpus {name} not found")
+        return self._corpora[name]
+
+
+# ============================================================================
+# GEMINI WITH RAG RETRIEVAL
+# ============================================================================
+
+class _LocalModels:
+    def __init__(self, rag_engine: LocalRagEngine, generate_latency_ms: float):
+        self.rag_engine = rag_engine
+        self.generate_latency_ms = generate_latency_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model: str, contents: str, config=None) -> SimpleNamespace:
+        with self._lock:
+            self.calls += 1
+        store = config.tools[0].retrieval.vertex_rag_store
+        response = self.rag_engine.retrieval_query(
+            text=contents,
+            rag_resources=[SimpleNamespace(rag_corpus=resource.rag_corpus)
+                           for resource in store.rag_resources],
+            similarity_top_k=store.rag_retrieval_config.top_k,
+        )
+        contexts = response.contexts.contexts
+        time.sleep(self.generate_latency_ms / 1000)
+
+        if contexts:
+            text = f"(Local answer) {' '.join(contexts[0].text.split())[:200]} [Source 1]"
+        else:
+            text = "(Local answer) I couldn't find anything about that."
+        chunks = [SimpleNamespace(retrieved_context=SimpleNamespace(uri=c.source_uri, text=c.text))
+                  for c in contexts]
+        return SimpleNamespace(text=text, candidates=[
+            SimpleNamespace(grounding_metadata=SimpleNamespace(grounding_chunks=chunks))])
+
+
+class LocalGenAIClient:
+    """
+    Stand-in for genai.Client that answers RAG-grounded questions locally
+
+    Args:
+        rag_engine: Where the retrieval tool's corpus lives
+        generate_latency_ms: Time per generate_content call
+    """
+
+    def __init__(self, rag_engine: LocalRagEngine, generate_latency_ms: float = 500.0):
+        self.models = _LocalModels(rag_engine, generate_latency_ms)
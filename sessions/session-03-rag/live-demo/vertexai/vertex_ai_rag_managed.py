@@ -18,11 +18,16 @@ Prerequisites:
 """
 
 import os
+import time
+import threading
 import vertexai
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
 from vertexai.preview import rag
 from google.cloud import storage
+from google.genai import types
 from dotenv import load_dotenv
-from google import genai
 
 # ============================================================================
 # CONFIGURATION
@@ -35,23 +40,104 @@ LOCATION = os.getenv("LOCATION", "us-central1")
 GENERATION_MODEL_NAME = os.getenv("GENERATION_MODEL_NAME", "gemini-2.5-flash-lite")
 BUCKET_NAME = f"{PROJECT_ID}-rag-demo"  # Will be created if doesn't exist
 
-# Initialize Vertex AI and Generative AI client
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-genai.configure_vertex(project=PROJECT_ID, location=LOCATION)
+# Files uploaded to Cloud Storage at once
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
+
+# Seconds to wait for an import to finish before giving up
+IMPORT_TIMEOUT = int(os.getenv("IMPORT_TIMEOUT", "600"))
+
+# Answers to repeated questions are reused for this many seconds, and
+# forgotten as soon as new documents are imported
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+
+# Questions answered at once by query_with_rag_batch
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+
+# ============================================================================
+# CLIENTS (created on first use)
+# ============================================================================
+# Nothing connects to GCP at import. set_clients() swaps in other clients,
+# e.g. the local stand-ins in local_gcp.py (no GCP project needed).
+
+_storage_client = None
+_rag_api = None
+_genai_client = None
+
+def get_storage_client():
+    """Cloud Storage client, shared by every upload"""
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client(project=PROJECT_ID)
+    return _storage_client
+
+def get_rag():
+    """The RAG Engine API (vertexai.preview.rag, initialized on first use)"""
+    global _rag_api
+    if _rag_api is None:
+        vertexai.init(project=PROJECT_ID, location=LOCATION)
+        _rag_api = rag
+    return _rag_api
+
+def get_genai_client():
+    """Gemini client for queries, reused so every question shares its connections"""
+    global _genai_client
+    if _genai_client is None:
+        from google import genai
+        _genai_client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
+    return _genai_client
+
+def set_clients(storage_client=None, rag_api=None, genai_client=None) -> None:
+    """Use different clients (e.g. the stand-ins in local_gcp.py in tests)"""
+    global _storage_client, _rag_api, _genai_client
+    if storage_client is not None:
+        _storage_client = storage_client
+    if rag_api is not None:
+        _rag_api = rag_api
+    if genai_client is not None:
+        _genai_client = genai_client
+
+def wait_for(check: Callable[[], bool], timeout: float,
+             initial_interval: float = 0.5, max_interval: float = 10.0) -> bool:
+    """
+    Poll until check() returns True, backing off between checks
+    
+    The first checks are quick (so fast operations return quickly) and the
+    wait doubles after each one, up to max_interval (so slow ones don't
+    send a request every half second).
+    
+    Returns:
+        True if check() succeeded, False if the timeout ran out first
+    """
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    while not check():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+    return True
 
 # ============================================================================
 # STEP 1: PREPARE DOCUMENTS IN CLOUD STORAGE
 # ============================================================================
 
-def setup_cloud_storage():
+def setup_cloud_storage(max_workers: int = UPLOAD_WORKERS):
     """
     Create Cloud Storage bucket and upload sample documents
+    
+    Args:
+        max_workers: Files uploaded at once
+    
+    Returns:
+        (gs:// path of the uploaded folder, number of files uploaded)
     """
     print("\n" + "="*70)
     print("STEP 1: Setting up Cloud Storage")
     print("="*70)
     
-    storage_client = storage.Client(project=PROJECT_ID)
+    storage_client = get_storage_client()
     
     # Create bucket if it doesn't exist
     try:
@@ -221,13 +307,66 @@ Next WCC Talk: "Kubernetes for Beginners" (August 2024)
     
     # Upload documents to Cloud Storage
     print("\nUploading documents to Cloud Storage...")
-    for filename, content in sample_docs.items():
-        blob = bucket.blob(f"blogs/{filename}")
-        blob.upload_from_string(content)
-        print(f"  ✓ Uploaded: {filename}")
+    upload_documents(bucket, sample_docs, prefix="blogs/", max_workers=max_workers)
     
     print(f"\n✓ All documents uploaded to gs://{BUCKET_NAME}/blogs/")
-    return f"gs://{BUCKET_NAME}/blogs/"
+    return f"gs://{BUCKET_NAME}/blogs/", len(sample_docs)
+
+def upload_documents(bucket, documents: Dict[str, str], prefix: str = "blogs/",
+                     max_workers: int = UPLOAD_WORKERS) -> List[Dict]:
+    """
+    Upload documents to a bucket, several at a time
+    
+    Each upload mostly waits on the network, so running them on a small
+    thread pool takes about as long as the slowest file instead of the sum
+    of all of them.
+    
+    Args:
+        bucket: Cloud Storage bucket
+        documents: Dict of filename -> text
+        prefix: Folder in the bucket
+        max_workers: Files uploaded at once
+    
+    Returns:
+        One {'file', 'bytes', 'seconds'} dict per file, in the order they finished
+    
+    Raises:
+        RuntimeError: If any upload failed (after the others have finished)
+    """
+    def upload(filename: str, content: str) -> Dict:
+        start = time.perf_counter()
+        bucket.blob(f"{prefix}{filename}").upload_from_string(content)
+        return {"file": filename, "bytes": len(content.encode("utf-8")),
+                "seconds": time.perf_counter() - start}
+    
+    workers = max(1, min(max_workers, len(documents)))
+    stats = []
+    failed = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(upload, filename, content): filename
+                   for filename, content in documents.items()}
+        for future in as_completed(futures):
+            try:
+                file_stats = future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"  ✗ Failed: {futures[future]} ({e})")
+                continue
+            stats.append(file_stats)
+            print(f"  ✓ Uploaded: {file_stats['file']} ({file_stats['bytes'] / 1024:.1f} KB in "
+                  f"{file_stats['seconds']:.2f}s, "
+                  f"{file_stats['bytes'] / 1024 / max(file_stats['seconds'], 1e-6):.1f} KB/s)")
+    elapsed = time.perf_counter() - start
+    
+    total_kb = sum(file_stats["bytes"] for file_stats in stats) / 1024
+    print(f"  {len(stats)} files, {total_kb:.1f} KB in {elapsed:.2f}s "
+          f"({len(stats) / elapsed:.1f} files/sec, {total_kb / elapsed:.1f} KB/s, "
+          f"{workers} at a time)")
+    
+    if failed:
+        raise RuntimeError(f"{len(failed)} upload(s) failed: {', '.join(failed)}")
+    return stats
 
 # ============================================================================
 # STEP 2: CREATE RAG CORPUS
@@ -242,7 +381,7 @@ def create_rag_corpus():
     print("="*70)
     
     # Create corpus
-    corpus = rag.create_corpus(
+    corpus = get_rag().create_corpus(
         display_name="WCC Blogs",
         description="Women Coding Community blog posts for RAG demo"
     )
@@ -256,34 +395,57 @@ def create_rag_corpus():
 # STEP 3: IMPORT DOCUMENTS
 # ============================================================================
 
-def import_documents(corpus, gcs_path):
+def import_documents(corpus, gcs_path, expected_files: Optional[int] = None,
+                     timeout: float = IMPORT_TIMEOUT):
     """
     Import documents from Cloud Storage into RAG corpus
     This handles chunking, embedding, and indexing automatically!
+    
+    Args:
+        corpus: RAG corpus to import into
+        gcs_path: gs:// path of the files
+        expected_files: If set, also wait until the corpus lists this many files
+        timeout: Seconds to wait for the import
     """
     print("\n" + "="*70)
     print("STEP 3: Importing Documents")
     print("="*70)
     print("(Vertex AI handles chunking, embedding, and indexing...)")
+    print(f"  Source: {gcs_path}")
+    print(f"  Chunk size: 512 characters")
+    print(f"  Chunk overlap: 100 characters")
+    print("  Waiting for import to complete...", flush=True)
     
-    # Import files from GCS
-    response = rag.import_files(
+    # Import files from GCS. This starts a long-running operation and
+    # returns as soon as it finishes (small imports take a few seconds,
+    # large ones as long as they need, up to the timeout).
+    start = time.perf_counter()
+    response = get_rag().import_files(
         corpus_name=corpus.name,
         paths=[gcs_path],
         chunk_size=512,  # Similar to our 400 tokens
-        chunk_overlap=100
+        chunk_overlap=100,
+        timeout=timeout,
     )
+    elapsed = time.perf_counter() - start
     
-    print("✓ Import started (this may take a minute...)")
-    print(f"  Source: {gcs_path}")
-    print(f"  Chunk size: 512 characters")
-    print(f"  Chunk overlap: 100 characters")
+    # Cached answers may be out of date now
+    query_cache.invalidate(corpus.name)
+    
+    imported = response.imported_rag_files_count
+    print(f"✓ Import finished in {elapsed:.1f}s: {imported} files "
+          f"({imported / max(elapsed, 1e-6):.2f} files/sec)")
+    if response.skipped_rag_files_count or response.failed_rag_files_count:
+        print(f"  Skipped (unchanged): {response.skipped_rag_files_count}, "
+              f"failed: {response.failed_rag_files_count}")
     
-    # Wait for import to complete
-    print("  Waiting for import to complete...", end="", flush=True)
-    import time
-    time.sleep(30)  # Import usually takes 20-40 seconds
-    print(" Done!")
+    # The corpus should list every file straight away; check before querying
+    if expected_files:
+        rag_api = get_rag()
+        listed = wait_for(lambda: len(list(rag_api.list_files(corpus.name))) >= expected_files,
+                          timeout=max(1.0, timeout - elapsed))
+        if not listed:
+            print(f"⚠️  Fewer than {expected_files} files are listed in the corpus yet")
     
     return response
 
@@ -291,6 +453,101 @@ def import_documents(corpus, gcs_path):
 # STEP 4: QUERY WITH RAG
 # ============================================================================
 
+class QueryCache:
+    """
+    Answers by (corpus, question, top_k), each kept for `ttl` seconds
+    
+    Questions are compared ignoring case and extra spaces, so "What is
+    RAG?" and "what is  rag?" share an entry. import_documents() clears a
+    corpus's entries, since its answers may change.
+    """
+    
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(corpus_name: str, question: str, top_k: int) -> Tuple:
+        return (corpus_name, " ".join(question.lower().split()), top_k)
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]  # Expired
+            self.misses += 1
+            return None
+    
+    def put(self, key: Tuple, result: Dict) -> None:
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, corpus_name: Optional[str] = None) -> None:
+        """Forget answers for one corpus (or all)"""
+        with self._lock:
+            for key in [key for key in self._entries if corpus_name in (None, key[0])]:
+                del self._entries[key]
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries)}
+
+query_cache = QueryCache()
+
+def answer_question(corpus_name: str, question: str, num_chunks: int = 5) -> Dict:
+    """
+    Answer a question from the corpus, without printing
+    
+    Repeated questions are answered from query_cache.
+    
+    Returns:
+        Dict with 'question', 'answer', 'sources' (list of {'uri', 'text'})
+        and 'cached' (True if the answer came from the cache)
+    """
+    key = QueryCache.key(corpus_name, question, num_chunks)
+    result = query_cache.get(key)
+    if result is not None:
+        return {**result, "cached": True}
+    
+    # This one call does EVERYTHING:
+    # 1. Embeds the question
+    # 2. Searches the vector database
+    # 3. Retrieves relevant chunks
+    # 4. Generates answer with citations
+    response = get_genai_client().models.generate_content(
+        model=GENERATION_MODEL_NAME,
+        contents=question,
+        config=types.GenerateContentConfig(tools=[types.Tool(
+            retrieval=types.Retrieval(vertex_rag_store=types.VertexRagStore(
+                rag_resources=[types.VertexRagStoreRagResource(rag_corpus=corpus_name)],
+                rag_retrieval_config=types.RagRetrievalConfig(top_k=num_chunks),
+            ))
+        )]),
+    )
+    
+    sources = []
+    metadata = response.candidates[0].grounding_metadata if response.candidates else None
+    for chunk in (metadata.grounding_chunks or []) if metadata else []:
+        if chunk.retrieved_context:
+            sources.append({"uri": chunk.retrieved_context.uri, "text": chunk.retrieved_context.text or ""})
+    
+    result = {"question": question, "answer": response.text, "sources": sources}
+    query_cache.put(key, result)
+    return {**result, "cached": False}
+
 def query_with_rag(corpus, question, num_chunks=5):
     """
     Query the RAG corpus - retrieval and generation in ONE call!
@@ -301,33 +558,48 @@ def query_with_rag(corpus, question, num_chunks=5):
     print(f"\n❓ Question: {question}")
     print("-" * 70)
     
-    # This one call does EVERYTHING:
-    # 1. Embeds the question
-    # 2. Searches the vector database
-    # 3. Retrieves relevant chunks
-    # 4. Generates answer with citations
-    response = rag.retrieval_query(
-        rag_resources=[
-            rag.RagResource(
-                rag_corpus=corpus.name,
-            )
-        ],
-        text=question,
-        similarity_top_k=num_chunks,
-    )
+    result = answer_question(corpus.name, question, num_chunks)
     
-    print("\n💬 ANSWER:")
-    print(response.answer)
+    print("\n💬 ANSWER:" + (" (⚡ from cache)" if result["cached"] else ""))
+    print(result["answer"])
     
-    if response.contexts:
+    if result["sources"]:
         print("\n📚 SOURCES:")
-        for i, context in enumerate(response.contexts.contexts, 1):
+        for i, source in enumerate(result["sources"], 1):
             print(f"\n  Source {i}:")
-            print(f"  File: {context.source_uri}")
-            print(f"  Distance: {context.distance:.3f}")
-            print(f"  Preview: {context.text[:150]}...")
+            print(f"  File: {source['uri']}")
+            print(f"  Preview: {source['text'][:150]}...")
     
-    return response
+    return result
+
+def query_with_rag_batch(corpus, questions: List[str], num_chunks: int = 5,
+                         max_workers: int = QUERY_WORKERS) -> List[Dict]:
+    """
+    Answer many questions at once (e.g. a burst of traffic)
+    
+    Each distinct question is asked once: repeats (and cached questions)
+    share the answer, and the rest run concurrently.
+    
+    Returns:
+        One answer_question() dict per question, in the same order
+    """
+    start = time.perf_counter()
+    keys = [QueryCache.key(corpus.name, question, num_chunks) for question in questions]
+    first_question = {}
+    for key, question in zip(keys, questions):
+        first_question.setdefault(key, question)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(first_question)))) as pool:
+        answers = dict(zip(first_question, pool.map(
+            lambda question: answer_question(corpus.name, question, num_chunks),
+            first_question.values())))
+    elapsed = time.perf_counter() - start
+    
+    asked = sum(not answer["cached"] for answer in answers.values())
+    print(f"✓ Answered {len(questions)} questions in {elapsed:.2f}s "
+          f"({len(questions) / max(elapsed, 1e-6):.1f} questions/sec): "
+          f"{len(answers)} distinct, {asked} sent to Vertex AI, {len(answers) - asked} from cache")
+    return [answers[key] for key in keys]
 
 # ============================================================================
 # DEMO FUNCTIONS
@@ -341,13 +613,13 @@ def demo_setup():
     print("=" * 70)
     
     # Step 1: Setup Cloud Storage
-    gcs_path = setup_cloud_storage()
+    gcs_path, n_files = setup_cloud_storage()
     
     # Step 2: Create corpus
     corpus = create_rag_corpus()
     
     # Step 3: Import documents
-    import_documents(corpus, gcs_path + "*")
+    import_documents(corpus, gcs_path + "*", expected_files=n_files)
     
     print("\n✅ Setup complete! Corpus is ready for queries.")
     print(f"   Corpus name: {corpus.name}")
@@ -374,6 +646,32 @@ def demo_queries(corpus):
         print("\n" + "-"*70)
         input("Press Enter for next question...")
 
+def demo_batch(corpus):
+    """
+    Answer a burst of questions at once, with repeats
+    """
+    print("\n" + "="*70)
+    print("BATCH QUERIES")
+    print("="*70)
+    
+    questions = [
+        "What Python workshops has WCC hosted?",
+        "How do I transition from backend to AI engineering?",
+        "What's your advice for mentees?",
+        "Tell me about cloud architecture best practices"
+    ]
+    # Many users asking the same few things, in slightly different ways
+    burst = [variant for question in questions
+             for variant in (question, question.lower(), f"  {question.upper()}  ")]
+    
+    print("\nFirst burst:")
+    query_with_rag_batch(corpus, burst, num_chunks=3)
+    print("\nSame burst again:")
+    results = query_with_rag_batch(corpus, burst, num_chunks=3)
+    
+    for question, result in zip(questions, results[::3]):
+        print(f"\n❓ {question}\n💬 {result['answer'][:200]}")
+
 def demo_interactive(corpus):
     """
     Interactive Q&A session
@@ -405,7 +703,8 @@ def cleanup(corpus_name):
     print("="*70)
     
     try:
-        rag.delete_corpus(name=corpus_name)
+        get_rag().delete_corpus(name=corpus_name)
+        query_cache.invalidate(corpus_name)
         print(f"✓ Deleted corpus: {corpus_name}")
     except Exception as e:
         print(f"✗ Error deleting corpus: {e}")
@@ -480,6 +779,15 @@ if __name__ == "__main__":
     # Print comparison first
     print_comparison()
     
+    # --local: in-memory Cloud Storage and RAG Engine, no GCP project needed
+    if "--local" in sys.argv:
+        sys.argv.remove("--local")
+        from local_gcp import LocalStorageClient, LocalRagEngine, LocalGenAIClient
+        local_storage = LocalStorageClient()
+        local_rag = LocalRagEngine(local_storage)
+        set_clients(local_storage, local_rag, LocalGenAIClient(local_rag))
+        print("🧪 Using local stand-ins for Cloud Storage and RAG Engine")
+    
     if len(sys.argv) > 1:
         if sys.argv[1] == "--setup":
             corpus = demo_setup()
@@ -493,7 +801,7 @@ if __name__ == "__main__":
             
             corpus_name = sys.argv[2]
             # Reconstruct corpus object
-            corpus = rag.RagCorpus(name=corpus_name)
+            corpus = get_rag().RagCorpus(name=corpus_name)
             demo_queries(corpus)
             
         elif sys.argv[1] == "--interactive":
@@ -502,9 +810,17 @@ if __name__ == "__main__":
                 sys.exit(1)
             
             corpus_name = sys.argv[2]
-            corpus = rag.RagCorpus(name=corpus_name)
+            corpus = get_rag().RagCorpus(name=corpus_name)
             demo_interactive(corpus)
             
+        elif sys.argv[1] == "--batch":
+            if len(sys.argv) < 3:
+                print("Usage: python vertex_ai_rag_managed.py --batch <corpus_name>")
+                sys.exit(1)
+            
+            corpus = get_rag().RagCorpus(name=sys.argv[2])
+            demo_batch(corpus)
+            
         elif sys.argv[1] == "--cleanup":
             if len(sys.argv) < 3:
                 print("Usage: python vertex_ai_rag_managed.py --cleanup <corpus_name>")
@@ -521,8 +837,10 @@ if __name__ == "__main__":
         print("  python vertex_ai_rag_managed.py --setup           # One-time setup")
         print("  python vertex_ai_rag_managed.py --query <corpus>  # Run demo queries")
         print("  python vertex_ai_rag_managed.py --interactive <corpus>  # Interactive Q&A")
+        print("  python vertex_ai_rag_managed.py --batch <corpus>        # Burst of concurrent queries")
         print("  python vertex_ai_rag_managed.py --cleanup <corpus>      # Delete corpus")
         print("  python vertex_ai_rag_managed.py --all             # Setup + queries")
+        print("  Add --local to any command to use local stand-ins instead of GCP")
         print("\nExample workflow:")
         print("  1. python vertex_ai_rag_managed.py --setup")
         print("  2. python vertex_ai_rag_managed.py --interactive projects/123/locations/us-central1/ragCorpora/456")
@@ -0,0 +1,137 @@
+"""
+WCC AI Learning Series - Session 3: Context Builder
+Fit retrieved chunks into a token budget
+
+Pasting all k chunks into the prompt verbatim wastes tokens:
+- Neighbouring chunks repeat each other (chunk_overlap copies ~50 characters)
+- Every first chunk starts with a "Title: ..." line the source label already shows
+- Similar passages from different posts say the same thing twice
+
+build_context() turns retrieved chunks into a smaller list of passages:
+1. Drops near-duplicate chunks (word-set Jaccard similarity)
+2. Merges chunks that sit next to each other in the same document,
+   removing the overlapping text
+3. Adds passages best-first until the token budget is full
+
+Prompt tokens are what we pay for (and wait for) on every request.
+"""
+
+import re
+from typing import Dict, List, Optional
+from embedding_engine import estimate_tokens
+from incremental_ingest import source_key
+
+# Overlap between neighbouring chunks to look for (characters); shorter
+# matches are more likely coincidence than chunk_overlap
+MIN_OVERLAP_CHARS = 10
+MAX_OVERLAP_CHARS = 400
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def strip_title_header(text: str, title: str) -> str:
+    """Remove the "Title: ..." line that chunking adds to the first chunk"""
+    header = f"Title: {title}"
+    if text.startswith(header):
+        return text[len(header):].lstrip("\n")
+    return text
+
+
+def overlap_length(previous: str, following: str, max_chars: int = MAX_OVERLAP_CHARS) -> int:
+    """Length of the longest end of `previous` that `following` starts with"""
+    for length in range(min(len(previous), len(following), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:length]):
+            return length
+    return 0
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def build_context(docs: List[Dict], token_budget: int = 1500,
+                  duplicate_threshold: float = 0.9) -> List[Dict]:
+    """
+    Turn retrieved chunks into de-duplicated passages that fit a token budget
+
+    Args:
+        docs: Retrieved chunks ({'text', 'metadata', ...}), best first
+        token_budget: Maximum estimated tokens for all passage texts
+        duplicate_threshold: Chunks whose word sets are at least this similar
+                             (Jaccard) to a better chunk are dropped
+
+    Returns:
+        Passages, best first: {'title', 'text', 'tokens', 'chunks'}
+        where 'chunks' are the retrieved chunks merged into the passage
+    """
+    # 1. Drop near-duplicates, keeping the better-ranked chunk
+    kept = []
+    kept_words = []
+    for rank, doc in enumerate(docs):
+        words = set(_WORD_RE.findall(doc["text"].lower()))
+        if any(jaccard(words, other) >= duplicate_threshold for other in kept_words):
+            continue
+        kept.append((rank, doc))
+        kept_words.append(words)
+
+    # 2. Merge runs of neighbouring chunks from the same document
+    by_source: Dict[str, List] = {}
+    for rank, doc in kept:
+        by_source.setdefault(source_key(doc["metadata"]), []).append((rank, doc))
+
+    passages = []
+    for group in by_source.values():
+        group.sort(key=lambda item: item[1]["metadata"].get("chunk_id", 0))
+        run: List = []
+        for rank, doc in group:
+            if run and doc["metadata"].get("chunk_id", 0) != run[-1][1]["metadata"].get("chunk_id", 0) + 1:
+                passages.append(_merge(run))
+                run = []
+            run.append((rank, doc))
+        passages.append(_merge(run))
+
+    # 3. Best passage first, then fill the budget
+    passages.sort(key=lambda passage: passage["rank"])
+    selected = []
+    used = 0
+    for passage in passages:
+        if used + passage["tokens"] > token_budget:
+            if selected:
+                continue  # A shorter passage further down may still fit
+            # The best passage alone is too long: keep its beginning
+            passage["text"] = passage["text"][:token_budget * 4].rsplit(" ", 1)[0]
+            passage["tokens"] = estimate_tokens(passage["text"])
+        selected.append(passage)
+        used += passage["tokens"]
+
+    for passage in selected:
+        del passage["rank"]
+    return selected
+
+
+def _merge(run: List) -> Dict:
+    """Join neighbouring chunks of one document, removing repeated overlap"""
+    title = run[0][1]["metadata"].get("title", "Unknown")
+    text: Optional[str] = None
+    for _, doc in run:
+        chunk_text = strip_title_header(doc["text"], title)
+        if text is None:
+            text = chunk_text
+            continue
+        overlap = overlap_length(text, chunk_text)
+        text = text + chunk_text[overlap:] if overlap else f"{text}\n{chunk_text}"
+    return {
+        "title": title,
+        "text": text,
+        "tokens": estimate_tokens(text),
+        "chunks": [doc for _, doc in run],
+        "rank": min(rank for rank, _ in run),
+    }
+
+
+def format_context(passages: List[Dict]) -> str:
+    """Number passages as [Source X: title] blocks for the prompt"""
+    return "\n\n".join(f"[Source {i+1}: {passage['title']}]\n{passage['text']}\n"
+                       for i, passage in enumerate(passages))
@@ -0,0 +1,162 @@
+"""
+WCC AI Learning Series - Session 3: Metadata Filters
+Narrow the search to matching chunks before comparing vectors
+
+Every chunk carries metadata (title, date, url). A question like "events in
+2024" doesn't need to look at chunks from 2023 at all, so semantic_search
+accepts filters:
+
+    filters = {
+        "date_from": "2024-01-01",   # Inclusive; "2024" or "2024-10" also work
+        "date_to": "2024-12-31",     # Inclusive
+        "source": "https://...",     # Exact blog URL
+        "title_prefix": "Django",    # Title starts with (case-sensitive)
+    }
+
+They are applied before the vector comparison:
+- ChromaDB backend: translated into a `where` clause. ChromaDB only compares
+  numbers, so chunks store the date as a number too (`date_num`, 20241015).
+- Local backends: answered from secondary indexes (sorted dates, rows per
+  URL, sorted titles), so only matching rows are searched.
+"""
+
+import bisect
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+FILTER_KEYS = ("date_from", "date_to", "source", "title_prefix")
+
+
+def date_number(date: str, end: bool = False) -> int:
+    """
+    Turn an ISO date into a sortable number: "2024-10-15" -> 20241015
+
+    Partial dates cover the whole year or month: "2024" is 20240101 as a start
+    and 20241231 as an end (end=True).
+    """
+    parts = [int(part) for part in str(date).split("-")[:3]]
+    year = parts[0]
+    month = parts[1] if len(parts) > 1 else (12 if end else 1)
+    day = parts[2] if len(parts) > 2 else (31 if end else 1)
+    return year * 10000 + month * 100 + day
+
+
+def normalize_filters(filters: Optional[Dict]) -> Dict:
+    """
+    Validate filters and convert dates to numbers
+
+    Returns:
+        Dict with only the filters that are set ('date_from'/'date_to' as numbers)
+
+    Raises:
+        ValueError: For unknown filter names
+    """
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}. "
+                         f"Choose from: {', '.join(FILTER_KEYS)}")
+    normalized = {key: value for key, value in filters.items() if value not in (None, "")}
+    if "date_from" in normalized:
+        normalized["date_from"] = date_number(normalized["date_from"])
+    if "date_to" in normalized:
+        normalized["date_to"] = date_number(normalized["date_to"], end=True)
+    return normalized
+
+
+def filters_key(filters: Optional[Dict]) -> tuple:
+    """Hashable form of a filter dict (for cache keys)"""
+    return tuple(sorted(normalize_filters(filters).items()))
+
+
+def titles_with_prefix(titles: Sequence[str], prefix: str) -> List[str]:
+    """Titles from a sorted list that start with prefix"""
+    start = bisect.bisect_left(titles, prefix)
+    end = bisect.bisect_left(titles, prefix + "\uffff")
+    return list(titles[start:end])
+
+
+def to_chroma_where(filters: Optional[Dict], titles: Sequence[str] = ()) -> Optional[Dict]:
+    """
+    Translate filters into a ChromaDB `where` clause
+
+    Args:
+        filters: Filter dict (see module docstring)
+        titles: Sorted distinct titles in the collection (for title_prefix,
+                which ChromaDB can't express directly - it becomes a $in)
+
+    Returns:
+        The where clause, None for no filters, or {} if nothing can match
+    """
+    filters = normalize_filters(filters)
+    clauses = []
+    if "date_from" in filters:
+        clauses.append({"date_num": {"$gte": filters["date_from"]}})
+    if "date_to" in filters:
+        clauses.append({"date_num": {"$lte": filters["date_to"]}})
+    if "source" in filters:
+        clauses.append({"url": {"$eq": filters["source"]}})
+    if "title_prefix" in filters:
+        matching = titles_with_prefix(titles, filters["title_prefix"])
+        if not matching:
+            return {}
+        clauses.append({"title": {"$in": matching}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class MetadataIndex:
+    """
+    Secondary indexes over chunk metadata, for the local vector backends
+
+    Args:
+        metadatas: One metadata dict per row of the vector index
+    """
+
+    def __init__(self, metadatas: Sequence[Dict]):
+        dates = np.array([date_number(m["date"]) if m.get("date") else 0 for m in metadatas],
+                         dtype=np.int64)
+        self._date_order = np.argsort(dates, kind="stable")
+        self._sorted_dates = dates[self._date_order]
+
+        rows_by_source: Dict[str, List[int]] = {}
+        rows_by_title: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            rows_by_source.setdefault(metadata.get("url", ""), []).append(row)
+            rows_by_title.setdefault(metadata.get("title", ""), []).append(row)
+        self._rows_by_source = {key: np.array(rows) for key, rows in rows_by_source.items()}
+        self._rows_by_title = {key: np.array(rows) for key, rows in rows_by_title.items()}
+        self.titles = sorted(rows_by_title)
+
+    def rows(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Rows matching every filter
+
+        Returns:
+            Sorted row numbers, or None if there are no filters (all rows match)
+        """
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+
+        candidates = []
+        if "date_from" in filters or "date_to" in filters:
+            start = np.searchsorted(self._sorted_dates, filters.get("date_from", 0), side="left")
+            end = np.searchsorted(self._sorted_dates, filters.get("date_to", 99999999), side="right")
+            candidates.append(np.sort(self._date_order[start:end]))
+        if "source" in filters:
+            candidates.append(self._rows_by_source.get(filters["source"], np.zeros(0, dtype=np.int64)))
+        if "title_prefix" in filters:
+            titles = titles_with_prefix(self.titles, filters["title_prefix"])
+            rows = [self._rows_by_title[title] for title in titles]
+            candidates.append(np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64))
+
+        # Intersect the smallest sets first
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
@@ -9,7 +9,7 @@ This is a simplified version of the full demo. Perfect for:
 """
 
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
 # Import required libraries
@@ -18,6 +18,11 @@ from google import genai
 from google.genai import types
 import chromadb
 from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+from embedding_engine import EmbeddingEngine
+from incremental_ingest import assign_chunk_ids, plan_ingest, existing_chunk_ids, apply_ingest
+from context_builder import build_context, format_context
+from vector_index import load_or_create_index, index_from_collection
+from snapshot import Snapshot, snapshot_from_collection
 
 
 load_dotenv()
@@ -35,28 +40,40 @@ class RAGPipeline:
     4. Query: Retrieve relevant chunks and generate answers
     """
     
-    def __init__(self, project_id: str, location: str = "us-central1"):
+    def __init__(self, project_id: str, location: str = "us-central1",
+                 vector_backend: str = os.getenv("VECTOR_BACKEND", "chroma"),
+                 client=None):
         """
         Initialize the RAG pipeline
         
         Args:
             project_id: Your GCP project ID
             location: GCP region (default: us-central1)
+            vector_backend: "chroma" to search ChromaDB, or a local index kept
+                            in sync with it: "flat", "ivf", or the compact
+                            "int8" / "binary" (see vector_index.py)
+            client: Generative AI client to use instead of a new Vertex AI
+                    one (e.g. the local stand-in in the live demo's
+                    benchmarks/fake_vertex.py)
         """
         self.project_id = project_id
         self.location = location
         
         # Initialize Vertex AI and Generative AI client
-        vertexai.init(project=project_id, location=location)
-        
-        # Initialize clients
-        self.client = genai.Client(
-            vertexai=True, project=project_id, location=location)
+        if client is None:
+            vertexai.init(project=project_id, location=location)
+            client = genai.Client(
+                vertexai=True, project=project_id, location=location)
+        self.client = client
         
         # Model names from environment or defaults
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-004")
         self.generation_model_name = os.getenv("GENERATION_MODEL_NAME", "gemini-2.5-flash-lite")
         
+        # Concurrent, rate-limited embedding requests (see embedding_engine.py)
+        self.embedding_engine = EmbeddingEngine(
+            self.client, self.embedding_model_name, output_dimensionality=10)
+        
         # Initialize ChromaDB (local, persistent storage)
         self.chroma_client = chromadb.PersistentClient(path="./chroma_data")
         
@@ -69,6 +86,18 @@ class RAGPipeline:
             self.collection = self.chroma_client.create_collection(self.collection_name)
             print(f"✓ Created new collection: {self.collection_name}")
         
+        # Optional local vector index, saved next to the ChromaDB files
+        self.vector_backend = vector_backend
+        self.index_path = os.path.join("./chroma_data", "local_index", self.collection_name)
+        self.local_index = None
+        if vector_backend != "chroma":
+            self.local_index = load_or_create_index(vector_backend, self.index_path)
+            if len(self.local_index) != self.collection.count():
+                # Missing or out of date: rebuild from ChromaDB
+                self.local_index = index_from_collection(self.collection, vector_backend)
+                self.local_index.save(self.index_path)
+            print(f"✓ Using local '{vector_backend}' index ({len(self.local_index)} vectors)")
+        
         # Store documents for reference
         self.documents = []
     
@@ -135,15 +164,24 @@ class RAGPipeline:
     # STEP 2: EMBEDDING & STORAGE
     # ========================================================================
     
-    def embed_and_store(self, batch_size: int = 5) -> None:
+    def embed_and_store(self, batch_size: Optional[int] = None, prune: bool = False) -> Dict:
         """
         STEP 2: Generate embeddings and store in vector database
         
         Why? Embeddings convert text to numbers that capture meaning.
         Vector DB lets us find similar chunks quickly.
         
+        Each chunk gets a stable id (source + position + content hash), so
+        running this again only embeds new or changed chunks.
+        
         Args:
-            batch_size: Process this many chunks at once
+            batch_size: Maximum chunks per request (default: the API limit)
+            prune: Treat the loaded chunks as the whole corpus and delete
+                   chunks from documents that are no longer present
+        
+        Returns:
+            Embedding stats for this run (see EmbeddingEngine.embed),
+            empty if nothing needed embedding
         """
         print("\n" + "="*70)
         print("STEP 2: EMBEDDING & STORAGE")
@@ -151,47 +189,51 @@ class RAGPipeline:
         
         if not hasattr(self, 'chunks'):
             print("❌ No chunks found. Run chunk_documents() first!")
-            return
+            return {}
         
-        # Extract texts
-        texts = [chunk["text"] for chunk in self.chunks]
-        
-        print(f"Generating embeddings for {len(texts)} chunks...")
+        # Compare with what is already stored
+        ids = assign_chunk_ids(self.chunks)
+        plan = plan_ingest(existing_chunk_ids(self.collection), ids, prune=prune)
+        new_chunks = [self.chunks[i] for i in plan["new"]]
+        print(f"  {len(new_chunks)} new or changed, {plan['unchanged']} unchanged, "
+              f"{len(plan['delete'])} stale")
         
+        # Extract texts
+        texts = [chunk["text"] for chunk in new_chunks]
         all_embeddings = []
+        stats = {}
         
-        # Process in batches
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
+        if texts:
+            print(f"Generating embeddings for {len(texts)} chunks...")
             
-            # Get embeddings from Vertex AI
-            response = self.client.models.embed_content(
-                model=self.embedding_model_name,
-                contents=batch,
-                config=types.EmbedContentConfig(output_dimensionality=10),
-            )
-            
-            batch_embeddings = [emb.values for emb in response.embeddings]
-            all_embeddings.extend(batch_embeddings)
-            
-            if (i + batch_size) % 10 == 0:
-                print(f"  Processed {min(i+batch_size, len(texts))}/{len(texts)} chunks")
-        
-        # Store in ChromaDB
-        ids = [f"chunk_{i}" for i in range(len(self.chunks))]
-        documents = [chunk["text"] for chunk in self.chunks]
-        metadatas = [chunk["metadata"] for chunk in self.chunks]
-        
-        self.collection.add(
+            # Batches are sent concurrently, in order, with retries
+            all_embeddings, stats = self.embedding_engine.embed(texts, max_batch_size=batch_size)
+            print(f"  Throughput: {stats['chunks_per_sec']:.1f} chunks/sec ({stats['requests']} requests)")
+        
+        # Upsert into ChromaDB and remove stale chunks
+        apply_ingest(
+            self.collection,
+            ids=[ids[i] for i in plan["new"]],
+            documents=texts,
+            metadatas=[chunk["metadata"] for chunk in new_chunks],
             embeddings=all_embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
+            delete_ids=plan["delete"],
         )
         
-        print(f"✓ Stored {len(self.chunks)} chunks in vector database")
-        print(f"  Embedding dimension: {len(all_embeddings[0])}")
+        # Keep the local index in sync (a read-only snapshot is exported again)
+        if isinstance(self.local_index, Snapshot):
+            self.local_index = snapshot_from_collection(self.collection, self.local_index.path)
+        elif self.local_index is not None:
+            self.local_index.add([ids[i] for i in plan["new"]], all_embeddings, texts,
+                                 [chunk["metadata"] for chunk in new_chunks])
+            self.local_index.delete(plan["delete"])
+            self.local_index.save(self.index_path)
+        
+        print(f"✓ Stored {len(new_chunks)} chunks in vector database")
+        if all_embeddings:
+            print(f"  Embedding dimension: {len(all_embeddings[0])}")
         print(f"  Collection size: {self.collection.count()}")
+        return stats
     
     # ========================================================================
     # STEP 3: SEMANTIC SEARCH
@@ -221,6 +263,12 @@ class RAGPipeline:
         )
         query_embedding = response.embeddings[0].values
         
+        # Search the local index if there is one
+        if self.local_index is not None:
+            relevant_docs = self.local_index.search(query_embedding, k=k)
+            print(f"✓ Found {len(relevant_docs)} relevant chunks")
+            return relevant_docs
+        
         # Search the vector database
         results = self.collection.query(
             query_embeddings=[query_embedding],
@@ -245,7 +293,8 @@ class RAGPipeline:
     # STEP 4: GENERATION (RAG)
     # ========================================================================
     
-    def query(self, question: str, k: int = 5, model: str = "gemini-2.5-flash-lite") -> Dict:
+    def query(self, question: str, k: int = 5, model: str = "gemini-2.5-flash-lite",
+              token_budget: int = 1500) -> Dict:
         """
         STEP 4: Complete RAG - Retrieve context and generate answer
         
@@ -256,6 +305,7 @@ class RAGPipeline:
             question: User's question
             k: Number of context chunks to retrieve
             model: Which Gemini model to use
+            token_budget: Maximum (estimated) tokens of context in the prompt
         
         Returns:
             Dict with 'answer' and 'sources'
@@ -274,13 +324,10 @@ class RAGPipeline:
             }
         
         # 2. Build context from retrieved chunks
-        context_parts = []
-        for i, doc in enumerate(relevant_docs):
-            context_parts.append(f"""[Source {i+1}: {doc['metadata']['title']}]
-{doc['text']}
-""")
-        
-        context = "\n\n".join(context_parts)
+        # (merge neighbouring chunks, drop overlap and near-duplicates, stay within budget)
+        passages = build_context(relevant_docs, token_budget=token_budget)
+        context = format_context(passages)
+        print(f"  Context: {len(passages)} passages, ~{sum(p['tokens'] for p in passages)} tokens")
         
         # 3. Build prompt
         prompt = f"""Answer the question based ONLY on the provided context.
@@ -326,9 +373,37 @@ Answer:"""
         """Clear all stored documents and start fresh"""
         self.chroma_client.delete_collection(self.collection_name)
         self.collection = self.chroma_client.create_collection(self.collection_name)
+        if isinstance(self.local_index, Snapshot):
+            self.local_index = snapshot_from_collection(self.collection, self.local_index.path)
+        elif self.local_index is not None:
+            self.local_index.clear()
+            self.local_index.save(self.index_path)
         self.chunks = []
         print("✓ Collection reset")
     
+    def export_snapshot(self, path: str = "./rag_snapshot") -> None:
+        """
+        Save the stored vectors as a memory-mapped snapshot (see snapshot.py)
+        
+        Loading a snapshot is instant whatever its size, and processes that
+        load the same one share its memory instead of each holding a copy.
+        """
+        snapshot = snapshot_from_collection(self.collection, path)
+        print(f"✓ Exported {len(snapshot)} chunks to {path}")
+    
+    def load_snapshot(self, path: str = "./rag_snapshot", nprobe: int = 8) -> None:
+        """
+        Search a snapshot instead of the collection (read-only, zero copy)
+        
+        Args:
+            path: Folder written by export_snapshot()
+            nprobe: Clusters searched per query if the snapshot has IVF
+                    clusters (large collections); 0 = always exact
+        """
+        self.local_index = Snapshot(path, nprobe=nprobe)
+        self.vector_backend = "snapshot"
+        print(f"✓ Using snapshot {path} ({len(self.local_index)} vectors, memory-mapped)")
+    
     def status(self) -> None:
         """Show current status"""
         print("\n" + "="*70)
@@ -338,6 +413,9 @@ Answer:"""
         print(f"Location: {self.location}")
         print(f"Collection: {self.collection_name}")
         print(f"Stored chunks: {self.collection.count()}")
+        if self.local_index is not None:
+            print(f"Vector backend: {self.vector_backend} "
+                  f"({self.local_index.search_memory_bytes() / 1e6:.2f} MB searched per query)")
         if hasattr(self, 'chunks'):
             print(f"Loaded chunks: {len(self.chunks)}")
 